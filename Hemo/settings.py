@@ -228,5 +228,80 @@ LOGGING = {
 }
 
 
+# Shared cache for state that every gunicorn worker must see: resolved principals, token versions,
+# reference table versions and bootstrap payloads. A per-process LocMemCache would let invalidations
+# reach only the worker that handled the write, so centers.checks rejects process-local backends.
+# Redis when REDIS_URL is set, otherwise the database table created by `manage.py createcachetable`.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'centers_shared_cache',
+        }
+    }
+
+# Tenant resolution cache (centers.cache). Set TENANT_CACHE_ALIAS to a CACHES alias
+# (e.g. a Redis/Memcached backend) to share resolved centers between workers.
+# Center writes reach the other workers within TENANT_VERSION_CHECK_INTERVAL seconds.
+TENANT_CACHE_TTL = int(os.environ.get('TENANT_CACHE_TTL', 300))
+TENANT_VERSION_CHECK_INTERVAL = int(os.environ.get('TENANT_VERSION_CHECK_INTERVAL', 5))
+TENANT_CACHE_MAXSIZE = 512
+TENANT_CACHE_ALIAS = os.environ.get('TENANT_CACHE_ALIAS') or None
+
+# Resolved role/center/verification per user (centers.permissions.resolve_principal),
+# kept in the shared default cache and invalidated by staff/profile signals.
+PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+# Per-process copy in front of the default cache; revocations reach other workers within this many seconds.
+PRINCIPAL_LOCAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_LOCAL_CACHE_TTL', 5))
+PRINCIPAL_LOCAL_CACHE_MAXSIZE = 4096
+
+# Hemodialysis predictor (centers.ml.predictor). The model loads lazily on first prediction;
+# set PREDICTOR_PRELOAD=1 with gunicorn --preload to load it once in the master process.
+# PREDICTOR_MMAP_MODE='r' memory-maps large arrays (only for uncompressed joblib dumps).
+# The pickle is re-stat'ed every PREDICTOR_RELOAD_INTERVAL seconds and reloaded if replaced.
+PREDICTOR_PRELOAD = os.environ.get('PREDICTOR_PRELOAD', '0') == '1'
+PREDICTOR_MMAP_MODE = os.environ.get('PREDICTOR_MMAP_MODE') or None
+PREDICTOR_RELOAD_INTERVAL = int(os.environ.get('PREDICTOR_RELOAD_INTERVAL', 30))
+
+# Per-process LRU of prediction results keyed by model version + encoded features.
+PREDICTION_CACHE_TTL = int(os.environ.get('PREDICTION_CACHE_TTL', 300))
+PREDICTION_CACHE_MAXSIZE = 2048
+
+# Background risk scoring of newly saved sessions (centers.ml.worker). Sessions are batched
+# for up to SESSION_SCORING_LINGER seconds; `manage.py score_sessions` backfills the rest.
+SESSION_SCORING_ENABLED = os.environ.get('SESSION_SCORING_ENABLED', '1') == '1'
+SESSION_SCORING_BATCH_SIZE = 100
+SESSION_SCORING_LINGER = 0.5
+# Longest date range api/predict-hemodialysis/center/ scores in one request.
+SESSION_SCORING_MAX_DAYS = 92
+
+# Background center PDF exports (centers.reports). Finished files are reused until the
+# center's data_version changes; in-flight jobs older than REPORT_EXPORT_TIMEOUT are retried.
+REPORT_EXPORT_DIR = os.environ.get('REPORT_EXPORT_DIR', os.path.join(BASE_DIR, 'exports'))
+REPORT_EXPORT_WORKERS = int(os.environ.get('REPORT_EXPORT_WORKERS', 2))
+REPORT_EXPORT_TIMEOUT = 1800
+# Session rows per table in the PDF report; each chunk becomes its own page-sized table.
+REPORT_TABLE_CHUNK_ROWS = 40
+# Rows fetched per server-side cursor round trip by the streaming CSV exports (centers.exports).
+CSV_EXPORT_CHUNK_SIZE = 2000
+
+# Latest sessions embedded in the patient detail response; older ones are paged via api/patients/<id>/sessions/.
+PATIENT_DETAIL_SESSIONS = 20
+
+# Lifetime of pre-encoded reference tables kept per process (centers.reference). Writes bump a version
+# in the shared default cache, so every worker rebuilds its copy on its next request.
+REFERENCE_CACHE_TTL = 3600
+# Center-wide part of api/bootstrap/; also keyed on data versions, the TTL bounds staleness of admin_accord flags.
+BOOTSTRAP_CACHE_TTL = 60
+# Default and cap (100) of api/cnams/?search= results; the endpoint never returns the whole CNAM table.
+CNAM_SEARCH_LIMIT = 20
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'no-reply@hemo.localhost'
\ No newline at end of file
@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import path,include
 from django.contrib.auth.views import LoginView, LogoutView
 from Hemo.views import (add_center , list_centers , superadmin_center_detail , add_center_staff,AddCenterAPIView , SuperAdminLoginAPIView ,
-     CheckSubdomainAPIView,CenterListAPIView,GovernorateListAPIView,DelegationListAPIView
+     CheckSubdomainAPIView,CenterListAPIView,GovernorateListAPIView,DelegationListAPIView,CacheStatsAPIView
 ) 
 from django.views.generic import TemplateView
 from django.conf import settings
@@ -41,6 +41,7 @@ urlpatterns = [
     path('api/centers/', CenterListAPIView.as_view(), name='center-list'),
     path('api/governorates/', GovernorateListAPIView.as_view(), name='governorate-list'),
     path('api/delegations/', DelegationListAPIView.as_view(), name='delegation-list'),
+    path('api/cache-stats/', CacheStatsAPIView.as_view(), name='cache-stats'),
 
 ]
 
@@ -5,6 +5,9 @@ from django.http import HttpResponseRedirect
 from django import forms
 from centers.models import Center, AdministrativeStaff,Delegation,Governorate
 from centers.forms import AdministrativeStaffForm  # Use centers.forms
+from centers.cache import get_cache_stats
+from centers.utils import normalize_label
+from centers.reference import reference_response
 from .forms import CenterForm
 import logging
 import traceback
@@ -210,6 +213,17 @@ class AddCenterAPIView(APIView):
             return Response({"error": "Form validation failed.", "errors": form.errors.as_data()}, status=status.HTTP_400_BAD_REQUEST)
         
 
+class CacheStatsAPIView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not request.user.is_superuser:
+            logger.warning("CACHE: Permission denied for user %s. Not a superadmin.", request.user.username)
+            return Response({"error": "Permission denied. Only superadmins can view cache statistics."}, status=status.HTTP_403_FORBIDDEN)
+        return Response({'success': True, 'data': get_cache_stats()}, status=status.HTTP_200_OK)
+
+
 class SuperAdminLoginAPIView(APIView):
     def post(self, request):
         try:
@@ -287,12 +301,21 @@ class CenterListAPIView(APIView):
             centers = Center.objects.all()
 
             if label_filter:
-                centers = centers.filter(label__icontains=label_filter)
+                # Normalized label is indexed for prefix and trigram (substring) matching
+                search = normalize_label(label_filter)
+                lookup = 'normalized_label__contains' if len(search) >= 3 else 'normalized_label__startswith'
+                centers = centers.filter(**{lookup: search})
             if governorate_id:
                 centers = centers.filter(governorate__id=governorate_id)
             if delegation_id:
                 centers = centers.filter(delegation__id=delegation_id)
 
+            centers = centers.values(
+                'id', 'sub_domain', 'label', 'tel', 'mail', 'adresse', 'type_center', 'code_type_hemo',
+                'name_type_hemo', 'center_code', 'governorate_id', 'governorate__name', 'governorate__code',
+                'delegation_id', 'delegation__name', 'delegation__code', 'delegation__governorate_id',
+            ).order_by('label', 'id')
+
             # Paginate queryset
             paginator = self.pagination_class
             page = paginator.paginate_queryset(centers, request, view=self)
@@ -305,27 +328,27 @@ class CenterListAPIView(APIView):
             centers_data = []
             for center in centers_to_serialize:
                 center_data = {
-                    'id': center.id,
-                    'sub_domain': center.sub_domain,
-                    'label': center.label,
-                    'tel': center.tel,
-                    'mail': center.mail,
-                    'adresse': center.adresse,
-                    'type_center': center.type_center,
-                    'code_type_hemo': center.code_type_hemo,
-                    'name_type_hemo': center.name_type_hemo,
-                    'center_code': center.center_code,
+                    'id': center['id'],
+                    'sub_domain': center['sub_domain'],
+                    'label': center['label'],
+                    'tel': center['tel'],
+                    'mail': center['mail'],
+                    'adresse': center['adresse'],
+                    'type_center': center['type_center'],
+                    'code_type_hemo': center['code_type_hemo'],
+                    'name_type_hemo': center['name_type_hemo'],
+                    'center_code': center['center_code'],
                     'governorate': {
-                        'id': center.governorate.id,
-                        'label': center.governorate.name,
-                        'code': center.governorate.code
-                    } if center.governorate else None,
+                        'id': center['governorate_id'],
+                        'label': center['governorate__name'],
+                        'code': center['governorate__code']
+                    } if center['governorate_id'] else None,
                     'delegation': {
-                        'id': center.delegation.id,
-                        'label': center.delegation.name,
-                        'code': center.delegation.code,
-                        'governorate': center.delegation.governorate.id
-                    } if center.delegation else None
+                        'id': center['delegation_id'],
+                        'label': center['delegation__name'],
+                        'code': center['delegation__code'],
+                        'governorate': center['delegation__governorate_id']
+                    } if center['delegation_id'] else None
                 }
                 centers_data.append(center_data)
 
@@ -341,19 +364,7 @@ class CenterListAPIView(APIView):
 class GovernorateListAPIView(APIView):
     def get(self, request):
         try:
-            governorates = Governorate.objects.all()
-            # Manually construct response data
-            governorates_data = [
-                {
-                    'id': gov.id,
-                    'label': gov.name,  # Use name as label
-                    'code': gov.code
-                }
-                for gov in governorates
-            ]
-            logger.info(f"Retrieved {len(governorates)} governorates")
-            return Response({'success': True, 'data': governorates_data}, status=status.HTTP_200_OK)
-
+            return reference_response(request, 'governorates')
         except Exception as e:
             logger.error(f"Error in GovernorateListAPIView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -361,20 +372,7 @@ class GovernorateListAPIView(APIView):
 class DelegationListAPIView(APIView):
     def get(self, request):
         try:
-            delegations = Delegation.objects.all()
-            # Manually construct response data
-            delegations_data = [
-                {
-                    'id': delg.id,
-                    'label': delg.name,  # Use name as label
-                    'code': delg.code,
-                    'governorate': delg.governorate.id
-                }
-                for delg in delegations
-            ]
-            logger.info(f"Retrieved {len(delegations)} delegations")
-            return Response({'success': True, 'data': delegations_data}, status=status.HTTP_200_OK)
-
+            return reference_response(request, 'delegations')
         except Exception as e:
             logger.error(f"Error in DelegationListAPIView: {str(e)}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
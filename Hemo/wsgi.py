@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Hemo.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.PREDICTOR_PRELOAD:
+    from centers.ml.predictor import preload_model
+    preload_model()
@@ -0,0 +1,234 @@
+# centers/cache.py
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+
+
+class LocalTTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, name, maxsize=1024, ttl=300):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+def shared_cache(alias_setting):
+    """Return the Django cache named by `alias_setting`, or None when no shared tier is configured."""
+    alias = getattr(settings, alias_setting, None)
+    return caches[alias] if alias else None
+
+
+# Subdomain -> Center resolution used by TenantMiddleware. Local entries carry the subdomain's version from the
+# default cache; invalidate_tenant() bumps it, so every worker reloads the center once it sees the new version.
+# The version itself is re-read at most every TENANT_VERSION_CHECK_INTERVAL seconds per worker.
+TENANT_CACHE_KEY = 'tenant:%s'
+TENANT_VERSION_KEY = 'tenant_version:%s'
+tenant_cache = LocalTTLCache(
+    'tenant',
+    maxsize=getattr(settings, 'TENANT_CACHE_MAXSIZE', 512),
+    ttl=getattr(settings, 'TENANT_CACHE_TTL', 300),
+)
+tenant_version_cache = LocalTTLCache(
+    'tenant_version',
+    maxsize=getattr(settings, 'TENANT_CACHE_MAXSIZE', 512),
+    ttl=getattr(settings, 'TENANT_VERSION_CHECK_INTERVAL', 5),
+)
+
+
+def get_tenant_version(sub_domain):
+    version = tenant_version_cache.get(sub_domain)
+    if version is None:
+        version = cache.get(TENANT_VERSION_KEY % sub_domain, 0)
+        tenant_version_cache.set(sub_domain, version)
+    return version
+
+
+def get_cached_tenant(sub_domain):
+    version = get_tenant_version(sub_domain)
+    entry = tenant_cache.get(sub_domain)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+    center = None
+    shared = shared_cache('TENANT_CACHE_ALIAS')
+    if shared is not None:
+        center = shared.get(TENANT_CACHE_KEY % sub_domain)
+        if center is not None:
+            tenant_cache.set(sub_domain, (version, center))
+    return center
+
+
+def set_cached_tenant(center):
+    tenant_cache.set(center.sub_domain, (get_tenant_version(center.sub_domain), center))
+    shared = shared_cache('TENANT_CACHE_ALIAS')
+    if shared is not None:
+        shared.set(TENANT_CACHE_KEY % center.sub_domain, center, tenant_cache.ttl)
+
+
+def invalidate_tenant(*sub_domains):
+    shared = shared_cache('TENANT_CACHE_ALIAS')
+    for sub_domain in sub_domains:
+        if not sub_domain:
+            continue
+        bump_version(TENANT_VERSION_KEY % sub_domain)
+        tenant_cache.delete(sub_domain)
+        tenant_version_cache.delete(sub_domain)
+        if shared is not None:
+            shared.delete(TENANT_CACHE_KEY % sub_domain)
+
+
+# Hemodialysis predictions keyed by model version + hash of the encoded feature vector
+prediction_cache = LocalTTLCache(
+    'prediction',
+    maxsize=getattr(settings, 'PREDICTION_CACHE_MAXSIZE', 2048),
+    ttl=getattr(settings, 'PREDICTION_CACHE_TTL', 300),
+)
+
+
+# Principals and token versions (centers.permissions) kept per process for a few seconds in front of the
+# default cache, which is a SQL table unless REDIS_URL is set. Invalidation clears this process at once;
+# other workers drop their copy within PRINCIPAL_LOCAL_CACHE_TTL.
+principal_cache = LocalTTLCache(
+    'principal',
+    maxsize=getattr(settings, 'PRINCIPAL_LOCAL_CACHE_MAXSIZE', 4096),
+    ttl=getattr(settings, 'PRINCIPAL_LOCAL_CACHE_TTL', 5),
+)
+
+
+def get_principal_entry(key):
+    value = principal_cache.get(key)
+    if value is None:
+        value = cache.get(key)
+        if value is not None:
+            principal_cache.set(key, value)
+    return value
+
+
+def set_principal_entry(key, value):
+    principal_cache.set(key, value)
+    cache.set(key, value, getattr(settings, 'PRINCIPAL_CACHE_TTL', 60))
+
+
+def delete_principal_entry(key):
+    principal_cache.delete(key)
+    cache.delete(key)
+
+
+# Current UserProfile.token_version per user, checked against the `ver` JWT claim
+TOKEN_VERSION_KEY = 'token_version:%s'
+
+
+def get_cached_token_version(user_id):
+    return get_principal_entry(TOKEN_VERSION_KEY % user_id)
+
+
+def set_cached_token_version(user_id, version):
+    set_principal_entry(TOKEN_VERSION_KEY % user_id, version)
+
+
+def invalidate_token_version(user_id):
+    delete_principal_entry(TOKEN_VERSION_KEY % user_id)
+
+
+# Pre-encoded reference tables (centers.reference), held per process and checked against a version counter
+# in the default cache; CACHES must be shared between workers for a write to reach all of them (centers.checks)
+REFERENCE_VERSION_KEY = 'reference_version:%s'
+reference_cache = LocalTTLCache(
+    'reference',
+    maxsize=64,
+    ttl=getattr(settings, 'REFERENCE_CACHE_TTL', 3600),
+)
+
+
+def get_reference_version(name):
+    return cache.get(REFERENCE_VERSION_KEY % name, 0)
+
+
+def get_reference_versions(names):
+    """Versions of several reference tables with one cache round trip, in the order of `names`."""
+    versions = cache.get_many([REFERENCE_VERSION_KEY % name for name in names])
+    return [versions.get(REFERENCE_VERSION_KEY % name, 0) for name in names]
+
+
+def bump_version(key):
+    """Move the version counter at `key` to a value no reader has seen yet.
+
+    Redis increments atomically. Other backends implement incr() as a read followed by a write, so two
+    concurrent bumps could store the same number and one worker would keep a stale copy; there the version
+    becomes a fresh random token instead. Versions are only ever compared for equality.
+    """
+    if isinstance(caches['default'], RedisCache):
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+    else:
+        cache.set(key, uuid.uuid4().hex[:12], None)
+
+
+def bump_reference_version(name):
+    bump_version(REFERENCE_VERSION_KEY % name)
+
+
+def get_cache_stats():
+    return {
+        'tenant': tenant_cache.stats(),
+        'prediction': prediction_cache.stats(),
+        'reference': reference_cache.stats(),
+        'principal': principal_cache.stats(),
+    }
@@ -0,0 +1,23 @@
+# centers/checks.py
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose entries live in one process; invalidating there leaves the other workers stale
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"The default cache backend {backend} is process-local.",
+            hint="Principals, token versions and reference versions are invalidated through the default cache; "
+                 "configure a cache shared by all workers (database cache or Redis).",
+            obj='settings.CACHES',
+            id='centers.E001',
+        )]
+    return []
@@ -0,0 +1,71 @@
+# centers/etags.py
+import functools
+import hashlib
+from rest_framework import status
+from rest_framework.response import Response
+from .cache import get_reference_versions
+from .models import Center, Patient
+
+# Reference tables whose labels are embedded in patient responses (session type/method, disease, complication
+# and transplantation names); renaming a row changes these versions instead of every patient's data_version
+PATIENT_REFERENCE_TABLES = ['type_hemo', 'method_hemo', 'transmittable_disease_ref', 'complications_ref', 'transplantation_ref']
+
+
+def make_etag(request, version):
+    """Strong ETag for `version` of the resource at this URL, query string included."""
+    raw = f"{version}:{request.get_full_path()}"
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def patient_etag(request, patient_id, center):
+    """ETag of a patient resource from Patient.data_version and the embedded reference tables' versions.
+
+    None when the patient is not in `center`. CNAM and doctor renames bump the affected patients (signals).
+    """
+    version = Patient.objects.filter(pk=patient_id, center=center).values_list('data_version', flat=True).first()
+    if version is None:
+        return None
+    references = '.'.join(str(v) for v in get_reference_versions(PATIENT_REFERENCE_TABLES))
+    return make_etag(request, f"{version}:{references}")
+
+
+def center_etag(request, center):
+    version = Center.objects.filter(pk=center.pk).values_list('data_version', flat=True).first()
+    return None if version is None else make_etag(request, version)
+
+
+def not_modified(etag):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    response['ETag'] = etag
+    return response
+
+
+def with_etag(response, etag):
+    if etag is not None and response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+    return response
+
+
+def _conditional(etag_for):
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            etag = etag_for(request, *args, **kwargs) if getattr(request, 'tenant', None) else None
+            if etag is not None and matches(request, etag):
+                return not_modified(etag)
+            return with_etag(get(self, request, *args, **kwargs), etag)
+        return wrapper
+    return decorator
+
+
+# Decorators for APIView.get: answer If-None-Match with 304 before running the handler's queries
+patient_conditional_get = _conditional(lambda request, patient_id, *args, **kwargs: patient_etag(request, patient_id, request.tenant))
+center_conditional_get = _conditional(lambda request, *args, **kwargs: center_etag(request, request.tenant))
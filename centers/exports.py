@@ -0,0 +1,119 @@
+# centers/exports.py
+import csv
+from datetime import datetime
+from django.conf import settings
+from .models import Patient, HemodialysisSession, TransmittableDisease, Complications, Transplantation
+from .reports import ReportOptions
+
+ACTIVITY = 'medical_activity__patient__'
+
+
+class CSVTable:
+    """Flat export of one model: `columns` maps CSV header -> values_list lookup, `date_field` bounds the period."""
+
+    def __init__(self, model, center_lookup, columns, date_field=None, ordering=('pk',)):
+        self.model = model
+        self.center_lookup = center_lookup
+        self.columns = columns
+        self.date_field = date_field
+        self.ordering = ordering
+
+    def queryset(self, center, options):
+        queryset = self.model.objects.filter(**{self.center_lookup: center}).order_by(*self.ordering)
+        if self.date_field:
+            queryset = options.filter_period(queryset, self.date_field)
+        return queryset.values_list(*self.columns.values())
+
+
+CSV_TABLES = {
+    'sessions': CSVTable(HemodialysisSession, ACTIVITY + 'center', {
+        'id': 'id',
+        'patient_cin': ACTIVITY + 'cin',
+        'date_of_session': 'date_of_session',
+        'type': 'type__name',
+        'method': 'method__name',
+        'doctor_cnom': 'responsible_doc__cnom',
+        'pre_dialysis_bp': 'pre_dialysis_bp',
+        'during_dialysis_bp': 'during_dialysis_bp',
+        'post_dialysis_bp': 'post_dialysis_bp',
+        'heart_rate': 'heart_rate',
+        'creatinine': 'creatinine',
+        'urea': 'urea',
+        'potassium': 'potassium',
+        'hemoglobin': 'hemoglobin',
+        'hematocrit': 'hematocrit',
+        'albumin': 'albumin',
+        'kt_v': 'kt_v',
+        'urine_output': 'urine_output',
+        'dry_weight': 'dry_weight',
+        'fluid_removal_rate': 'fluid_removal_rate',
+        'dialysis_duration': 'dialysis_duration',
+        'vascular_access_type': 'vascular_access_type',
+        'dialyzer_type': 'dialyzer_type',
+        'severity_of_case': 'severity_of_case',
+        'risk_prediction': 'risk_prediction',
+    }, date_field='date_of_session', ordering=('date_of_session', 'id')),
+    'patients': CSVTable(Patient, 'center', {
+        'id': 'id',
+        'cin': 'cin',
+        'nom': 'nom',
+        'prenom': 'prenom',
+        'gender': 'gender',
+        'age': 'age',
+        'weight': 'weight',
+        'blood_type': 'blood_type',
+        'cnam': 'cnam__number',
+        'entry_date': 'entry_date',
+        'previously_dialysed': 'previously_dialysed',
+        'date_first_dia': 'date_first_dia',
+        'hypertension': 'hypertension',
+        'diabetes': 'diabetes',
+        'status': 'status',
+    }, date_field='entry_date'),
+    'diseases': CSVTable(TransmittableDisease, ACTIVITY + 'center', {
+        'id': 'id',
+        'patient_cin': ACTIVITY + 'cin',
+        'disease': 'disease__label_disease',
+        'type_of_transmission': 'disease__type_of_transmission',
+        'date_of_contraction': 'date_of_contraction',
+    }, date_field='date_of_contraction'),
+    'complications': CSVTable(Complications, ACTIVITY + 'center', {
+        'id': 'id',
+        'patient_cin': ACTIVITY + 'cin',
+        'complication': 'complication__label_complication',
+        'notes': 'notes',
+        'date_of_contraction': 'date_of_contraction',
+    }, date_field='date_of_contraction'),
+    'transplantations': CSVTable(Transplantation, ACTIVITY + 'center', {
+        'id': 'id',
+        'patient_cin': ACTIVITY + 'cin',
+        'transplantation': 'transplantation__label_transplantation',
+        'date_operation': 'date_operation',
+        'notes': 'notes',
+    }, date_field='date_operation'),
+}
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() hands the formatted line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_filename(center, table):
+    return f"{table}_{center.label}_{datetime.now().strftime('%Y-%m-%d')}.csv"
+
+
+def stream_csv(center, table, options=None):
+    """Yield CSV lines of `table` for the center, reading rows through a server-side cursor.
+
+    Memory use stays constant whatever the number of rows; raises KeyError for unknown tables.
+    """
+    spec = CSV_TABLES[table]
+    options = options or ReportOptions()
+    writer = csv.writer(_Echo())
+    yield writer.writerow(spec.columns.keys())
+    chunk_size = getattr(settings, 'CSV_EXPORT_CHUNK_SIZE', 2000)
+    for row in spec.queryset(center, options).iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
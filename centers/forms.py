@@ -890,6 +890,7 @@ class MachineForm(forms.ModelForm):
 
 
 class PatientForm(forms.ModelForm):
+    cnam_number = forms.CharField(max_length=50, required=False, label="CNAM Number")
     new_cnam_number = forms.CharField(max_length=50, required=False, label="New CNAM Number")
     weight = forms.FloatField(required=False, label="Weight (kg)", min_value=0, max_value=300, widget=forms.NumberInput(attrs={'placeholder': 'Weight (kg)', 'class': 'form-control'}))
     age = forms.IntegerField(required=False, label="Age (years)", min_value=0, max_value=120, widget=forms.NumberInput(attrs={'placeholder': 'Age (years)', 'class': 'form-control'}))
@@ -897,7 +898,7 @@ class PatientForm(forms.ModelForm):
     class Meta:
         model = Patient
         fields = [
-            'nom', 'prenom', 'cin', 'cnam', 'new_cnam_number', 'entry_date', 'previously_dialysed',
+            'nom', 'prenom', 'cin', 'cnam', 'cnam_number', 'new_cnam_number', 'entry_date', 'previously_dialysed',
             'date_first_dia', 'blood_type', 'gender', 'weight', 'age', 'hypertension', 'diabetes'  # New fields
         ]
         widgets = {
@@ -917,7 +918,11 @@ class PatientForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.center = kwargs.pop('center', None)
         super().__init__(*args, **kwargs)
-        self.fields['cnam'].queryset = CNAM.objects.all()
+        # Choices come from the api/cnams/ search; validation only looks up the submitted CNAM (by id here, or by
+        # cnam_number in clean()), never the whole table.
+        cnam_id = self.data.get(self.add_prefix('cnam')) if self.is_bound else None
+        cnam_id = str(cnam_id) if cnam_id is not None else ''
+        self.fields['cnam'].queryset = CNAM.objects.filter(pk=cnam_id) if cnam_id.isdigit() else CNAM.objects.none()
         self.fields['cnam'].required = False
         self.fields['blood_type'].choices = Patient.BLOOD_TYPE_CHOICES
         self.fields['gender'].choices = Patient.GENDER_CHOICES
@@ -927,6 +932,12 @@ class PatientForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
+        cnam_number = cleaned_data.get('cnam_number')
+        if cnam_number and not cleaned_data.get('cnam'):
+            # Single lookup on the unique CNAM.number index
+            cleaned_data['cnam'] = CNAM.objects.filter(number=cnam_number).first()
+            if cleaned_data['cnam'] is None:
+                self.add_error('cnam_number', "No CNAM with this number. Provide it as a new CNAM number instead.")
         cnam = cleaned_data.get('cnam')
         new_cnam_number = cleaned_data.get('new_cnam_number')
         previously_dialysed = cleaned_data.get('previously_dialysed')
@@ -935,7 +946,7 @@ class PatientForm(forms.ModelForm):
         age = cleaned_data.get('age')
 
         # CNAM validation
-        if not cnam and not new_cnam_number:
+        if not cnam and not new_cnam_number and not cnam_number:
             self.add_error('new_cnam_number', "Select an existing CNAM number or provide a new one.")
         elif cnam and new_cnam_number:
             self.add_error('new_cnam_number', "Cannot select an existing CNAM and provide a new number.")
@@ -0,0 +1,67 @@
+import random
+import time
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from centers.ml import predictor
+
+
+class Command(BaseCommand):
+    help = 'Check parity and compare latency of the pandas and FeatureEncoder prediction paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200, help='Number of synthetic records')
+        parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per path')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def make_record(self, rng):
+        record = {key: round(rng.uniform(0, 200), 2) for key in predictor.FEATURE_MAP}
+        record['gender'] = rng.choice(['male', 'female', 'Male', 'other'])
+        record['diabetes'] = rng.choice(['yes', 'no', 'YES', True])
+        record['hypertension'] = rng.choice(['yes', 'no'])
+        record['disease_severity'] = rng.choice(['mild', 'moderate', 'severe', 'unknown'])
+        for key in list(record):
+            if rng.random() < 0.1 and key != 'gender':
+                del record[key]
+        return record
+
+    def pandas_features(self, record):
+        prepared = predictor.prepare_features(predictor.encode_categorical_features(dict(record)))
+        return pd.DataFrame([prepared])
+
+    def timed(self, func, records, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for record in records:
+                func(record)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best / len(records) * 1e6
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        records = [self.make_record(rng) for _ in range(options['samples'])]
+        encoder = predictor.FeatureEncoder()
+        model = predictor.get_model()
+
+        # Parity: identical feature matrices and predictions for every record
+        for index, record in enumerate(records):
+            expected = self.pandas_features(record)
+            actual = encoder.encode(record)
+            if not np.array_equal(expected.to_numpy(dtype=np.float64), actual):
+                raise CommandError(f"Feature mismatch for record {index}: {record}")
+            if model.predict(expected)[0] != predictor.run_model(model, actual)[0][0]:
+                raise CommandError(f"Prediction mismatch for record {index}: {record}")
+        self.stdout.write(self.style.SUCCESS(f"Parity OK on {len(records)} records"))
+
+        repeat = options['repeat']
+        encode_pandas = self.timed(self.pandas_features, records, repeat)
+        encode_numpy = self.timed(encoder.encode, records, repeat)
+        predict_pandas = self.timed(lambda r: model.predict(self.pandas_features(r)), records, repeat)
+        predict_numpy = self.timed(lambda r: predictor.run_model(model, encoder.encode(r)), records, repeat)
+
+        self.stdout.write(f"encode   pandas: {encode_pandas:9.1f} us/record   encoder: {encode_numpy:9.1f} us/record   "
+                          f"speedup: {encode_pandas / encode_numpy:.1f}x")
+        self.stdout.write(f"predict  pandas: {predict_pandas:9.1f} us/record   encoder: {predict_numpy:9.1f} us/record   "
+                          f"speedup: {predict_pandas / predict_numpy:.1f}x")
@@ -0,0 +1,169 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand, CommandError
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from centers.reports import SESSION_COLUMNS, SESSION_HEADER, ReportOptions, render_report, session_row
+
+
+def legacy_render(center, data, output):
+    """Render `data` the way export_pdf and ExportPDFAPIView did before centers.reports existed.
+
+    Styles and table commands are rebuilt on every call and every table, and each section is one table
+    that ReportLab splits across pages. Sessions use the report engine's columns so only the engine differs.
+    """
+    doc = SimpleDocTemplate(output, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(name='Title', fontSize=16, fontName='Helvetica-Bold', alignment=1, spaceAfter=12)
+    subtitle_style = ParagraphStyle(name='Subtitle', fontSize=12, fontName='Helvetica-Bold', textColor=colors.blue,
+                                    leading=14, spaceBefore=10, spaceAfter=8)
+    normal_style = styles['Normal']
+
+    def table(header, rows, col_widths):
+        table = Table([header] + rows, colWidths=col_widths)
+        table.setStyle(TableStyle([
+            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
+            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+            ('LEFTPADDING', (0,0), (-1,-1), 6),
+            ('RIGHTPADDING', (0,0), (-1,-1), 6),
+            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
+        ]))
+        return table
+
+    def people(*groups):
+        return [[f"{s['nom']} {s['prenom']}", s['cin'], f"{label}: {s[field]}"]
+                for rows, label, field in groups for s in rows]
+
+    elements = [Paragraph(f"{center.label} - Activity Report", title_style), Spacer(1, 0.5*cm)]
+    elements += [Paragraph("Staff Members", title_style), Paragraph("Administrative Staff", subtitle_style)]
+    elements.append(table(['Name', 'CIN', 'Details'], people((data['administrative_staff'], 'Job Title', 'job_title'),
+                                                             (data['technical_staff'], 'Qualification', 'qualification')),
+                          [5*cm, 4*cm, 8*cm]))
+    elements.append(Paragraph("Para & Medical Staff", subtitle_style))
+    elements.append(table(['Name', 'CIN', 'Details'], people((data['medical_staff'], 'CNOM', 'cnom'),
+                                                             (data['paramedical_staff'], 'Qualification', 'qualification')),
+                          [5*cm, 4*cm, 8*cm]))
+    elements.append(Paragraph("Workers Staff", subtitle_style))
+    elements.append(table(['Name', 'CIN', 'Details'], people((data['worker_staff'], 'Job Title', 'job_title')),
+                          [5*cm, 4*cm, 8*cm]))
+    elements.append(Paragraph("Equipment", title_style))
+    elements.append(table(['Brand', 'Hours', 'Membrane', 'Filtre'], [
+        [m['brand'], str(m['nbre_hrs']), m['membrane__type'], m['filtre__type']] for m in data['machines']
+    ], [5*cm, 3*cm, 4*cm, 5*cm]))
+    elements += [Paragraph("Activity", title_style), Paragraph("Hemodialysis Sessions", subtitle_style)]
+    elements.append(table(SESSION_HEADER, [session_row(session) for session in data['sessions']], SESSION_COLUMNS))
+    elements += [Paragraph("Morbidity", title_style), Paragraph("Transmittable Diseases", subtitle_style)]
+    elements.append(table(['Disease', 'Transmission Type', 'Date of Contraction'], [
+        [d['disease__label_disease'], d['disease__type_of_transmission'], d['date_of_contraction'].strftime('%Y-%m-%d')]
+        for d in data['diseases']
+    ], [6*cm, 6*cm, 5*cm]))
+    elements.append(Paragraph("Complications", subtitle_style))
+    elements.append(table(['Complication', 'Notes', 'Date of Contraction'], [
+        [c['complication__label_complication'], c['notes'] or 'No notes', c['date_of_contraction'].strftime('%Y-%m-%d')]
+        for c in data['complications']
+    ], [6*cm, 6*cm, 5*cm]))
+    elements += [Paragraph("Mortality", title_style), Paragraph("Deceased Patients", subtitle_style)]
+    elements.append(table(['Name', 'CIN', 'Decease Note'], [
+        [f"{p['nom']} {p['prenom']}", p['cin'], p['decease_note'] or 'No note provided'] for p in data['deceased_patients']
+    ], [6*cm, 4*cm, 7*cm]))
+    doc.build(elements)
+
+
+class Command(BaseCommand):
+    help = 'Compare center report render time per 1,000 session rows before and after the report engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 5000, 20000], help='Session row counts')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing repetitions per row count')
+        parser.add_argument('--stream', action='store_true', help='Render through the streaming flowable path')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--skip-legacy', action='store_true', help='Only time the report engine')
+        parser.add_argument('--save', help='Write the report engine results to this JSON file')
+        parser.add_argument('--compare', help='JSON file from an earlier --save run to compare against')
+
+    def make_data(self, rng, rows):
+        start = date(2020, 1, 1)
+        sessions = [{
+            'type__name': 'Hemodialysis',
+            'method__name': rng.choice(['HD', 'HDF']),
+            'date_of_session': start + timedelta(days=i // 20),
+            'responsible_doc__nom': rng.choice(['Ben Ali', 'Trabelsi', 'Gharbi']),
+            'responsible_doc__prenom': rng.choice(['Sami', 'Amel', 'Karim']),
+            'pre_dialysis_bp': rng.uniform(90, 180),
+            'post_dialysis_bp': rng.uniform(90, 180),
+            'dialysis_duration': rng.choice([3.5, 4.0, None]),
+            'vascular_access_type': rng.choice(['Fistula', 'Graft', 'Catheter']),
+            'severity_of_case': rng.choice(['Mild', 'Moderate', 'Severe', None]),
+        } for i in range(rows)]
+        staff = [{'nom': f'Nom{i}', 'prenom': 'Prenom', 'cin': f'{i:08d}', 'job_title': 'Clerk',
+                  'qualification': 'Nurse', 'cnom': f'C{i}'} for i in range(20)]
+        return {
+            'administrative_staff': staff, 'technical_staff': staff, 'medical_staff': staff,
+            'paramedical_staff': staff, 'worker_staff': staff,
+            'machines': [{'brand': f'Brand{i}', 'functional': True, 'reserve': False, 'refurbished': False,
+                          'nbre_hrs': 1200, 'membrane__type': 'Polysulfone', 'filtre__type': 'F60',
+                          'filtre__sterilisation': 'GAMMA_RAYS'} for i in range(10)],
+            'sessions': sessions,
+            'transplantations': [],
+            'diseases': [{'disease__label_disease': 'HBV', 'disease__type_of_transmission': 'Blood',
+                          'date_of_contraction': start} for _ in range(50)],
+            'complications': [{'complication__label_complication': 'Hypotension', 'notes': None,
+                               'date_of_contraction': start} for _ in range(50)],
+            'deceased_patients': [{'nom': 'Nom', 'prenom': 'Prenom', 'cin': '00000000', 'decease_note': None}] * 10,
+        }
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        center = SimpleNamespace(label='Benchmark Center', adresse='1 Rue de la Sante', delegation=None,
+                                 tel='71000000', mail='bench@example.com')
+        report_options = ReportOptions()
+
+        renderers = [('after', lambda data, output: render_report(center, data, output, report_options,
+                                                                 stream=options['stream']))]
+        if not options['skip_legacy']:
+            renderers.insert(0, ('before', lambda data, output: legacy_render(center, data, output)))
+
+        results = {}
+        for rows in options['rows']:
+            data = self.make_data(rng, rows)
+            per_thousand = {}
+            for name, render in renderers:
+                best = None
+                for _ in range(options['repeat']):
+                    output = BytesIO()
+                    start = time.perf_counter()
+                    render(data, output)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                per_thousand[name] = best / rows * 1000 * 1000
+                self.stdout.write(f"{rows:>7} rows {name:>6}: {best:8.2f} s total   "
+                                  f"{per_thousand[name]:8.1f} ms per 1,000 rows   {len(output.getvalue()) / 1024:8.0f} KiB")
+            if 'before' in per_thousand:
+                self.stdout.write(f"{rows:>7} rows: speedup {per_thousand['before'] / per_thousand['after']:.2f}x")
+            results[str(rows)] = per_thousand['after']
+
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {e}")
+            for rows, per_thousand in results.items():
+                if rows in baseline:
+                    self.stdout.write(f"{rows:>7} rows: baseline {baseline[rows]:8.1f} ms   now {per_thousand:8.1f} ms   "
+                                      f"speedup: {baseline[rows] / per_thousand:.2f}x")
+
+        if options['save']:
+            with open(options['save'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Saved results to {options['save']}"))
@@ -0,0 +1,35 @@
+import logging
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from centers.models import HemodialysisSession
+from centers.ml.predictor import get_model, model_version
+from centers.ml.scoring import score_sessions_in_chunks
+
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = 'Backfill hemodialysis session risk scores that are missing or from an older model version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--center', type=int, help='Only score sessions of this center ID')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Sessions scored per vectorized pass')
+        parser.add_argument('--all', action='store_true', help='Rescore sessions that already have a current score')
+
+    def handle(self, *args, **kwargs):
+        get_model()
+        version = model_version()
+        sessions = HemodialysisSession.objects.order_by('id')
+        if kwargs['center']:
+            sessions = sessions.filter(medical_activity__patient__center_id=kwargs['center'])
+        if not kwargs['all']:
+            sessions = sessions.filter(Q(risk_model_version__isnull=True) | ~Q(risk_model_version=version))
+
+        total = sessions.count()
+        scored = errors = 0
+        for results in score_sessions_in_chunks(sessions, kwargs['chunk_size']):
+            errors += sum(1 for result in results if 'error' in result)
+            scored += len(results)
+            self.stdout.write(f"Scored {scored}/{total} sessions")
+
+        logger.info(f"Session scoring backfill finished: {scored} sessions, {errors} errors, model {version}")
+        self.stdout.write(self.style.SUCCESS(f"Scored {scored} sessions ({errors} errors) with model {version}"))
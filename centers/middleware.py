@@ -1,6 +1,7 @@
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
 from .models import Center
+from .cache import get_cached_tenant, set_cached_tenant
 
 class TenantMiddleware:
     def __init__(self, get_response):
@@ -19,9 +20,13 @@ class TenantMiddleware:
             request.tenant = None
             return self.get_response(request)
 
-        try:
-            request.tenant = Center.objects.get(sub_domain=subdomain)
-        except ObjectDoesNotExist:
-            raise Http404("Center not found for this subdomain")
+        center = get_cached_tenant(subdomain)
+        if center is None:
+            try:
+                center = Center.objects.select_related('governorate', 'delegation').get(sub_domain=subdomain)
+            except ObjectDoesNotExist:
+                raise Http404("Center not found for this subdomain")
+            set_cached_tenant(center)
+        request.tenant = center
 
         return self.get_response(request)
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0030_userprofile_admin_accord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped to invalidate role claims in issued JWTs'),
+        ),
+    ]
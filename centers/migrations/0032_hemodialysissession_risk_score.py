@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0031_userprofile_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hemodialysissession',
+            name='risk_model_version',
+            field=models.CharField(blank=True, help_text='Model version that produced the score', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='hemodialysissession',
+            name='risk_prediction',
+            field=models.CharField(blank=True, help_text='Predicted class from the hemodialysis model', max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='hemodialysissession',
+            name='risk_probability',
+            field=models.JSONField(blank=True, help_text='Class probabilities from the hemodialysis model', null=True),
+        ),
+        migrations.AddField(
+            model_name='hemodialysissession',
+            name='risk_scored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
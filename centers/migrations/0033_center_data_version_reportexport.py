@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-18 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('centers', '0032_hemodialysissession_risk_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='center',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped whenever data shown in the center report changes'),
+        ),
+        migrations.CreateModel(
+            name='ReportExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('data_version', models.PositiveIntegerField(help_text='Center data version the report was generated from')),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('center', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_exports', to='centers.center')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'centers_reportexport',
+                'indexes': [models.Index(fields=['center', 'data_version', 'status'], name='centers_rep_center__601d4e_idx')],
+            },
+        ),
+    ]
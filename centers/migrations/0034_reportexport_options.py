@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0033_center_data_version_reportexport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportexport',
+            name='options_key',
+            field=models.CharField(blank=True, help_text='Canonical period/sections of the report', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='reportexport',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
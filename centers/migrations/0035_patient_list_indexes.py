@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0034_reportexport_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['center', 'id'], name='centers_pat_center__170a04_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['center', 'status', 'id'], name='centers_pat_center__5f8c15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['center', 'entry_date'], name='centers_pat_center__05b85a_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0035_patient_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hemodialysissession',
+            index=models.Index(fields=['medical_activity', 'date_of_session'], name='centers_hem_medical_80b41c_idx'),
+        ),
+    ]
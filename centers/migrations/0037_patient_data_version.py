@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0036_hemodialysissession_activity_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='data_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped whenever the patient or their medical activity changes; used as ETag'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0037_patient_data_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='machine',
+            index=models.Index(fields=['center', 'functional'], name='centers_mac_center__302a06_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 15:05
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+def normalize_label(text):
+    # Frozen copy of centers.utils.normalize_label as of this migration
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', stripped.lower()).strip()
+
+
+def fill_normalized_label(apps, schema_editor):
+    Center = apps.get_model('centers', 'Center')
+    centers = list(Center.objects.only('id', 'label'))
+    for center in centers:
+        center.normalized_label = normalize_label(center.label)
+    Center.objects.bulk_update(centers, ['normalized_label'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('centers', '0038_machine_center_functional_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='center',
+            name='normalized_label',
+            field=models.CharField(blank=True, editable=False, help_text='Accent-free lowercase label used for search', max_length=100),
+        ),
+        migrations.RunPython(fill_normalized_label, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='center',
+            index=models.Index(fields=['normalized_label'], name='centers_center_nlabel_prefix', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='center',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['normalized_label'], name='centers_center_nlabel_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
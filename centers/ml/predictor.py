@@ -1,13 +1,24 @@
 import os
+import hashlib
+import logging
+import threading
+import time
 import joblib
-import pandas as pd  # ✅ Use pandas for correct input format
+import warnings
 import numpy as np
+from django.conf import settings
+from centers.cache import prediction_cache
+
+logger = logging.getLogger(__name__)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, 'hemodialysis_predictor.pkl')
 
-# Load model only once
-_model = joblib.load(MODEL_PATH)
+# Model is loaded on first use (or by preload_model) and reloaded when the pickle on disk changes
+_model = None
+_model_signature = None
+_last_check = 0.0
+_model_lock = threading.Lock()
 
 # Define the feature names in the exact order used during model training
 FEATURE_COLUMNS = [
@@ -18,98 +29,271 @@ FEATURE_COLUMNS = [
 ]
 
 
-def prepare_features(data):
-    # Map incoming keys to model feature names exactly
-    feature_map = {
-        'age': 'Age',
-        'gender': 'Gender',
-        'weight': 'Weight',
-        'diabetes': 'Diabetes',
-        'hypertension': 'Hypertension',
-        'pre_dialysis_bp': 'Pre-Dialysis Blood Pressure',
-        'during_dialysis_bp': 'During-Dialysis Blood Pressure',
-        'post_dialysis_bp': 'Post-Dialysis Blood Pressure',
-        'heart_rate': 'Heart Rate',
-        'creatinine': 'Creatinine',
-        'urea': 'Urea',
-        'potassium': 'Potassium',
-        'hemoglobin': 'Hemoglobin',
-        'hematocrit': 'Hematocrit',
-        'albumin': 'Albumin',
-        'dialysis_duration': 'Dialysis Duration (hours)',
-        'dialysis_frequency': 'Dialysis Frequency (per week)',
-        'urr': 'URR',
-        'urine_output': 'Urine Output (ml/day)',
-        'dry_weight': 'Dry Weight (kg)',
-        'fluid_removal_rate': 'Fluid Removal Rate (ml/hour)',
-        'disease_severity': 'Disease Severity',
-        'kt_v': 'Kt/V Category',
-        # For one-hot encoded features, use 0 or 1 flags as needed
-        'kidney_failure_cause_hypertension': 'Kidney Failure Cause_Hypertension',
-        'kidney_failure_cause_other': 'Kidney Failure Cause_Other',
-        'dialysate_composition_standard': 'Dialysate Composition_Standard',
-        'vascular_access_type_fistula': 'Vascular Access Type_Fistula',
-        'vascular_access_type_graft': 'Vascular Access Type_Graft',
-        'dialyzer_type_low_flux': 'Dialyzer Type_Low-flux',
-    }
+# Map incoming keys to model feature names exactly; the column order is the order used during model training
+FEATURE_MAP = {
+    'age': 'Age',
+    'gender': 'Gender',
+    'weight': 'Weight',
+    'diabetes': 'Diabetes',
+    'hypertension': 'Hypertension',
+    'pre_dialysis_bp': 'Pre-Dialysis Blood Pressure',
+    'during_dialysis_bp': 'During-Dialysis Blood Pressure',
+    'post_dialysis_bp': 'Post-Dialysis Blood Pressure',
+    'heart_rate': 'Heart Rate',
+    'creatinine': 'Creatinine',
+    'urea': 'Urea',
+    'potassium': 'Potassium',
+    'hemoglobin': 'Hemoglobin',
+    'hematocrit': 'Hematocrit',
+    'albumin': 'Albumin',
+    'dialysis_duration': 'Dialysis Duration (hours)',
+    'dialysis_frequency': 'Dialysis Frequency (per week)',
+    'urr': 'URR',
+    'urine_output': 'Urine Output (ml/day)',
+    'dry_weight': 'Dry Weight (kg)',
+    'fluid_removal_rate': 'Fluid Removal Rate (ml/hour)',
+    'disease_severity': 'Disease Severity',
+    'kt_v': 'Kt/V Category',
+    # For one-hot encoded features, use 0 or 1 flags as needed
+    'kidney_failure_cause_hypertension': 'Kidney Failure Cause_Hypertension',
+    'kidney_failure_cause_other': 'Kidney Failure Cause_Other',
+    'dialysate_composition_standard': 'Dialysate Composition_Standard',
+    'vascular_access_type_fistula': 'Vascular Access Type_Fistula',
+    'vascular_access_type_graft': 'Vascular Access Type_Graft',
+    'dialyzer_type_low_flux': 'Dialyzer Type_Low-flux',
+}
+MODEL_FEATURES = list(FEATURE_MAP.values())
+
+# Upper bound on records accepted by predict_hemodialysis_batch
+MAX_BATCH_SIZE = 500
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_model():
+    """Return the loaded model, loading it on first call and reloading it when MODEL_PATH changes.
+
+    The file is stat'ed at most once every PREDICTOR_RELOAD_INTERVAL seconds (0 disables the check).
+    A failed reload keeps serving the previous model.
+    """
+    global _model, _model_signature, _last_check
+    interval = getattr(settings, 'PREDICTOR_RELOAD_INTERVAL', 30)
+    if _model is not None and (interval <= 0 or time.monotonic() - _last_check < interval):
+        return _model
+
+    with _model_lock:
+        now = time.monotonic()
+        if _model is not None and (interval <= 0 or now - _last_check < interval):
+            return _model
+        _last_check = now
+        try:
+            signature = _file_signature(MODEL_PATH)
+            if _model is None or signature != _model_signature:
+                model = joblib.load(MODEL_PATH, mmap_mode=getattr(settings, 'PREDICTOR_MMAP_MODE', None))
+                if _model is not None:
+                    logger.info("Reloaded hemodialysis model from %s (version %s)", MODEL_PATH, signature)
+                _model, _model_signature = model, signature
+        except Exception:
+            if _model is None:
+                raise
+            logger.exception("Failed to reload hemodialysis model from %s, keeping version %s",
+                             MODEL_PATH, _model_signature)
+        return _model
+
+
+def model_version():
+    """Identifier of the currently loaded model (file mtime and size), or None before the first load."""
+    signature = _model_signature
+    return f"{signature[0]}-{signature[1]}" if signature else None
 
+
+def preload_model():
+    """Load the model eagerly, e.g. in the gunicorn master so workers share its pages copy-on-write."""
+    get_model()
+    logger.info("Preloaded hemodialysis model (version %s)", model_version())
+
+
+def prepare_features(data):
     # Initialize dictionary with keys = model features, default 0 or None
-    prepared = {col: 0 for col in feature_map.values()}
+    prepared = {col: 0 for col in MODEL_FEATURES}
 
     # Fill prepared dict from data using the map
-    for input_key, model_key in feature_map.items():
+    for input_key, model_key in FEATURE_MAP.items():
         if input_key in data:
             prepared[model_key] = data[input_key]
 
     return prepared
+# Lookup tables for categorical inputs; unknown values encode to 0
+GENDER_MAP = {
+    'male': 1,
+    'female': 0
+}
+YES_NO_MAP = {
+    'yes': 1,
+    'no': 0
+}
+SEVERITY_MAP = {
+    'mild': 0,
+    'moderate': 1,
+    'severe': 2
+}
+CATEGORICAL_MAPS = {
+    'gender': GENDER_MAP,
+    'diabetes': YES_NO_MAP,
+    'hypertension': YES_NO_MAP,
+    'disease_severity': SEVERITY_MAP,
+}
+
+
 def encode_categorical_features(data):
     # Encode Gender
-    gender_map = {
-        'male': 1,
-        'female': 0
-    }
     if 'gender' in data:
-        data['gender'] = gender_map.get(data['gender'].lower(), 0)  # default 0 if unknown
+        data['gender'] = GENDER_MAP.get(data['gender'].lower(), 0)  # default 0 if unknown
 
     # Encode Diabetes (if string)
-    diabetes_map = {
-        'yes': 1,
-        'no': 0
-    }
     if 'diabetes' in data:
-        data['diabetes'] = diabetes_map.get(str(data['diabetes']).lower(), 0)
+        data['diabetes'] = YES_NO_MAP.get(str(data['diabetes']).lower(), 0)
 
     # Encode Hypertension similarly
-    hypertension_map = {
-        'yes': 1,
-        'no': 0
-    }
     if 'hypertension' in data:
-        data['hypertension'] = hypertension_map.get(str(data['hypertension']).lower(), 0)
+        data['hypertension'] = YES_NO_MAP.get(str(data['hypertension']).lower(), 0)
 
     # Similarly for Disease Severity if categorical strings used
-    severity_map = {
-        'mild': 0,
-        'moderate': 1,
-        'severe': 2
-    }
     if 'disease_severity' in data:
-        data['disease_severity'] = severity_map.get(str(data['disease_severity']).lower(), 0)
+        data['disease_severity'] = SEVERITY_MAP.get(str(data['disease_severity']).lower(), 0)
 
     # Add other encodings if needed
 
     return data
+
+
+class FeatureEncoder:
+    """Encodes request dicts straight into a float64 matrix in FEATURE_MAP order, without pandas.
+
+    Column positions and categorical lookup tables are resolved once at construction, so encoding
+    a record is a single pass over the feature list writing into a preallocated array.
+    """
+
+    def __init__(self, feature_map=None):
+        feature_map = FEATURE_MAP if feature_map is None else feature_map
+        self.input_keys = tuple(feature_map)
+        self.columns = tuple(feature_map.values())
+        self.width = len(self.input_keys)
+        self._fields = tuple(
+            (position, key, CATEGORICAL_MAPS.get(key)) for position, key in enumerate(self.input_keys)
+        )
+
+    def encode_into(self, data, out):
+        """Write one record into the 1-D array `out`, raising ValueError on bad input."""
+        if not isinstance(data, dict):
+            raise ValueError("Each record must be an object.")
+        for position, key, lookup in self._fields:
+            if key not in data:
+                out[position] = 0.0
+                continue
+            value = data[key]
+            if lookup is not None:
+                value = lookup.get(str(value).lower(), 0)
+            try:
+                out[position] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for '{key}': {value!r}")
+        return out
+
+    def encode(self, data):
+        """Return a (1, width) matrix for a single record."""
+        matrix = np.empty((1, self.width), dtype=np.float64)
+        self.encode_into(data, matrix[0])
+        return matrix
+
+    def encode_many(self, records):
+        """Return (matrix, valid_indices, errors) where errors maps record index to a message."""
+        matrix = np.empty((len(records), self.width), dtype=np.float64)
+        valid_indices = []
+        errors = {}
+        for index, record in enumerate(records):
+            try:
+                self.encode_into(record, matrix[len(valid_indices)])
+                valid_indices.append(index)
+            except ValueError as e:
+                errors[index] = str(e)
+        return matrix[:len(valid_indices)], valid_indices, errors
+
+
+_encoder = FeatureEncoder()
+
+
+def run_model(model, features):
+    """Return (predictions, probabilities or None) for a feature matrix.
+
+    The model was fitted on a DataFrame and FeatureEncoder feeds it plain arrays in the same column order,
+    so sklearn's feature-name warning is silenced for these calls only.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names', category=UserWarning)
+        predictions = model.predict(features)
+        probabilities = model.predict_proba(features) if hasattr(model, 'predict_proba') else None
+    return predictions, probabilities
+
+
+def _prediction_key(features):
+    return f"{model_version()}:{hashlib.blake2b(features.tobytes(), digest_size=16).hexdigest()}"
+
+
 def predict_hemodialysis(data):
     try:
-        data = encode_categorical_features(data)
-        prepared_features = prepare_features(data)
-        input_df = pd.DataFrame([prepared_features])
-        prediction = _model.predict(input_df)
-        probability = _model.predict_proba(input_df) if hasattr(_model, 'predict_proba') else None
-
-        return {
-            "prediction": prediction[0],
+        features = _encoder.encode(data)
+        model = get_model()
+        key = _prediction_key(features)
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+
+        prediction, probability = run_model(model, features)
+
+        result = {
+            "prediction": prediction[0].item() if hasattr(prediction[0], 'item') else prediction[0],
             "probability": probability[0].tolist() if probability is not None else None
         }
+        prediction_cache.set(key, result)
+        return dict(result)
     except Exception as e:
-        raise ValueError(f"Prediction failed: {e}")
\ No newline at end of file
+        raise ValueError(f"Prediction failed: {e}")
+
+
+def score_records(records):
+    """Encode and score `records` in one vectorized pass, without a batch size limit.
+
+    Returns one result per record, in input order: either
+    {"index", "prediction", "probability"} or {"index", "error"} for rows that failed validation.
+    """
+    results = [None] * len(records)
+    matrix, valid_indices, errors = _encoder.encode_many(records)
+    for index, message in errors.items():
+        results[index] = {"index": index, "error": message}
+
+    if valid_indices:
+        try:
+            model = get_model()
+            predictions, probabilities = run_model(model, matrix)
+            predictions = predictions.tolist()
+            probabilities = probabilities.tolist() if probabilities is not None else None
+        except Exception as e:
+            raise ValueError(f"Prediction failed: {e}")
+        for position, index in enumerate(valid_indices):
+            results[index] = {
+                "index": index,
+                "prediction": predictions[position],
+                "probability": probabilities[position] if probabilities is not None else None,
+            }
+    return results
+
+
+def predict_hemodialysis_batch(records):
+    """Score many API records with a single predict/predict_proba call (see score_records)."""
+    if len(records) > MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size exceeds the maximum of {MAX_BATCH_SIZE} records.")
+    return score_records(records)
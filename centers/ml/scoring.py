@@ -0,0 +1,116 @@
+import logging
+from django.db.models import F
+from django.utils import timezone
+from centers.models import HemodialysisSession, Patient
+from .predictor import MAX_BATCH_SIZE, get_model, model_version, score_records
+
+logger = logging.getLogger(__name__)
+
+# Session vitals that map one-to-one onto predictor input keys
+SESSION_VITALS = [
+    'pre_dialysis_bp', 'during_dialysis_bp', 'post_dialysis_bp', 'heart_rate', 'creatinine', 'urea',
+    'potassium', 'hemoglobin', 'hematocrit', 'albumin', 'kt_v', 'urine_output', 'dry_weight',
+    'fluid_removal_rate', 'dialysis_duration',
+]
+PATIENT_PREFIX = 'medical_activity__patient__'
+PATIENT_FIELDS = ['age', 'weight', 'gender', 'diabetes', 'hypertension']
+
+# Everything needed to build a feature row, fetched with one joined values() query
+SESSION_FEATURE_FIELDS = (
+    ['id', 'vascular_access_type', 'dialyzer_type', 'severity_of_case']
+    + SESSION_VITALS
+    + [PATIENT_PREFIX + field for field in PATIENT_FIELDS]
+)
+RISK_FIELDS = ['risk_prediction', 'risk_probability', 'risk_model_version', 'risk_scored_at']
+
+GENDER_CODES = {'M': 'male', 'F': 'female'}
+
+
+def session_record(row):
+    """Translate a SESSION_FEATURE_FIELDS row into the predictor's input keys; missing values are left out."""
+    record = {key: row[key] for key in SESSION_VITALS if row[key] is not None}
+    for field in ('age', 'weight'):
+        if row[PATIENT_PREFIX + field] is not None:
+            record[field] = row[PATIENT_PREFIX + field]
+    gender = GENDER_CODES.get(row[PATIENT_PREFIX + 'gender'])
+    if gender:
+        record['gender'] = gender
+    record['diabetes'] = 'yes' if row[PATIENT_PREFIX + 'diabetes'] else 'no'
+    record['hypertension'] = 'yes' if row[PATIENT_PREFIX + 'hypertension'] else 'no'
+    if row['severity_of_case']:
+        record['disease_severity'] = row['severity_of_case'].lower()
+    record['vascular_access_type_fistula'] = int(row['vascular_access_type'] == 'Fistula')
+    record['vascular_access_type_graft'] = int(row['vascular_access_type'] == 'Graft')
+    record['dialyzer_type_low_flux'] = int(row['dialyzer_type'] == 'Low')
+    return record
+
+
+def stored_score(session):
+    """Persisted score of `session` as an API dict, or None when it is missing or from another model version."""
+    if session.risk_scored_at is None:
+        return None
+    # model_version() is None until this process has loaded the model
+    get_model()
+    if session.risk_model_version != model_version():
+        return None
+    return {
+        'session_id': session.pk,
+        'prediction': session.risk_prediction,
+        'probability': session.risk_probability,
+        'model_version': session.risk_model_version,
+        'scored_at': session.risk_scored_at,
+    }
+
+
+def score_sessions(queryset, persist=True):
+    """Score every session in `queryset` in a single vectorized pass and optionally persist the results.
+
+    Returns a list of dicts with session_id plus either the score fields or an error message.
+    """
+    rows = list(queryset.values(*SESSION_FEATURE_FIELDS))
+    if not rows:
+        return []
+
+    get_model()
+    version = model_version()
+    scored_at = timezone.now()
+    results = score_records([session_record(row) for row in rows])
+
+    scores = []
+    to_update = []
+    for row, result in zip(rows, results):
+        if 'error' in result:
+            scores.append({'session_id': row['id'], 'error': result['error']})
+            continue
+        score = {
+            'session_id': row['id'],
+            'prediction': str(result['prediction']),
+            'probability': result['probability'],
+            'model_version': version,
+            'scored_at': scored_at,
+        }
+        scores.append(score)
+        to_update.append(HemodialysisSession(
+            pk=row['id'],
+            risk_prediction=score['prediction'],
+            risk_probability=score['probability'],
+            risk_model_version=version,
+            risk_scored_at=scored_at,
+        ))
+
+    if persist and to_update:
+        HemodialysisSession.objects.bulk_update(to_update, RISK_FIELDS, batch_size=500)
+        # bulk_update sends no signals; scores show up in the session lists, so their ETags must change
+        Patient.objects.filter(
+            medical_activity__hemodialysis_sessions__in=[session.pk for session in to_update]
+        ).update(data_version=F('data_version') + 1)
+    logger.info("Scored %s sessions (%s errors) with model %s", len(rows), len(rows) - len(to_update), version)
+    return scores
+
+
+def score_sessions_in_chunks(queryset, chunk_size=MAX_BATCH_SIZE, persist=True):
+    """Score `queryset` in id order, at most `chunk_size` sessions per vectorized pass; yields each chunk's results."""
+    session_ids = list(queryset.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(session_ids), chunk_size):
+        chunk = session_ids[start:start + chunk_size]
+        yield score_sessions(HemodialysisSession.objects.filter(pk__in=chunk), persist=persist)
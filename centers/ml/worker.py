@@ -0,0 +1,64 @@
+import logging
+import queue
+import threading
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# In-process scoring queue: session ids are scored by a single daemon thread in batches
+_queue = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _next_batch(source, batch_size, linger):
+    """Block for one session id, then collect more until `batch_size` ids or `linger` seconds without a new one."""
+    received = [source.get()]
+    # Give concurrent saves a moment to join the batch
+    try:
+        while len(received) < batch_size:
+            received.append(source.get(timeout=linger))
+    except queue.Empty:
+        pass
+    return received
+
+
+def _run():
+    from centers.models import HemodialysisSession
+    from .scoring import score_sessions
+
+    batch_size = getattr(settings, 'SESSION_SCORING_BATCH_SIZE', 100)
+    linger = getattr(settings, 'SESSION_SCORING_LINGER', 0.5)
+    while True:
+        received = _next_batch(_queue, batch_size, linger)
+        session_ids = set(received)
+
+        close_old_connections()
+        try:
+            score_sessions(HemodialysisSession.objects.filter(pk__in=session_ids))
+        except Exception:
+            logger.exception("Background scoring failed for sessions %s", sorted(session_ids))
+        finally:
+            close_old_connections()
+            for _ in received:
+                _queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='session-scoring', daemon=True)
+            _worker.start()
+
+
+def enqueue_session_scoring(session_id):
+    """Queue a saved session for background risk scoring; scores land in the session's risk_* columns."""
+    if not getattr(settings, 'SESSION_SCORING_ENABLED', True):
+        return
+    _ensure_worker()
+    _queue.put(session_id)
+    logger.debug("Queued session %s for background scoring", session_id)
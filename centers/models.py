@@ -2,8 +2,11 @@ import logging
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
+from django.contrib.postgres.indexes import GinIndex
 import random
 import string
+from .cache import set_cached_token_version
+from .utils import normalize_label
 logger = logging.getLogger(__name__)
 
 class Center(models.Model):
@@ -36,10 +39,28 @@ class Center(models.Model):
     code_type_hemo = models.CharField(max_length=10, choices=CODE_TYPE_HEMO_CHOICES, blank=True)
     name_type_hemo = models.CharField(max_length=30, choices=NAME_TYPE_HEMO_CHOICES, blank=True)
     center_code = models.IntegerField(null=True)
+    data_version = models.PositiveIntegerField(default=0, help_text="Bumped whenever data shown in the center report changes")
+    normalized_label = models.CharField(max_length=100, blank=True, editable=False, help_text="Accent-free lowercase label used for search")
+
+    class Meta:
+        indexes = [
+            # Prefix search (LIKE 'x%') and substring search (LIKE '%x%') on the normalized label
+            models.Index(fields=['normalized_label'], name='centers_center_nlabel_prefix', opclasses=['varchar_pattern_ops']),
+            GinIndex(fields=['normalized_label'], name='centers_center_nlabel_trgm', opclasses=['gin_trgm_ops']),
+        ]
 
     def save(self, *args, **kwargs):
         self.sub_domain = self.sub_domain.lower().replace(" ", "-")
+        self.normalized_label = normalize_label(self.label)
+        is_new = self._state.adding
+        if not is_new:
+            # Increment in the UPDATE itself: cached tenant instances hold old versions that must not be written back
+            self.data_version = models.F('data_version') + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'data_version'}
         super().save(*args, **kwargs)
+        if not is_new:
+            self.refresh_from_db(fields=['data_version'])
 
     def __str__(self):
         return f"{self.label} ({self.sub_domain}.localhost:8000)"
@@ -223,9 +244,15 @@ class Patient(Person):
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True)
     hypertension = models.BooleanField(default=False, help_text="Indicates if the patient has hypertension")
     diabetes = models.BooleanField(default=False, help_text="Indicates if the patient has diabetes")
+    data_version = models.PositiveIntegerField(default=0, help_text="Bumped whenever the patient or their medical activity changes; used as ETag")
 
     class Meta:
         db_table = 'centers_patient'
+        indexes = [
+            models.Index(fields=['center', 'id']),
+            models.Index(fields=['center', 'status', 'id']),
+            models.Index(fields=['center', 'entry_date']),
+        ]
 
     def clean(self):
         if self.previously_dialysed and not self.date_first_dia:
@@ -235,7 +262,12 @@ class Patient(Person):
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        if not is_new:
+            # Increment in the UPDATE itself instead of writing back a possibly stale in-memory version
+            self.data_version = models.F('data_version') + 1
         super().save(*args, **kwargs)
+        if not is_new:
+            self.refresh_from_db(fields=['data_version'])
         if is_new:
             try:
                 MedicalActivity.objects.create(
@@ -281,6 +313,9 @@ class Machine(models.Model):
     membrane = models.ForeignKey(Membrane, on_delete=models.CASCADE)
     filtre = models.ForeignKey(Filtre, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [models.Index(fields=['center', 'functional'])]
+
     def __str__(self):
         return f"{self.brand} ({self.center.label})"
     
@@ -372,6 +407,7 @@ class UserProfile(models.Model):
     verification_code = models.CharField(max_length=6, blank=True, null=True)
     is_verified = models.BooleanField(default=False)
     admin_accord = models.BooleanField(default=False)
+    token_version = models.PositiveIntegerField(default=0, help_text="Bumped to invalidate role claims in issued JWTs")
 
     def generate_verification_code(self):
         """Generate a 6-digit verification code."""
@@ -397,15 +433,35 @@ class UserProfile(models.Model):
         if self.is_verified:
             self.admin_accord = True
             self.save()
+            self.revoke_tokens()
             logger.info("Admin accord granted for user %s", self.user.username)
             return True
         logger.warning("Cannot grant admin accord for unverified user %s", self.user.username)
         return False
 
+    def save(self, *args, **kwargs):
+        """Save the profile; a plain save() of an existing row never writes token_version.
+
+        token_version is owned by revoke_tokens(), which increments it in the database with F(). A full save of
+        an existing profile is turned into an update_fields save of every other field, so an instance loaded
+        before a revocation cannot restore the old version. Name token_version in update_fields to write it.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'token_version']
+        super().save(*args, **kwargs)
+
     def has_role_privileges(self):
         """Check if the user has access to role privileges."""
         return self.is_verified and self.admin_accord
 
+    def revoke_tokens(self):
+        """Invalidate role claims in JWTs issued before now by bumping the token version."""
+        UserProfile.objects.filter(pk=self.pk).update(token_version=models.F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        set_cached_token_version(self.user_id, self.token_version)
+        logger.info("Token version for user %s bumped to %s", self.user_id, self.token_version)
+
     def __str__(self):
         return f"Verification profile for {self.user.username}"
 
@@ -454,9 +510,14 @@ class HemodialysisSession(models.Model):
     severity_of_case = models.CharField(
         max_length=20, choices=SEVERITY_CHOICES, null=True, blank=True, help_text="Severity of the case"
     )
+    risk_prediction = models.CharField(max_length=50, null=True, blank=True, help_text="Predicted class from the hemodialysis model")
+    risk_probability = models.JSONField(null=True, blank=True, help_text="Class probabilities from the hemodialysis model")
+    risk_model_version = models.CharField(max_length=50, null=True, blank=True, help_text="Model version that produced the score")
+    risk_scored_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         db_table = 'centers_hemodialysissession'
+        indexes = [models.Index(fields=['medical_activity', 'date_of_session'])]
 
     def clean(self):
         if self.method.type_hemo != self.type:
@@ -494,4 +555,36 @@ class HemodialysisSession(models.Model):
             raise ValidationError({'dialysis_duration': 'Dialysis duration must be between 1 and 8 hours.'})
 
     def __str__(self):
-        return f"{self.type.name} Session for {self.medical_activity.patient} on {self.date_of_session}"
\ No newline at end of file
+        return f"{self.type.name} Session for {self.medical_activity.patient} on {self.date_of_session}"
+
+
+class ReportExport(models.Model):
+    PENDING = 'PENDING'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    center = models.ForeignKey(Center, on_delete=models.CASCADE, related_name='report_exports')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    data_version = models.PositiveIntegerField(help_text="Center data version the report was generated from")
+    options_key = models.CharField(max_length=200, blank=True, help_text="Canonical period/sections of the report")
+    params = models.JSONField(default=dict, blank=True)
+    file_path = models.CharField(max_length=500, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'centers_reportexport'
+        indexes = [models.Index(fields=['center', 'data_version', 'status'])]
+
+    def __str__(self):
+        return f"Report export {self.pk} for {self.center.label} ({self.status})"
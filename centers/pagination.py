@@ -0,0 +1,81 @@
+# centers/pagination.py
+import base64
+import json
+from datetime import date, datetime
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def is_paginated(params):
+    """List endpoints keep returning a plain array unless the client opts in with limit= or cursor=."""
+    return 'limit' in params or 'cursor' in params
+
+
+def parse_limit(params, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    try:
+        limit = int(params.get('limit', default))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer.")
+    if limit < 1:
+        raise ValueError("limit must be positive.")
+    return min(limit, maximum)
+
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor.")
+    return values
+
+
+def _after(ordering, values):
+    """Q selecting rows strictly after `values` in `ordering` (field names, '-' prefix for descending)."""
+    condition = Q()
+    for position in reversed(range(len(ordering))):
+        field = ordering[position].lstrip('-')
+        lookup = 'lt' if ordering[position].startswith('-') else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[position]})
+        if position < len(ordering) - 1:
+            step |= Q(**{field: values[position]}) & condition
+        condition = step
+    return condition
+
+
+def keyset_page(queryset, params, ordering, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Return one page of a values() `queryset` ordered by `ordering`, resuming after params['cursor'].
+
+    The last key of `ordering` must be unique (usually 'id') and every key must be part of the selected
+    values. Returns (rows, next_cursor); next_cursor is None on the last page. Raises ValueError on bad params.
+    """
+    limit = parse_limit(params, default, maximum)
+    queryset = queryset.order_by(*ordering)
+    if params.get('cursor'):
+        queryset = queryset.filter(_after(ordering, decode_cursor(params['cursor'], len(ordering))))
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][key.lstrip('-')] for key in ordering])
+    return rows, next_cursor
+
+
+def select_fields(params, allowed, required=('id',)):
+    """Fields requested with ?fields=a,b (plus `required`), or all of `allowed`; raises ValueError on unknown names."""
+    if not params.get('fields'):
+        return list(allowed)
+    requested = [name.strip() for name in params['fields'].split(',') if name.strip()]
+    unknown = set(requested) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return list(required) + [name for name in requested if name not in required]
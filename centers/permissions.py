@@ -1,9 +1,149 @@
 import logging
+from collections import namedtuple
+from dataclasses import dataclass
+from django.contrib.auth.models import User
 from rest_framework.permissions import BasePermission
-from centers.models import AdministrativeStaff, MedicalStaff, ParamedicalStaff, TechnicalStaff, WorkerStaff, UserProfile
+from .cache import (
+    delete_principal_entry, get_cached_token_version, get_principal_entry, set_cached_token_version, set_principal_entry,
+)
 
 logger = logging.getLogger(__name__)
 
+# Reverse one-to-one accessors from User to each staff table, in the order RoleBasedPermission always checked them
+STAFF_RELATIONS = [
+    ('administrative_profile', 'Administrative'),
+    ('medical_profile', 'Medical'),
+    ('paramedical_profile', 'Paramedical'),
+    ('technical_profile', 'Technical'),
+    ('worker_profile', 'Worker'),
+]
+# get_user_role (views) has always probed technical staff first; users with several staff rows keep their role
+USER_ROLE_ORDER = ['Technical', 'Medical', 'Paramedical', 'Administrative', 'Worker']
+
+StaffRow = namedtuple('StaffRow', ['staff_type', 'staff_id', 'role', 'center_id'])
+
+PRINCIPAL_CACHE_KEY = 'principal:%s'
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Role, center and verification state of a user, resolved once per request."""
+    user_id: int
+    role: str = None
+    center_id: int = None
+    staff_type: str = None
+    staff_id: int = None
+    has_profile: bool = False
+    is_verified: bool = False
+    admin_accord: bool = False
+    # Every staff row of the user in STAFF_RELATIONS order; the fields above describe the first one
+    staff_rows: tuple = ()
+
+    def has_role_privileges(self):
+        return self.is_verified and self.admin_accord
+
+    def staff_row(self, order):
+        """First staff row whose type comes earliest in `order`, or None."""
+        rows = {row.staff_type: row for row in self.staff_rows}
+        return next((rows[staff_type] for staff_type in order if staff_type in rows), None)
+
+    def belongs_to(self, center_id, staff_type=None):
+        return any(row.center_id == center_id and staff_type in (None, row.staff_type) for row in self.staff_rows)
+
+    @classmethod
+    def from_claims(cls, user_id, token):
+        privileged = bool(token.get('has_role_privileges'))
+        staff_rows = ()
+        if token.get('staff_type'):
+            staff_rows = (StaffRow(token.get('staff_type'), token.get('staff_id'), token.get('role'), token.get('center_id')),)
+        return cls(
+            user_id=user_id,
+            role=token.get('role'),
+            center_id=token.get('center_id'),
+            staff_type=token.get('staff_type'),
+            staff_id=token.get('staff_id'),
+            has_profile=True,
+            is_verified=bool(token.get('is_verified', privileged)),
+            admin_accord=privileged,
+            staff_rows=staff_rows,
+        )
+
+
+def _load_principal(user_id):
+    fields = ['verification_profile__id', 'verification_profile__is_verified', 'verification_profile__admin_accord']
+    for relation, _ in STAFF_RELATIONS:
+        fields += [f'{relation}__id', f'{relation}__role', f'{relation}__center_id']
+    row = User.objects.filter(pk=user_id).values(*fields).first()
+    if row is None:
+        return Principal(user_id=user_id)
+
+    staff_rows = tuple(
+        StaffRow(staff_type, row[f'{relation}__id'], row[f'{relation}__role'], row[f'{relation}__center_id'])
+        for relation, staff_type in STAFF_RELATIONS if row[f'{relation}__id'] is not None
+    )
+    staff = {}
+    if staff_rows:
+        first = staff_rows[0]
+        staff = {'role': first.role, 'center_id': first.center_id, 'staff_type': first.staff_type, 'staff_id': first.staff_id}
+    return Principal(
+        user_id=user_id,
+        has_profile=row['verification_profile__id'] is not None,
+        is_verified=bool(row['verification_profile__is_verified']),
+        admin_accord=bool(row['verification_profile__admin_accord']),
+        staff_rows=staff_rows,
+        **staff,
+    )
+
+
+def resolve_principal(user):
+    """Return the Principal for `user` from the per-user cache, loading it with a single joined query on a miss."""
+    key = PRINCIPAL_CACHE_KEY % user.pk
+    principal = get_principal_entry(key)
+    if principal is None:
+        principal = _load_principal(user.pk)
+        set_principal_entry(key, principal)
+    return principal
+
+
+def invalidate_principal(user_id):
+    delete_principal_entry(PRINCIPAL_CACHE_KEY % user_id)
+
+
+def get_token_version(user_id):
+    """Return the current UserProfile.token_version for `user_id`, or None when the user has no profile."""
+    version = get_cached_token_version(user_id)
+    if version is None:
+        from .models import UserProfile
+        version = UserProfile.objects.filter(user_id=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            set_cached_token_version(user_id, version)
+    return version
+
+
+def add_principal_claims(token, user):
+    """Embed role, center and token version claims into a refresh token; access tokens derived from it inherit them."""
+    principal = resolve_principal(user)
+    token['role'] = principal.role
+    token['center_id'] = principal.center_id
+    token['staff_type'] = principal.staff_type
+    token['staff_id'] = principal.staff_id
+    token['is_verified'] = principal.is_verified
+    token['has_role_privileges'] = principal.has_role_privileges()
+    token['ver'] = get_token_version(user.pk)
+    return token
+
+
+def principal_from_request(request):
+    """Trust the role claims of a JWT whose `ver` matches the user's current token version, else resolve from the database."""
+    token = getattr(request, 'auth', None)
+    if token is not None and hasattr(token, 'get') and token.get('ver') is not None:
+        if token.get('ver') == get_token_version(request.user.pk):
+            return Principal.from_claims(request.user.pk, token)
+        logger.debug("Stale token claims for user %s (ver=%s), resolving from database",
+                     request.user.username, token.get('ver'))
+    return resolve_principal(request.user)
+
+
 class RoleBasedPermission(BasePermission):
     def has_permission(self, request, view):
         user = request.user.username if request.user else 'Anonymous'
@@ -28,41 +168,29 @@ class RoleBasedPermission(BasePermission):
             return False
         logger.debug("CHECK: Tenant resolved: %s (ID=%s)", tenant.label, tenant.id)
 
-        try:
-            user_profile = UserProfile.objects.get(user=request.user)
-            if not user_profile.has_role_privileges():
-                logger.warning("DENIED: User %s lacks role privileges (is_verified=%s, admin_accord=%s)",
-                              user, user_profile.is_verified, user_profile.admin_accord)
-                return False
-            logger.debug("CHECK: UserProfile found for %s: is_verified=%s, admin_accord=%s",
-                        user, user_profile.is_verified, user_profile.admin_accord)
-        except UserProfile.DoesNotExist:
+        principal = principal_from_request(request)
+        request.principal = principal
+
+        if not principal.has_profile:
             logger.error("DENIED: No UserProfile found for user %s", user)
             return False
+        if not principal.has_role_privileges():
+            logger.warning("DENIED: User %s lacks role privileges (is_verified=%s, admin_accord=%s)",
+                          user, principal.is_verified, principal.admin_accord)
+            return False
+        logger.debug("CHECK: UserProfile found for %s: is_verified=%s, admin_accord=%s",
+                    user, principal.is_verified, principal.admin_accord)
 
-        role = None
-        user_center = None
-        staff_models = [AdministrativeStaff, MedicalStaff, ParamedicalStaff, TechnicalStaff, WorkerStaff]
-
-        for model in staff_models:
-            try:
-                staff = model.objects.get(user=request.user)
-                role = staff.role
-                user_center = staff.center
-                logger.debug("CHECK: Found %s for user %s: role=%s, center=%s (ID=%s)",
-                            model.__name__, user, role, user_center.label, user_center.id)
-                break
-            except model.DoesNotExist:
-                logger.debug("CHECK: No %s found for user %s", model.__name__, user)
-                continue
-
-        if not role or not user_center:
+        role = principal.role
+        if not role or not principal.center_id:
             logger.error("DENIED: User %s has no assigned role or center", user)
             return False
+        logger.debug("CHECK: Found %s staff for user %s: role=%s, center ID=%s",
+                    principal.staff_type, user, role, principal.center_id)
 
-        if user_center.id != tenant.id:
-            logger.warning("DENIED: User %s attempted cross-center access (user_center=%s, ID=%s, tenant=%s, ID=%s)",
-                          user, user_center.label, user_center.id, tenant.label, tenant.id)
+        if principal.center_id != tenant.id:
+            logger.warning("DENIED: User %s attempted cross-center access (user_center ID=%s, tenant=%s, ID=%s)",
+                          user, principal.center_id, tenant.label, tenant.id)
             return False
         logger.debug("CHECK: Tenant matches user center: %s (ID=%s)", tenant.label, tenant.id)
 
@@ -87,4 +215,4 @@ class RoleBasedPermission(BasePermission):
 
         logger.warning("DENIED: Unauthorized access attempt by user %s (role=%s) to %s %s",
                       user, role, request.method, request.path)
-        return False
\ No newline at end of file
+        return False
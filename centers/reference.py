@@ -0,0 +1,72 @@
+# centers/reference.py
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from .cache import bump_reference_version, get_reference_version, reference_cache
+from .etags import matches
+from .models import (
+    Governorate, Delegation, TypeHemo, MethodHemo, TransmittableDiseaseRef, ComplicationsRef, TransplantationRef,
+    Membrane, Filtre,
+)
+
+
+def _wrapped(rows):
+    return {'success': True, 'data': rows}
+
+
+# Table name -> (model, payload builder); payloads match what the list endpoints returned before caching
+REFERENCE_TABLES = {
+    'governorates': (Governorate, lambda: _wrapped([
+        {'id': row['id'], 'label': row['name'], 'code': row['code']}
+        for row in Governorate.objects.values('id', 'name', 'code')
+    ])),
+    'delegations': (Delegation, lambda: _wrapped([
+        {'id': row['id'], 'label': row['name'], 'code': row['code'], 'governorate': row['governorate_id']}
+        for row in Delegation.objects.values('id', 'name', 'code', 'governorate_id')
+    ])),
+    'type_hemo': (TypeHemo, lambda: list(TypeHemo.objects.values('id', 'name'))),
+    'method_hemo': (MethodHemo, lambda: list(MethodHemo.objects.values('id', 'name', 'type_hemo_id'))),
+    'transmittable_disease_ref': (TransmittableDiseaseRef, lambda: list(
+        TransmittableDiseaseRef.objects.values('id', 'label_disease', 'type_of_transmission'))),
+    'complications_ref': (ComplicationsRef, lambda: list(ComplicationsRef.objects.values('id', 'label_complication'))),
+    'transplantation_ref': (TransplantationRef, lambda: list(
+        TransplantationRef.objects.values('id', 'label_transplantation'))),
+    'membranes': (Membrane, lambda: list(Membrane.objects.values('id', 'type'))),
+    'filtres': (Filtre, lambda: list(Filtre.objects.values('id', 'type', 'sterilisation'))),
+}
+
+
+def reference_tables_for(model):
+    return [name for name, (table_model, _) in REFERENCE_TABLES.items() if table_model is model]
+
+
+def get_reference(name):
+    """Return (json_bytes, etag) for a reference table, serializing it only when its version changed."""
+    version = get_reference_version(name)
+    entry = reference_cache.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+    _, build = REFERENCE_TABLES[name]
+    body = json.dumps(build(), cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    etag = '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    reference_cache.set(name, (version, body, etag))
+    return body, etag
+
+
+def invalidate_reference(name):
+    bump_reference_version(name)
+    reference_cache.delete(name)
+
+
+def reference_response(request, name):
+    """Serve a cached reference table; a matching If-None-Match gets an empty 304."""
+    body, etag = get_reference(name)
+    if matches(request, etag):
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # Authenticated data: browsers may keep it but must revalidate before every reuse
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,507 @@
+# centers/reports.py
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from .models import (
+    Patient, HemodialysisSession, TransmittableDisease, Complications, Transplantation, MedicalStaff,
+    ParamedicalStaff, AdministrativeStaff, TechnicalStaff, WorkerStaff, Machine, ReportExport,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'REPORT_EXPORT_WORKERS', 2),
+                               thread_name_prefix='report-export')
+
+
+# Report sections, selectable with ?sections=staff,activity,...
+REPORT_SECTIONS = frozenset(['center', 'staff', 'equipment', 'activity', 'morbidity', 'mortality'])
+
+
+def _no_progress(percent):
+    pass
+
+
+def report_filename(center):
+    return f"center_report_{center.label}_{datetime.now().strftime('%Y-%m-%d')}.pdf"
+
+
+@dataclass(frozen=True)
+class ReportOptions:
+    """Period and sections selected for a report; dated rows outside [date_from, date_to] are left out."""
+    date_from: date = None
+    date_to: date = None
+    sections: frozenset = REPORT_SECTIONS
+
+    @classmethod
+    def from_params(cls, params):
+        """Build options from request parameters, raising ValueError on malformed dates or unknown sections."""
+        try:
+            date_from = datetime.strptime(params['date_from'], '%Y-%m-%d').date() if params.get('date_from') else None
+            date_to = datetime.strptime(params['date_to'], '%Y-%m-%d').date() if params.get('date_to') else None
+        except (TypeError, ValueError):
+            raise ValueError("Dates must use the YYYY-MM-DD format.")
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("date_from must be on or before date_to.")
+
+        sections = REPORT_SECTIONS
+        if params.get('sections'):
+            sections = frozenset(name.strip() for name in params['sections'].split(',') if name.strip())
+            unknown = sections - REPORT_SECTIONS
+            if unknown:
+                raise ValueError(f"Unknown report sections: {', '.join(sorted(unknown))}.")
+        return cls(date_from=date_from, date_to=date_to, sections=sections)
+
+    def filter_period(self, queryset, field):
+        if self.date_from:
+            queryset = queryset.filter(**{f'{field}__gte': self.date_from})
+        if self.date_to:
+            queryset = queryset.filter(**{f'{field}__lte': self.date_to})
+        return queryset
+
+    def as_params(self):
+        """Inverse of from_params, stored on ReportExport jobs."""
+        return {
+            'date_from': self.date_from.isoformat() if self.date_from else '',
+            'date_to': self.date_to.isoformat() if self.date_to else '',
+            'sections': ','.join(sorted(self.sections)),
+        }
+
+    def cache_key(self):
+        """Canonical string identifying these options, used to reuse finished exports."""
+        return '|'.join([
+            self.date_from.isoformat() if self.date_from else '',
+            self.date_to.isoformat() if self.date_to else '',
+            ','.join(sorted(self.sections)),
+        ])
+
+
+def load_report_data(center, options=None, lazy_sessions=False):
+    """Fetch the selected report sections as values() rows, one query per section regardless of row count.
+
+    Only sections in `options.sections` are queried, and dated rows are limited to the options' period.
+    With lazy_sessions the (potentially huge) session rows are returned as a chunked iterator.
+    """
+    options = options or ReportOptions()
+    activity = {'medical_activity__patient__center': center}
+    data = {}
+    if 'staff' in options.sections:
+        data['administrative_staff'] = list(AdministrativeStaff.objects.filter(center=center).values('nom', 'prenom', 'cin', 'job_title'))
+        data['technical_staff'] = list(TechnicalStaff.objects.filter(center=center).values('nom', 'prenom', 'cin', 'qualification'))
+        data['medical_staff'] = list(MedicalStaff.objects.filter(center=center).values('nom', 'prenom', 'cin', 'cnom'))
+        data['paramedical_staff'] = list(ParamedicalStaff.objects.filter(center=center).values('nom', 'prenom', 'cin', 'qualification'))
+        data['worker_staff'] = list(WorkerStaff.objects.filter(center=center).values('nom', 'prenom', 'cin', 'job_title'))
+    if 'equipment' in options.sections:
+        data['machines'] = list(Machine.objects.filter(center=center).values(
+            'brand', 'functional', 'reserve', 'refurbished', 'nbre_hrs',
+            'membrane__type', 'filtre__type', 'filtre__sterilisation',
+        ))
+    if 'activity' in options.sections:
+        sessions = options.filter_period(HemodialysisSession.objects.filter(**activity), 'date_of_session').values(
+            'type__name', 'method__name', 'date_of_session', 'responsible_doc__nom', 'responsible_doc__prenom',
+            'pre_dialysis_bp', 'post_dialysis_bp', 'dialysis_duration', 'vascular_access_type', 'severity_of_case',
+        )
+        data['sessions'] = sessions.iterator(chunk_size=2000) if lazy_sessions else list(sessions)
+        data['transplantations'] = list(options.filter_period(Transplantation.objects.filter(**activity), 'date_operation').values(
+            'transplantation__label_transplantation', 'date_operation', 'notes',
+        ))
+    if 'morbidity' in options.sections:
+        data['diseases'] = list(options.filter_period(TransmittableDisease.objects.filter(**activity), 'date_of_contraction').values(
+            'disease__label_disease', 'disease__type_of_transmission', 'date_of_contraction',
+        ))
+        data['complications'] = list(options.filter_period(Complications.objects.filter(**activity), 'date_of_contraction').values(
+            'complication__label_complication', 'notes', 'date_of_contraction',
+        ))
+    if 'mortality' in options.sections:
+        # Patients carry no date of death, so the period does not apply to this section
+        data['deceased_patients'] = list(Patient.objects.filter(center=center, status='DECEASED').values(
+            'nom', 'prenom', 'cin', 'decease_note',
+        ))
+    return data
+
+
+# Shared ReportLab styles: built once at import instead of on every report and table
+_sample_styles = getSampleStyleSheet()
+TITLE_STYLE = ParagraphStyle(
+    name='ReportTitle',
+    fontSize=16,
+    fontName='Helvetica-Bold',
+    alignment=1,
+    spaceAfter=12,
+)
+SUBTITLE_STYLE = ParagraphStyle(
+    name='ReportSubtitle',
+    fontSize=12,
+    fontName='Helvetica-Bold',
+    textColor=colors.black,
+    leading=14,
+    spaceBefore=10,
+    spaceAfter=8,
+)
+NORMAL_STYLE = ParagraphStyle(name='ReportNormal', parent=_sample_styles['Normal'], fontSize=10)
+
+# Table templates; ReportLab copies the commands into each Table, so one instance serves every table
+DATA_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
+    ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
+    ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
+])
+KEY_VALUE_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 1, colors.black),
+    ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
+    ('ALIGN', (1,0), (1,-1), 'LEFT'),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+    ('LEFTPADDING', (0,0), (-1,-1), 6),
+    ('RIGHTPADDING', (0,0), (-1,-1), 6),
+    ('BACKGROUND', (0,0), (-1,-1), colors.white),
+    ('BACKGROUND', (0,0), (0,-1), colors.lightgrey),
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('BACKGROUND', (0,2), (-1,2), colors.lightgrey),
+    ('BACKGROUND', (0,4), (-1,4), colors.lightgrey),
+])
+PERSON_COLUMNS = [6*cm, 4*cm, 7*cm]
+SESSION_HEADER = ['Type', 'Method', 'Date', 'Doctor', 'Pre-BP', 'Post-BP', 'Duration', 'Access', 'Severity']
+SESSION_COLUMNS = [2.5*cm, 2.5*cm, 2.5*cm, 3.5*cm, 1.8*cm, 1.8*cm, 1.8*cm, 2*cm, 2*cm]
+
+# Section name -> (renderer, progress once rendered), in report order
+SECTION_RENDERERS = {}
+
+
+def report_section(name, progress):
+    """Register a generator `renderer(center, data)` yielding the flowables of a report section."""
+    def register(renderer):
+        SECTION_RENDERERS[name] = (renderer, progress)
+        return renderer
+    return register
+
+
+def data_table(header, rows, col_widths, empty_text, chunk_rows=None):
+    """Yield `rows` as tables under `header`, or `empty_text` when there are none.
+
+    With chunk_rows the rows are split into several small tables, which ReportLab lays out far faster
+    than one table it has to split across every page.
+    """
+    table_data = [header]
+    has_rows = False
+    for row in rows:
+        table_data.append(row)
+        if chunk_rows and len(table_data) > chunk_rows:
+            yield Table(table_data, colWidths=col_widths, style=DATA_TABLE_STYLE, repeatRows=1)
+            table_data = [header]
+            has_rows = True
+    if len(table_data) > 1:
+        yield Table(table_data, colWidths=col_widths, style=DATA_TABLE_STYLE, repeatRows=1)
+        has_rows = True
+    if not has_rows:
+        yield Paragraph(empty_text, NORMAL_STYLE)
+
+
+def _person_rows(staff_rows, details):
+    for staff in staff_rows:
+        yield [f"{staff['nom']} {staff['prenom']}", staff['cin'], details(staff)]
+
+
+def _format_number(value):
+    return f"{value:.1f}" if value is not None else 'N/A'
+
+
+@report_section('center', progress=10)
+def center_section(center, data):
+    yield Paragraph("Center Information", TITLE_STYLE)
+    center_data = [
+        ['Name', center.label],
+        ['Address', center.adresse or 'N/A'],
+        ['Delegation', center.delegation.name if center.delegation else 'N/A'],
+        ['Telephone', center.tel or 'N/A'],
+        ['Email', center.mail or 'N/A'],
+    ]
+    yield Table(center_data, colWidths=[5*cm, 12*cm], style=KEY_VALUE_TABLE_STYLE)
+    yield Spacer(1, 0.5*cm)
+
+
+@report_section('staff', progress=30)
+def staff_section(center, data):
+    yield Paragraph("Staff Members", TITLE_STYLE)
+
+    yield Paragraph("Administrative Staff", SUBTITLE_STYLE)
+    rows = list(_person_rows(data['administrative_staff'], lambda s: f"Job Title: {s['job_title']}"))
+    rows += _person_rows(data['technical_staff'], lambda s: f"Qualification: {s['qualification']}")
+    yield from data_table(['Name', 'CIN', 'Details'], rows, PERSON_COLUMNS, "No Administrative Staff recorded.")
+    yield Spacer(1, 0.3*cm)
+
+    yield Paragraph("Para & Medical Staff", SUBTITLE_STYLE)
+    rows = list(_person_rows(data['medical_staff'], lambda s: f"CNOM: {s['cnom']}"))
+    rows += _person_rows(data['paramedical_staff'], lambda s: f"Qualification: {s['qualification']}")
+    yield from data_table(['Name', 'CIN', 'Details'], rows, PERSON_COLUMNS, "No Para & Medical Staff recorded.")
+    yield Spacer(1, 0.3*cm)
+
+    yield Paragraph("Workers Staff", SUBTITLE_STYLE)
+    rows = _person_rows(data['worker_staff'], lambda s: f"Job Title: {s['job_title']}")
+    yield from data_table(['Name', 'CIN', 'Details'], rows, PERSON_COLUMNS, "No Workers Staff recorded.")
+    yield Spacer(1, 0.5*cm)
+
+
+@report_section('equipment', progress=40)
+def equipment_section(center, data):
+    yield Paragraph("Equipment", TITLE_STYLE)
+    rows = ([
+        machine['brand'],
+        'Yes' if machine['functional'] else 'No',
+        'Yes' if machine['reserve'] else 'No',
+        'Yes' if machine['refurbished'] else 'No',
+        str(machine['nbre_hrs']),
+        machine['membrane__type'],
+        f"{machine['filtre__type']} ({machine['filtre__sterilisation']})" if machine['filtre__sterilisation'] else machine['filtre__type'],
+    ] for machine in data['machines'])
+    yield from data_table(['Brand', 'Functional', 'Reserve', 'Refurbished', 'Hours', 'Membrane', 'Filtre'], rows,
+                          [3*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2*cm, 2.5*cm, 3*cm], "No machines recorded.")
+    yield Spacer(1, 0.5*cm)
+
+
+def session_row(session):
+    return [
+        session['type__name'],
+        session['method__name'],
+        session['date_of_session'].strftime('%Y-%m-%d'),
+        f"{session['responsible_doc__nom']} {session['responsible_doc__prenom']}",
+        _format_number(session['pre_dialysis_bp']),
+        _format_number(session['post_dialysis_bp']),
+        _format_number(session['dialysis_duration']),
+        session['vascular_access_type'] or 'N/A',
+        session['severity_of_case'] or 'N/A',
+    ]
+
+
+@report_section('activity', progress=70)
+def activity_section(center, data):
+    yield Paragraph("Activity", TITLE_STYLE)
+
+    yield Paragraph("Hemodialysis Sessions", SUBTITLE_STYLE)
+    rows = (session_row(session) for session in data['sessions'])
+    yield from data_table(SESSION_HEADER, rows, SESSION_COLUMNS, "No hemodialysis sessions recorded.",
+                          chunk_rows=getattr(settings, 'REPORT_TABLE_CHUNK_ROWS', 40))
+    yield Spacer(1, 0.3*cm)
+
+    yield Paragraph("Transplantations", SUBTITLE_STYLE)
+    rows = ([
+        transplantation['transplantation__label_transplantation'],
+        transplantation['date_operation'].strftime('%Y-%m-%d'),
+        transplantation['notes'] or 'No notes',
+    ] for transplantation in data['transplantations'])
+    yield from data_table(['Type', 'Date of Operation', 'Notes'], rows, [6*cm, 5*cm, 6*cm],
+                          "No transplantations recorded.")
+    yield Spacer(1, 0.5*cm)
+
+
+@report_section('morbidity', progress=85)
+def morbidity_section(center, data):
+    yield Paragraph("Morbidity", TITLE_STYLE)
+
+    diseases = data['diseases']
+    yield Paragraph("Transmittable Diseases", SUBTITLE_STYLE)
+    rows = ([
+        disease['disease__label_disease'],
+        disease['disease__type_of_transmission'],
+        disease['date_of_contraction'].strftime('%Y-%m-%d'),
+    ] for disease in diseases)
+    yield from data_table(['Disease', 'Transmission Type', 'Date of Contraction'], rows, [6*cm, 6*cm, 5*cm],
+                          "No transmittable diseases recorded.")
+    if diseases:
+        yield Paragraph(f"Total Incidents: {len(diseases)}", NORMAL_STYLE)
+    yield Spacer(1, 0.3*cm)
+
+    complications = data['complications']
+    yield Paragraph("Complications", SUBTITLE_STYLE)
+    rows = ([
+        complication['complication__label_complication'],
+        complication['notes'] or 'No notes',
+        complication['date_of_contraction'].strftime('%Y-%m-%d'),
+    ] for complication in complications)
+    yield from data_table(['Complication', 'Notes', 'Date of Contraction'], rows, [6*cm, 6*cm, 5*cm],
+                          "No complications recorded.")
+    if complications:
+        yield Paragraph(f"Total Incidents: {len(complications)}", NORMAL_STYLE)
+    yield Spacer(1, 0.5*cm)
+
+
+@report_section('mortality', progress=90)
+def mortality_section(center, data):
+    deceased_patients = data['deceased_patients']
+    yield Paragraph("Mortality", TITLE_STYLE)
+
+    yield Paragraph("Deceased Patients", SUBTITLE_STYLE)
+    rows = ([
+        f"{patient['nom']} {patient['prenom']}",
+        patient['cin'],
+        patient['decease_note'] or 'No note provided',
+    ] for patient in deceased_patients)
+    yield from data_table(['Name', 'CIN', 'Decease Note'], rows, PERSON_COLUMNS, "No deaths recorded.")
+    yield Spacer(1, 0.3*cm)
+
+    yield Paragraph("Mortality Totals", SUBTITLE_STYLE)
+    yield Paragraph(f"Total Deaths: {len(deceased_patients)}", NORMAL_STYLE)
+    yield Spacer(1, 0.5*cm)
+
+
+def report_flowables(center, data, options, progress=_no_progress, header=False):
+    """Yield the flowables of the selected sections in SECTION_RENDERERS order.
+
+    With header the report opens with the center name and generation date, as the legacy export did.
+    """
+    if header:
+        yield Paragraph(f"{center.label} - Activity Report", TITLE_STYLE)
+        yield Paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d')}", NORMAL_STYLE)
+        yield Spacer(1, 0.5*cm)
+
+    if options.date_from or options.date_to:
+        period_from = options.date_from.strftime('%Y-%m-%d') if options.date_from else 'start'
+        period_to = options.date_to.strftime('%Y-%m-%d') if options.date_to else 'today'
+        yield Paragraph(f"Period: {period_from} to {period_to}", NORMAL_STYLE)
+        yield Spacer(1, 0.3*cm)
+
+    for name, (renderer, percent) in SECTION_RENDERERS.items():
+        if name in options.sections:
+            yield from renderer(center, data)
+        progress(percent)
+
+
+class StreamingDocTemplate(SimpleDocTemplate):
+    """SimpleDocTemplate that draws its flowables from an iterator, keeping at most `window` of them queued.
+
+    build() hands its list to handle_flowable(), documented as handling one flowable from the front of the
+    list; topping that list up there keeps memory flat however many session tables the report yields.
+    handle_flowable() also drains the template's own queue of page actions, which is left alone.
+    """
+
+    def __init__(self, *args, window=32, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.window = window
+        self._source = iter(())
+        self._queue = None
+
+    def handle_flowable(self, flowables):
+        if flowables is self._queue:
+            flowables.extend(islice(self._source, max(self.window - len(flowables), 0)))
+        super().handle_flowable(flowables)
+
+    def stream(self, flowables):
+        self._source = iter(flowables)
+        self._queue = list(islice(self._source, self.window))
+        self.build(self._queue)
+
+
+def render_report(center, data, output, options=None, progress=_no_progress, stream=False, header=False):
+    """Render already loaded report `data` as a PDF into `output` (a path or binary file object)."""
+    template = StreamingDocTemplate if stream else SimpleDocTemplate
+    doc = template(output, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
+    flowables = report_flowables(center, data, options or ReportOptions(), progress, header)
+    if stream:
+        doc.stream(flowables)
+    else:
+        doc.build(list(flowables))
+    progress(100)
+
+
+def build_center_report(center, output, progress=_no_progress, stream=False, options=None, header=False):
+    """Load and render the center report as a PDF into `output` (a path or binary file object).
+
+    In stream mode sessions are read with a server-side cursor and flowables are produced as the
+    document consumes them, so memory no longer grows with the number of sessions.
+    """
+    options = options or ReportOptions()
+    data = load_report_data(center, options, lazy_sessions=stream)
+    render_report(center, data, output, options, progress, stream, header)
+
+
+def _export_path(export):
+    directory = os.path.join(getattr(settings, 'REPORT_EXPORT_DIR', 'exports'), str(export.center_id))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"report_{export.pk}_v{export.data_version}.pdf")
+
+
+def prune_exports(center_id, data_version):
+    """Delete the files of finished exports built from a data version older than `data_version`; they are never reused."""
+    superseded = ReportExport.objects.filter(
+        center_id=center_id, status=ReportExport.DONE, data_version__lt=data_version,
+    ).exclude(file_path='')
+    for export_id, path in superseded.values_list('id', 'file_path'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not delete superseded report export %s at %s", export_id, path)
+            continue
+        ReportExport.objects.filter(pk=export_id).update(file_path='')
+
+
+def run_export(export_id):
+    """Generate the PDF of a ReportExport job; runs in the export thread pool."""
+    close_old_connections()
+    try:
+        export = ReportExport.objects.select_related('center__delegation').get(pk=export_id)
+        export.status = ReportExport.RUNNING
+        export.save(update_fields=['status'])
+
+        def progress(percent):
+            ReportExport.objects.filter(pk=export_id).update(progress=percent)
+
+        path = _export_path(export)
+        tmp_path = path + '.part'
+        options = ReportOptions.from_params(export.params)
+        build_center_report(export.center, tmp_path, progress, stream=True, options=options)
+        os.replace(tmp_path, path)
+        ReportExport.objects.filter(pk=export_id).update(
+            status=ReportExport.DONE, progress=100, file_path=path, finished_at=timezone.now())
+        logger.info("Report export %s finished for center %s: %s", export_id, export.center.label, path)
+        prune_exports(export.center_id, export.data_version)
+    except Exception as e:
+        logger.exception("Report export %s failed", export_id)
+        ReportExport.objects.filter(pk=export_id).update(
+            status=ReportExport.FAILED, error=str(e), finished_at=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def request_export(center, user, options=None):
+    """Return a finished or in-flight export for the center's data version and options, or start a new one.
+
+    Returns (export, created).
+    """
+    options = options or ReportOptions()
+    data_version = type(center).objects.filter(pk=center.pk).values_list('data_version', flat=True).get()
+    exports = ReportExport.objects.filter(center=center, data_version=data_version, options_key=options.cache_key())
+
+    done = exports.filter(status=ReportExport.DONE).order_by('-finished_at').first()
+    if done is not None and done.file_path and os.path.exists(done.file_path):
+        return done, False
+
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'REPORT_EXPORT_TIMEOUT', 1800))
+    in_flight = exports.filter(
+        status__in=[ReportExport.PENDING, ReportExport.RUNNING], created_at__gte=stale_before
+    ).order_by('-created_at').first()
+    if in_flight is not None:
+        return in_flight, False
+
+    export = ReportExport.objects.create(
+        center=center, requested_by=user, data_version=data_version,
+        options_key=options.cache_key(), params=options.as_params(),
+    )
+    transaction.on_commit(lambda: _executor.submit(run_export, export.pk))
+    logger.info("Report export %s queued for center %s (data version %s)", export.pk, center.label, data_version)
+    return export, True
@@ -0,0 +1,194 @@
+# centers/signals.py
+import logging
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import (
+    Center, UserProfile, AdministrativeStaff, MedicalStaff, ParamedicalStaff, TechnicalStaff, WorkerStaff,
+    Patient, Machine, HemodialysisSession, TransmittableDisease, Complications, Transplantation,
+    Governorate, Delegation, TypeHemo, MethodHemo, TransmittableDiseaseRef, ComplicationsRef, TransplantationRef,
+    Membrane, Filtre, CNAM,
+)
+from .cache import invalidate_tenant, invalidate_token_version
+from .permissions import invalidate_principal
+from .reference import invalidate_reference, reference_tables_for
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=Center)
+def remember_previous_sub_domain(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_sub_domain = (
+            Center.objects.filter(pk=instance.pk).values_list('sub_domain', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Center)
+@receiver(post_delete, sender=Center)
+def invalidate_center_cache(sender, instance, **kwargs):
+    sub_domains = {instance.sub_domain, getattr(instance, '_previous_sub_domain', None)}
+    logger.debug("Invalidating tenant cache for %s", sub_domains)
+    transaction.on_commit(lambda: invalidate_tenant(*sub_domains))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+@receiver(post_save, sender=AdministrativeStaff)
+@receiver(post_delete, sender=AdministrativeStaff)
+@receiver(post_save, sender=MedicalStaff)
+@receiver(post_delete, sender=MedicalStaff)
+@receiver(post_save, sender=ParamedicalStaff)
+@receiver(post_delete, sender=ParamedicalStaff)
+@receiver(post_save, sender=TechnicalStaff)
+@receiver(post_delete, sender=TechnicalStaff)
+@receiver(post_save, sender=WorkerStaff)
+@receiver(post_delete, sender=WorkerStaff)
+def invalidate_principal_cache(sender, instance, **kwargs):
+    user_id = instance.user_id
+    logger.debug("Invalidating principal cache for user %s (%s changed)", user_id, sender.__name__)
+    invalidate_principal(user_id)
+    transaction.on_commit(lambda: invalidate_principal(user_id))
+
+
+@receiver(pre_save, sender=AdministrativeStaff)
+@receiver(pre_save, sender=MedicalStaff)
+@receiver(pre_save, sender=ParamedicalStaff)
+@receiver(pre_save, sender=TechnicalStaff)
+@receiver(pre_save, sender=WorkerStaff)
+def remember_previous_claims(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_claims = sender.objects.filter(pk=instance.pk).values_list('role', 'center_id').first()
+
+
+@receiver(post_save, sender=AdministrativeStaff)
+@receiver(post_save, sender=MedicalStaff)
+@receiver(post_save, sender=ParamedicalStaff)
+@receiver(post_save, sender=TechnicalStaff)
+@receiver(post_save, sender=WorkerStaff)
+def revoke_tokens_on_claims_change(sender, instance, created, **kwargs):
+    # Role and center are embedded in issued JWTs; changing either must stop those claims from being trusted
+    previous = getattr(instance, '_previous_claims', None)
+    if created or previous is None or previous == (instance.role, instance.center_id):
+        return
+    profile = UserProfile.objects.filter(user_id=instance.user_id).first()
+    if profile:
+        profile.revoke_tokens()
+
+
+@receiver(post_delete, sender=UserProfile)
+def invalidate_token_version_cache(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_token_version(user_id))
+
+
+def bump_center_data_version(**filters):
+    """Increment Center.data_version for the centers matching `filters`; cached report exports keyed on the old version are no longer reused."""
+    Center.objects.filter(**filters).update(data_version=F('data_version') + 1)
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+@receiver(post_save, sender=Machine)
+@receiver(post_delete, sender=Machine)
+@receiver(post_save, sender=AdministrativeStaff)
+@receiver(post_delete, sender=AdministrativeStaff)
+@receiver(post_save, sender=MedicalStaff)
+@receiver(post_delete, sender=MedicalStaff)
+@receiver(post_save, sender=ParamedicalStaff)
+@receiver(post_delete, sender=ParamedicalStaff)
+@receiver(post_save, sender=TechnicalStaff)
+@receiver(post_delete, sender=TechnicalStaff)
+@receiver(post_save, sender=WorkerStaff)
+@receiver(post_delete, sender=WorkerStaff)
+def bump_data_version_for_center_member(sender, instance, **kwargs):
+    bump_center_data_version(pk=instance.center_id)
+
+
+@receiver(post_save, sender=HemodialysisSession)
+@receiver(post_delete, sender=HemodialysisSession)
+@receiver(post_save, sender=TransmittableDisease)
+@receiver(post_delete, sender=TransmittableDisease)
+@receiver(post_save, sender=Complications)
+@receiver(post_delete, sender=Complications)
+@receiver(post_save, sender=Transplantation)
+@receiver(post_delete, sender=Transplantation)
+def bump_data_version_for_activity(sender, instance, **kwargs):
+    bump_center_data_version(patient_staff__medical_activity__id=instance.medical_activity_id)
+    bump_patient_data_version(medical_activity__id=instance.medical_activity_id)
+
+
+def bump_patient_data_version(**filters):
+    """Increment Patient.data_version for the patients matching `filters`, changing their ETags."""
+    Patient.objects.filter(**filters).update(data_version=F('data_version') + 1)
+
+
+@receiver(post_save, sender=CNAM)
+def bump_data_version_for_cnam(sender, instance, created, **kwargs):
+    # The CNAM number is embedded in patient details and in the center's patient list
+    if not created:
+        bump_patient_data_version(cnam=instance)
+        bump_center_data_version(patient_staff__cnam=instance)
+
+
+@receiver(post_save, sender=MedicalStaff)
+def bump_data_version_for_doctor(sender, instance, created, **kwargs):
+    # Doctor names are embedded in the session lists of the patients they treated
+    if not created:
+        bump_patient_data_version(medical_activity__hemodialysis_sessions__responsible_doc=instance)
+
+
+@receiver(post_save, sender=Governorate)
+@receiver(post_delete, sender=Governorate)
+@receiver(post_save, sender=Delegation)
+@receiver(post_delete, sender=Delegation)
+@receiver(post_save, sender=TypeHemo)
+@receiver(post_delete, sender=TypeHemo)
+@receiver(post_save, sender=MethodHemo)
+@receiver(post_delete, sender=MethodHemo)
+@receiver(post_save, sender=TransmittableDiseaseRef)
+@receiver(post_delete, sender=TransmittableDiseaseRef)
+@receiver(post_save, sender=ComplicationsRef)
+@receiver(post_delete, sender=ComplicationsRef)
+@receiver(post_save, sender=TransplantationRef)
+@receiver(post_delete, sender=TransplantationRef)
+@receiver(post_save, sender=Membrane)
+@receiver(post_delete, sender=Membrane)
+@receiver(post_save, sender=Filtre)
+@receiver(post_delete, sender=Filtre)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    for name in reference_tables_for(sender):
+        logger.debug("Invalidating reference table %s (%s changed)", name, sender.__name__)
+        invalidate_reference(name)
+        transaction.on_commit(lambda name=name: invalidate_reference(name))
+
+
+ACTIVITY = 'patient_staff__medical_activity__'
+
+# Reference model -> lookup from Center to the rows whose label is printed in the center report
+REPORT_REFERENCE_LOOKUPS = {
+    Delegation: 'delegation',
+    TypeHemo: ACTIVITY + 'hemodialysis_sessions__type',
+    MethodHemo: ACTIVITY + 'hemodialysis_sessions__method',
+    TransmittableDiseaseRef: ACTIVITY + 'transmittable_diseases__disease',
+    ComplicationsRef: ACTIVITY + 'complications__complication',
+    TransplantationRef: ACTIVITY + 'transplantations__transplantation',
+    Membrane: 'machines__membrane',
+    Filtre: 'machines__filtre',
+}
+
+
+@receiver(post_save, sender=Delegation)
+@receiver(post_save, sender=TypeHemo)
+@receiver(post_save, sender=MethodHemo)
+@receiver(post_save, sender=TransmittableDiseaseRef)
+@receiver(post_save, sender=ComplicationsRef)
+@receiver(post_save, sender=TransplantationRef)
+@receiver(post_save, sender=Membrane)
+@receiver(post_save, sender=Filtre)
+def bump_data_version_for_reference(sender, instance, created, **kwargs):
+    # Renamed labels change the center report, so exports keyed on the old data_version must not be reused;
+    # deletes cascade to the referencing rows, whose own signals bump the centers
+    if not created:
+        bump_center_data_version(**{REPORT_REFERENCE_LOOKUPS[sender]: instance})
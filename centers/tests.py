@@ -1,3 +1,595 @@
-from django.test import TestCase
+import os
+import queue
+import random
+import tempfile
+from datetime import date
+from io import BytesIO
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+from .etags import patient_etag
+from .exports import stream_csv
+from .management.commands.benchmark_predictor import Command as BenchmarkPredictorCommand
+from .ml import predictor
+from .ml.predictor import FeatureEncoder
+from .ml import worker
+from .models import (
+    Center, CNAM, Patient, TypeHemo, MethodHemo, MedicalStaff, HemodialysisSession, Machine, Membrane, Filtre,
+    TransmittableDiseaseRef, TransmittableDisease, ComplicationsRef, Complications,
+    AdministrativeStaff, ParamedicalStaff, TechnicalStaff, WorkerStaff, UserProfile, ReportExport,
+)
+from .pagination import keyset_page
+from .forms import PatientForm
+from .views import (
+    AdministrativeStaffListAPIView, MedicalStaffListAPIView, ParamedicalStaffListAPIView, TechnicalStaffListAPIView,
+    WorkerStaffListAPIView, BootstrapAPIView, CNAMListAPIView, SessionPredictionAPIView, get_user_role,
+)
+from .utils import normalize_label
+from .cache import (
+    TENANT_VERSION_KEY, bump_reference_version, bump_version, get_reference_version, prediction_cache, principal_cache,
+    reference_cache, tenant_cache, tenant_version_cache,
+)
+from .middleware import TenantMiddleware
+from .reference import get_reference
+from .permissions import (
+    RoleBasedPermission, add_principal_claims, get_token_version, principal_from_request, resolve_principal,
+)
+from .reports import REPORT_SECTIONS, SECTION_RENDERERS, ReportOptions, build_center_report, load_report_data, prune_exports
 
-# Create your tests here.
+# One query per report section
+REPORT_QUERIES = 11
+
+# Query-count tests measure the database only, so the shared cache is swapped for an in-process one
+LOCAL_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def clear_caches():
+    cache.clear()
+    reference_cache.clear()
+    principal_cache.clear()
+    tenant_cache.clear()
+    tenant_version_cache.clear()
+
+
+class CenterDataTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.center = Center.objects.create(sub_domain='test-center', label='Test Center', type_center='REGIONAL')
+        cls.cnam = CNAM.objects.create(number='100')
+        cls.type_hemo = TypeHemo.objects.create(name='Hemodialysis')
+        cls.method = MethodHemo.objects.create(type_hemo=cls.type_hemo, name='HDF')
+        user = User.objects.create_user(username='doc', password='secret')
+        cls.doctor = MedicalStaff.objects.create(user=user, nom='Doc', prenom='Tor', cin='00000001', center=cls.center, cnom='C1')
+        cls.disease_ref = TransmittableDiseaseRef.objects.create(label_disease='HBV', type_of_transmission='Blood')
+        cls.complication_ref = ComplicationsRef.objects.create(label_complication='Hypotension')
+        cls.membrane = Membrane.objects.create(type='Polysulfone')
+        cls.filtre = Filtre.objects.create(type='F60', sterilisation='GAMMA_RAYS')
+
+    def add_rows(self, count, offset=0):
+        for i in range(offset, offset + count):
+            patient = Patient.objects.create(
+                nom=f'Patient{i}', prenom='Test', cin=f'1{i:07d}', center=self.center, cnam=self.cnam,
+                entry_date=date(2024, 1, 1), blood_type='O+', status='DECEASED' if i % 2 else 'ALIVE',
+            )
+            activity = patient.medical_activity
+            HemodialysisSession.objects.create(
+                medical_activity=activity, type=self.type_hemo, method=self.method,
+                date_of_session=date(2024, 2, 1), responsible_doc=self.doctor, pre_dialysis_bp=120,
+            )
+            TransmittableDisease.objects.create(medical_activity=activity, disease=self.disease_ref,
+                                                date_of_contraction=date(2024, 3, 1))
+            Complications.objects.create(medical_activity=activity, complication=self.complication_ref,
+                                         date_of_contraction=date(2024, 3, 2))
+            Machine.objects.create(center=self.center, brand=f'Brand{i}', membrane=self.membrane, filtre=self.filtre)
+
+
+class ReportDataQueryCountTests(CenterDataTestCase):
+    def test_query_count_is_constant(self):
+        self.add_rows(2)
+        with self.assertNumQueries(REPORT_QUERIES):
+            small = load_report_data(self.center)
+
+        self.add_rows(8, offset=2)
+        with self.assertNumQueries(REPORT_QUERIES):
+            large = load_report_data(self.center)
+
+        self.assertEqual(len(small['sessions']), 2)
+        self.assertEqual(len(large['sessions']), 10)
+        self.assertEqual(len(large['deceased_patients']), 5)
+        self.assertEqual(large['machines'][0]['filtre__sterilisation'], 'GAMMA_RAYS')
+
+    def test_pdf_render_uses_section_queries_only(self):
+        self.add_rows(5)
+        output = BytesIO()
+        with self.assertNumQueries(REPORT_QUERIES):
+            build_center_report(self.center, output)
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+    def test_options_limit_sections_and_period(self):
+        self.add_rows(3)
+        options = ReportOptions.from_params({'sections': 'activity,mortality', 'date_from': '2024-02-02'})
+        with self.assertNumQueries(3):
+            data = load_report_data(self.center, options)
+        self.assertEqual(set(data), {'sessions', 'transplantations', 'deceased_patients'})
+        self.assertEqual(data['sessions'], [])
+        self.assertEqual(len(data['deceased_patients']), 1)
+        with self.assertRaises(ValueError):
+            ReportOptions.from_params({'sections': 'finance'})
+
+    def test_every_section_has_a_renderer(self):
+        self.assertEqual(set(SECTION_RENDERERS), REPORT_SECTIONS)
+        self.add_rows(2)
+        output = BytesIO()
+        build_center_report(self.center, output, header=True)
+        self.assertTrue(output.getvalue().startswith(b'%PDF'))
+
+    def test_csv_export_streams_sessions_in_period(self):
+        self.add_rows(3)
+        lines = list(stream_csv(self.center, 'sessions', ReportOptions.from_params({'date_to': '2024-02-01'})))
+        self.assertTrue(lines[0].startswith('id,patient_cin,date_of_session'))
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(len(list(stream_csv(self.center, 'sessions', ReportOptions.from_params({'date_from': '2024-02-02'})))), 1)
+
+
+class KeysetPaginationTests(CenterDataTestCase):
+    def test_pages_cover_every_row_once(self):
+        self.add_rows(7)
+        patients = Patient.objects.filter(center=self.center).values('id', 'entry_date')
+        seen, params = [], {'limit': '3'}
+        while True:
+            rows, cursor = keyset_page(patients, params, ['-entry_date', 'id'])
+            seen += [row['id'] for row in rows]
+            if cursor is None:
+                break
+            params = {'limit': '3', 'cursor': cursor}
+        self.assertEqual(seen, sorted(patients.values_list('id', flat=True)))
+
+
+class PatientDataVersionTests(CenterDataTestCase):
+    def test_activity_writes_bump_patient_version(self):
+        self.add_rows(1)
+        patient = Patient.objects.get(center=self.center)
+        version = patient.data_version
+        Complications.objects.create(medical_activity=patient.medical_activity, complication=self.complication_ref,
+                                     date_of_contraction=date(2024, 4, 1))
+        patient.refresh_from_db()
+        self.assertEqual(patient.data_version, version + 1)
+        patient.status = 'DECEASED'
+        patient.save()
+        self.assertEqual(patient.data_version, version + 2)
+
+
+class StaffListQueryCountTests(CenterDataTestCase):
+    STAFF_LISTS = [
+        (AdministrativeStaffListAPIView, AdministrativeStaff, {'job_title': 'Secretary'}),
+        (MedicalStaffListAPIView, MedicalStaff, {'cnom': 'C2'}),
+        (ParamedicalStaffListAPIView, ParamedicalStaff, {'qualification': 'Nurse'}),
+        (TechnicalStaffListAPIView, TechnicalStaff, {'qualification': 'Engineer'}),
+        (WorkerStaffListAPIView, WorkerStaff, {'job_title': 'Janitor'}),
+    ]
+
+    def list_staff(self, view_class, **params):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = self.doctor.user
+        request._request.tenant = self.center
+        return view_class().get(request)
+
+    def test_each_list_is_one_query(self):
+        for index, (view_class, model, fields) in enumerate(self.STAFF_LISTS):
+            with self.subTest(view=view_class.__name__):
+                for i in range(4):
+                    user = User.objects.create_user(username=f'{model.__name__}{i}', email=f'{i}@example.com')
+                    if i % 2:
+                        UserProfile.objects.create(user=user, admin_accord=True)
+                    model.objects.create(user=user, nom='Nom', prenom=str(i), cin=f'9{index}{i:06d}',
+                                         center=self.center, **fields)
+                with self.assertNumQueries(1):
+                    response = self.list_staff(view_class)
+                rows = [row for row in response.data if row['email']]
+                self.assertEqual(len(rows), 4)
+                self.assertEqual(sum(row['admin_accord'] for row in rows), 2)
+                with self.assertNumQueries(1):
+                    page = self.list_staff(view_class, limit=3)
+                self.assertEqual(len(page.data['results']), 3)
+
+
+class CenterSearchTests(TestCase):
+    def test_label_search_ignores_accents_and_case(self):
+        self.assertEqual(normalize_label('  Hôpital  Régional de Béja '), 'hopital regional de beja')
+        center = Center.objects.create(sub_domain='beja', label='Hôpital Régional de Béja', type_center='REGIONAL')
+        self.assertEqual(center.normalized_label, 'hopital regional de beja')
+        self.assertTrue(Center.objects.filter(normalized_label__contains=normalize_label('REGIONAL DE BEJA')).exists())
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ReferenceCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_writes_invalidate_cached_table(self):
+        TypeHemo.objects.create(name='Hemodialysis')
+        body, etag = get_reference('type_hemo')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_reference('type_hemo'), (body, etag))
+        TypeHemo.objects.create(name='Peritoneal')
+        new_body, new_etag = get_reference('type_hemo')
+        self.assertIn('Peritoneal'.encode(), new_body)
+        self.assertNotEqual(new_etag, etag)
+
+    def test_write_in_another_worker_invalidates_local_copy(self):
+        hemo = TypeHemo.objects.create(name='Hemodialysis')
+        get_reference('type_hemo')
+        # Another worker updates the row and bumps the shared version; this process's copy is untouched
+        TypeHemo.objects.filter(pk=hemo.pk).update(name='Hemodiafiltration')
+        bump_reference_version('type_hemo')
+        self.assertIn(b'Hemodiafiltration', get_reference('type_hemo')[0])
+
+    def test_bumps_never_repeat_a_version(self):
+        versions = {get_reference_version('type_hemo')}
+        for _ in range(3):
+            bump_reference_version('type_hemo')
+            versions.add(get_reference_version('type_hemo'))
+        self.assertEqual(len(versions), 4)
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class BootstrapTests(CenterDataTestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_cached_payload_costs_two_queries(self):
+        UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.doctor.user
+        request._request.tenant = self.center
+        request._request.principal = resolve_principal(self.doctor.user)
+
+        first = BootstrapAPIView().get(request)
+        self.assertEqual(first.data['user']['role'], 'MEDICAL_PARA_STAFF')
+        self.assertIn('type_hemo', first.data)
+        self.assertNotIn('membranes', first.data)
+        self.assertEqual(len(first.data['medical_staff']), 1)
+        # Center data version + the caller's staff row
+        with self.assertNumQueries(2):
+            second = BootstrapAPIView().get(request)
+        self.assertEqual(second.data, first.data)
+
+    def test_principal_from_jwt_claims_gets_staff_details(self):
+        UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+        token = add_principal_claims(RefreshToken.for_user(self.doctor.user), self.doctor.user).access_token
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.doctor.user
+        request.auth = token
+        request._request.tenant = self.center
+        request._request.principal = principal_from_request(request)
+        self.assertEqual(request.principal.staff_id, self.doctor.pk)
+        response = BootstrapAPIView().get(request)
+        self.assertEqual(response.data['user']['staff_details'], {'nom': 'Doc', 'prenom': 'Tor', 'cin': '00000001'})
+
+    def test_superuser_without_staff_row(self):
+        admin = User.objects.create_superuser(username='root', email='root@example.com', password='secret')
+        request = Request(APIRequestFactory().get('/'))
+        request.user = admin
+        request._request.tenant = self.center
+        response = BootstrapAPIView().get(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['role'], 'SUPERADMIN')
+        self.assertIsNone(response.data['user']['staff_details'])
+        self.assertIn('membranes', response.data)
+
+
+class CNAMSearchTests(CenterDataTestCase):
+    def test_prefix_search_is_bounded(self):
+        CNAM.objects.bulk_create([CNAM(number=f'2024{i:03d}') for i in range(30)])
+        request = Request(APIRequestFactory().get('/', {'search': '20240', 'limit': 5}))
+        request.user = self.doctor.user
+        response = CNAMListAPIView().get(request)
+        self.assertEqual([row['number'] for row in response.data], [f'2024{i:03d}' for i in range(5)])
+
+    def test_patient_form_resolves_only_submitted_cnam(self):
+        form = PatientForm({'nom': 'Nom', 'prenom': 'Prenom', 'cin': '12345678', 'cnam': self.cnam.pk,
+                            'entry_date': '2024-01-01', 'blood_type': 'O+'}, center=self.center)
+        self.assertEqual(list(form.fields['cnam'].queryset), [self.cnam])
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['cnam'], self.cnam)
+        self.assertFalse(PatientForm(center=self.center).fields['cnam'].queryset.exists())
+
+    def test_patient_form_resolves_cnam_by_number(self):
+        data = {'nom': 'Nom', 'prenom': 'Prenom', 'cin': '12345678', 'entry_date': '2024-01-01', 'blood_type': 'O+'}
+        form = PatientForm({**data, 'cnam_number': self.cnam.number}, center=self.center)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['cnam'], self.cnam)
+        form = PatientForm({**data, 'cnam_number': '999'}, center=self.center)
+        self.assertFalse(form.is_valid())
+        self.assertEqual(list(form.errors), ['cnam_number'])
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PrincipalTests(CenterDataTestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_resolved_in_one_query_then_cached(self):
+        UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+        clear_caches()
+        with self.assertNumQueries(1):
+            principal = resolve_principal(self.doctor.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_principal(self.doctor.user), principal)
+        self.assertEqual((principal.role, principal.center_id, principal.staff_type), ('MEDICAL_PARA_STAFF', self.center.pk, 'Medical'))
+        self.assertTrue(principal.has_role_privileges())
+
+    def test_repeat_lookups_skip_the_shared_cache(self):
+        UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+        principal = resolve_principal(self.doctor.user)
+        version = get_token_version(self.doctor.user.pk)
+        with mock.patch('centers.cache.cache') as shared:
+            self.assertEqual(resolve_principal(self.doctor.user), principal)
+            self.assertEqual(get_token_version(self.doctor.user.pk), version)
+        shared.get.assert_not_called()
+
+    def test_lookup_order_matches_previous_code(self):
+        user = self.doctor.user
+        TechnicalStaff.objects.create(user=user, nom='Doc', prenom='Tor', cin='00000002', center=self.center,
+                                      qualification='Engineer', role='TECHNICAL')
+        AdministrativeStaff.objects.create(user=user, nom='Doc', prenom='Tor', cin='00000003', center=self.center,
+                                           job_title='Manager', role='LOCAL_ADMIN')
+        # RoleBasedPermission checked administrative staff first, get_user_role technical staff first
+        self.assertEqual(resolve_principal(user).role, 'LOCAL_ADMIN')
+        self.assertEqual(get_user_role(user), 'TECHNICAL')
+
+    def test_profile_and_staff_writes_invalidate(self):
+        profile = UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+        self.assertTrue(resolve_principal(self.doctor.user).has_role_privileges())
+        profile.admin_accord = False
+        profile.save()
+        self.assertFalse(resolve_principal(self.doctor.user).has_role_privileges())
+        self.doctor.role = 'VIEWER'
+        self.doctor.save()
+        self.assertEqual(resolve_principal(self.doctor.user).role, 'VIEWER')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TenantCacheTests(CenterDataTestCase):
+    def setUp(self):
+        clear_caches()
+
+    def resolve(self, sub_domain):
+        request = RequestFactory().get('/', HTTP_HOST=f'{sub_domain}.hemo.tn')
+        TenantMiddleware(lambda request: HttpResponse())(request)
+        return request.tenant
+
+    def test_cached_until_center_changes(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.resolve('test-center').pk, self.center.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve('test-center').pk, self.center.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.center.sub_domain = 'renamed-center'
+            self.center.save()
+        with self.assertRaises(Http404):
+            self.resolve('test-center')
+        self.assertEqual(self.resolve('renamed-center').pk, self.center.pk)
+
+    def test_write_in_another_worker_invalidates_local_copy(self):
+        self.resolve('test-center')
+        # Another worker renames the center and bumps the shared version; this process's entry is untouched
+        Center.objects.filter(pk=self.center.pk).update(label='Renamed')
+        bump_version(TENANT_VERSION_KEY % 'test-center')
+        self.assertEqual(self.resolve('test-center').label, 'Test Center')
+        tenant_version_cache.clear()  # the version check interval elapses
+        self.assertEqual(self.resolve('test-center').label, 'Renamed')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class TokenClaimsTests(CenterDataTestCase):
+    def setUp(self):
+        clear_caches()
+        self.profile = UserProfile.objects.create(user=self.doctor.user, is_verified=True, admin_accord=True)
+
+    def request_with(self, token):
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.doctor.user
+        request.auth = token
+        request._request.tenant = self.center
+        return request
+
+    def test_current_claims_skip_the_database(self):
+        token = add_principal_claims(RefreshToken.for_user(self.doctor.user), self.doctor.user).access_token
+        self.assertEqual((token['role'], token['center_id'], token['ver']), ('MEDICAL_PARA_STAFF', self.center.pk, 0))
+        with self.assertNumQueries(0):
+            principal = principal_from_request(self.request_with(token))
+        self.assertEqual(principal.role, 'MEDICAL_PARA_STAFF')
+        self.assertTrue(principal.has_role_privileges())
+
+    def test_token_minted_before_revocation_is_rejected(self):
+        token = add_principal_claims(RefreshToken.for_user(self.doctor.user), self.doctor.user).access_token
+        self.profile.admin_accord = False
+        self.profile.save()
+        self.profile.revoke_tokens()
+
+        request = self.request_with(token)
+        self.assertFalse(RoleBasedPermission().has_permission(request, BootstrapAPIView()))
+        self.assertFalse(request.principal.has_role_privileges())
+
+    def test_full_save_of_stale_profile_keeps_token_version(self):
+        stale = UserProfile.objects.get(pk=self.profile.pk)
+        self.profile.revoke_tokens()
+        stale.save()
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).token_version, 1)
+
+    def test_role_change_revokes_issued_claims(self):
+        self.doctor.role = 'VIEWER'
+        self.doctor.save()
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).token_version, 1)
+        self.doctor.nom = 'Renamed'
+        self.doctor.save()
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).token_version, 1)
+
+
+class FeatureEncoderTests(TestCase):
+    def test_matches_previous_pandas_path(self):
+        command = BenchmarkPredictorCommand()
+        rng = random.Random(7)
+        encoder = FeatureEncoder()
+        for _ in range(50):
+            record = command.make_record(rng)
+            expected = command.pandas_features(record)
+            self.assertEqual(list(expected.columns), list(encoder.columns))
+            np.testing.assert_array_equal(encoder.encode(record), expected.to_numpy(dtype=np.float64))
+        with self.assertRaises(ValueError):
+            encoder.encode({'age': 'old'})
+
+
+class CountingModel:
+    def __init__(self, label):
+        self.label = label
+        self.calls = 0
+
+    def predict(self, features):
+        self.calls += 1
+        return np.array([self.label] * len(features))
+
+    def predict_proba(self, features):
+        return np.array([[0.25, 0.75]] * len(features))
+
+
+@override_settings(PREDICTOR_RELOAD_INTERVAL=0)
+class PredictionCacheTests(TestCase):
+    def setUp(self):
+        prediction_cache.clear()
+
+    def test_cache_is_keyed_on_model_version(self):
+        record = {'age': 60, 'gender': 'male', 'pre_dialysis_bp': 130}
+        first = CountingModel(1)
+        with mock.patch.object(predictor, '_model', first), mock.patch.object(predictor, '_model_signature', (1, 10)):
+            self.assertEqual(predictor.predict_hemodialysis(record), {'prediction': 1, 'probability': [0.25, 0.75]})
+            predictor.predict_hemodialysis(dict(record))
+            self.assertEqual(first.calls, 1)
+
+        reloaded = CountingModel(0)
+        with mock.patch.object(predictor, '_model', reloaded), mock.patch.object(predictor, '_model_signature', (2, 10)):
+            self.assertEqual(predictor.predict_hemodialysis(record)['prediction'], 0)
+            self.assertEqual(reloaded.calls, 1)
+
+
+@override_settings(PREDICTOR_RELOAD_INTERVAL=0)
+class SessionPredictionTests(CenterDataTestCase):
+    def setUp(self):
+        prediction_cache.clear()
+        self.add_rows(1)
+        self.session = HemodialysisSession.objects.get()
+        self.model = CountingModel(1)
+        patches = [
+            mock.patch.object(predictor, '_model', None),
+            mock.patch.object(predictor, '_model_signature', None),
+            mock.patch.object(predictor, '_file_signature', return_value=(1, 10)),
+            mock.patch.object(predictor.joblib, 'load', return_value=self.model),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def call(self, method, **params):
+        request = Request(getattr(APIRequestFactory(), method)('/', params))
+        request.user = self.doctor.user
+        request._request.tenant = self.center
+        return getattr(SessionPredictionAPIView(), method)(request, session_id=self.session.pk)
+
+    def data_version(self):
+        return Patient.objects.values_list('data_version', flat=True).get()
+
+    def test_get_stores_a_missing_score_only(self):
+        version = self.data_version()
+        first = self.call('get')
+        self.assertEqual(first.data['prediction'], '1')
+        self.assertEqual(self.data_version(), version + 1)
+
+        # A worker that has not loaded the model yet still recognizes the stored score
+        predictor._model = predictor._model_signature = None
+        self.assertEqual(self.call('get').data['scored_at'], first.data['scored_at'])
+        self.assertEqual(self.model.calls, 1)
+
+        self.call('get', refresh='1')
+        self.assertEqual(self.data_version(), version + 1)
+        self.call('post')
+        self.assertEqual(self.data_version(), version + 2)
+
+
+class ScoringWorkerTests(TestCase):
+    def test_batches_are_bounded_by_size_and_linger(self):
+        source = queue.Queue()
+        for session_id in [1, 2, 2, 3, 4]:
+            source.put(session_id)
+        self.assertEqual(worker._next_batch(source, batch_size=3, linger=0.01), [1, 2, 2])
+        self.assertEqual(worker._next_batch(source, batch_size=3, linger=0.01), [3, 4])
+
+    @override_settings(SESSION_SCORING_ENABLED=False)
+    def test_disabled_scoring_queues_nothing(self):
+        with mock.patch.object(worker, '_ensure_worker') as ensure:
+            worker.enqueue_session_scoring(1)
+        ensure.assert_not_called()
+        self.assertTrue(worker._queue.empty())
+
+
+class CenterDataVersionTests(CenterDataTestCase):
+    def test_stale_instance_cannot_roll_back_version(self):
+        stale = Center.objects.get(pk=self.center.pk)
+        self.add_rows(1)
+        current = Center.objects.values_list('data_version', flat=True).get(pk=self.center.pk)
+        self.assertGreater(current, stale.data_version)
+        stale.tel = '71000000'
+        stale.save()
+        self.assertEqual(stale.data_version, current + 1)
+        self.assertEqual(Center.objects.values_list('data_version', flat=True).get(pk=self.center.pk), current + 1)
+
+    def test_renaming_report_labels_bumps_version(self):
+        self.add_rows(1)
+        other = Center.objects.create(sub_domain='other-center', label='Other', type_center='REGIONAL')
+        for obj, field, value in [(self.type_hemo, 'name', 'HD'), (self.membrane, 'type', 'Cellulose'),
+                                  (self.complication_ref, 'label_complication', 'Cramps')]:
+            version = Center.objects.values_list('data_version', flat=True).get(pk=self.center.pk)
+            setattr(obj, field, value)
+            obj.save()
+            self.assertEqual(Center.objects.values_list('data_version', flat=True).get(pk=self.center.pk), version + 1)
+        self.assertEqual(Center.objects.values_list('data_version', flat=True).get(pk=other.pk), 0)
+
+    def test_superseded_export_files_are_deleted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            exports = []
+            for version in (1, 2):
+                path = os.path.join(directory, f'report_v{version}.pdf')
+                open(path, 'wb').close()
+                exports.append(ReportExport.objects.create(center=self.center, status=ReportExport.DONE,
+                                                           data_version=version, file_path=path))
+            prune_exports(self.center.pk, 2)
+            old, current = [ReportExport.objects.get(pk=export.pk) for export in exports]
+            self.assertEqual(old.file_path, '')
+            self.assertFalse(os.path.exists(exports[0].file_path))
+            self.assertTrue(os.path.exists(current.file_path))
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class PatientETagTests(CenterDataTestCase):
+    def setUp(self):
+        clear_caches()
+
+    def test_renaming_embedded_objects_changes_etag(self):
+        self.add_rows(1)
+        patient = Patient.objects.get()
+        request = APIRequestFactory().get(f'/api/patients/{patient.pk}/')
+        etags = {patient_etag(request, patient.pk, self.center)}
+        for obj, field, value in [(self.type_hemo, 'name', 'HD'), (self.cnam, 'number', '200'),
+                                  (self.doctor, 'nom', 'Renamed'), (self.disease_ref, 'label_disease', 'HCV')]:
+            setattr(obj, field, value)
+            obj.save()
+            etag = patient_etag(request, patient.pk, self.center)
+            self.assertNotIn(etag, etags, f'{type(obj).__name__} rename kept the ETag')
+            etags.add(etag)
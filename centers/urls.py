@@ -1,27 +1,29 @@
 # urls.py (updated)
 from django.urls import path
 from .views import (
-                   CenterLoginAPIView,AddAdministrativeStaffAPIView,AddMedicalStaffAPIView,AddParamedicalStaffAPIView,
+                   CenterLoginAPIView,CenterTokenRefreshAPIView,AddAdministrativeStaffAPIView,AddMedicalStaffAPIView,AddParamedicalStaffAPIView,
                    AddTechnicalStaffAPIView,AddWorkerStaffAPIView,AddPatientAPIView,
                    DeclareDeceasedAPIView,AddComplicationsAPIView,AddHemodialysisSessionAPIView,
                    AddTransmittableDiseaseAPIView,AddTransplantationAPIView,AddComplicationsRefAPIView,
                    AddTransmittableDiseaseRefAPIView,AddTransplantationRefAPIView,AddMachineAPIView,UserProfileView,
-                   PatientsView,PatientMedicalActivityView,PatientDetailAPIView,MedicalStaffAPIView ,TypeHemoAPIView,
+                   PatientsView,PatientMedicalActivityView,PatientDetailAPIView,PatientCollectionAPIView,MedicalStaffAPIView ,TypeHemoAPIView,
                    MethodHemoAPIView,TransmittableDiseaseRefAPIView,TransplantationRefAPIView,ComplicationsRefAPIView,
                    CNAMListAPIView,AdministrativeStaffListAPIView,ParamedicalStaffListAPIView,MedicalStaffListAPIView,WorkerStaffListAPIView
                    ,TechnicalStaffListAPIView,UpdateAdministrativeStaffAPIView,UpdateMedicalStaffAPIView,UpdateParamedicalStaffAPIView
                    ,UpdateAdministrativeStaffAPIView,UpdateTechnicalStaffAPIView,UpdateWorkerStaffAPIView,DeleteAdministrativeStaffAPIView,DeleteMedicalStaffAPIView
                    ,DeleteParamedicalStaffAPIView,DeleteTechnicalStaffAPIView,DeleteWorkerStaffAPIView,MachineListAPIView,
-                     MembraneListAPIView,ExportPDFAPIView, FiltreListAPIView,AddFiltreAPIView,AddMembraneAPIView,
+                     MembraneListAPIView,ExportPDFAPIView,ExportPDFJobAPIView,ExportPDFJobStatusAPIView,ExportPDFJobDownloadAPIView,ExportCSVAPIView, FiltreListAPIView,AddFiltreAPIView,AddMembraneAPIView,
                      VerifyUserAPIView,UpdateMachineAPIView,DeleteMachineAPIView,
-                     UpdateUserProfileAPIView,CenterDetailView,HemodialysisPredictionView,GrantAdminAccordAPIView, MedicalStaffDetailAPIView, WorkerStaffDetailAPIView, ParamedicalStaffDetailAPIView,
-    AdministrativeStaffDetailAPIView, TechnicalStaffDetailAPIView,UserDetailsAPIView
+                     UpdateUserProfileAPIView,CenterDetailView,HemodialysisPredictionView,HemodialysisBatchPredictionView,SessionPredictionAPIView,PatientLatestPredictionAPIView,CenterSessionScoringAPIView,GrantAdminAccordAPIView, MedicalStaffDetailAPIView, WorkerStaffDetailAPIView, ParamedicalStaffDetailAPIView,
+    AdministrativeStaffDetailAPIView, TechnicalStaffDetailAPIView,UserDetailsAPIView,BootstrapAPIView
                    )
 from django.contrib.auth.views import LoginView, LogoutView
 
 urlpatterns = [
 
     path('api/login/', CenterLoginAPIView.as_view(), name='center_login_api'),
+    path('api/token/refresh/', CenterTokenRefreshAPIView.as_view(), name='center_token_refresh_api'),
+    path('api/bootstrap/', BootstrapAPIView.as_view(), name='bootstrap'),
     path('api/add-administrative-staff/', AddAdministrativeStaffAPIView.as_view(), name='add_administrative_staff_api'),
     path('api/add-technical-staff/', AddTechnicalStaffAPIView.as_view(), name='add_technical_staff_api'),
     path('api/add-medical-staff/', AddMedicalStaffAPIView.as_view(), name='add_medical_staff_api'),
@@ -41,6 +43,7 @@ urlpatterns = [
     path('api/patients/', PatientsView.as_view(), name='patients'),
     path('api/patients/<int:patient_id>/medical-activity/', PatientMedicalActivityView.as_view(), name='patient-medical-activity'),
     path('api/patients/<int:patient_id>/', PatientDetailAPIView.as_view(), name='patient-detail'),
+    path('api/patients/<int:patient_id>/<str:collection>/', PatientCollectionAPIView.as_view(), name='patient-collection'),
     path('api/type-hemo/', TypeHemoAPIView.as_view(), name='type_hemo_list'),
     path('api/method-hemo/', MethodHemoAPIView.as_view(), name='method_hemo_list'),
     path('api/transmittable-disease-ref/', TransmittableDiseaseRefAPIView.as_view(), name='transmittable_disease_ref'),
@@ -70,8 +73,16 @@ urlpatterns = [
     path('api/verify-user/', VerifyUserAPIView.as_view(), name='verify_user'),
     path('api/update-profile/', UpdateUserProfileAPIView.as_view(), name='update_user_profile'),
     path('api/export-pdf/', ExportPDFAPIView.as_view(), name='export-pdf'),
+    path('api/export-pdf/jobs/', ExportPDFJobAPIView.as_view(), name='export-pdf-job'),
+    path('api/export-pdf/jobs/<int:export_id>/', ExportPDFJobStatusAPIView.as_view(), name='export-pdf-job-status'),
+    path('api/export-pdf/jobs/<int:export_id>/download/', ExportPDFJobDownloadAPIView.as_view(), name='export-pdf-job-download'),
+    path('api/export-csv/<str:table>/', ExportCSVAPIView.as_view(), name='export-csv'),
     path('api/center-details/', CenterDetailView.as_view(), name='center-details'),
     path('api/predict-hemodialysis/', HemodialysisPredictionView.as_view(), name='predict-hemodialysis'),
+    path('api/predict-hemodialysis/batch/', HemodialysisBatchPredictionView.as_view(), name='predict-hemodialysis-batch'),
+    path('api/predict-hemodialysis/session/<int:session_id>/', SessionPredictionAPIView.as_view(), name='predict-hemodialysis-session'),
+    path('api/predict-hemodialysis/patient/<int:patient_id>/latest/', PatientLatestPredictionAPIView.as_view(), name='predict-hemodialysis-patient-latest'),
+    path('api/predict-hemodialysis/center/', CenterSessionScoringAPIView.as_view(), name='predict-hemodialysis-center'),
     path('api/grant-accord/',GrantAdminAccordAPIView.as_view(),name='grant-accord'),
     path('api/machines/<int:machine_id>/update/', UpdateMachineAPIView.as_view(), name='update-machine'),
     path('api/machines/<int:machine_id>/delete/', DeleteMachineAPIView.as_view(), name='delete-machine'),
@@ -2,9 +2,17 @@
 from django.core.mail import send_mail
 from django.conf import settings
 import logging
+import re
+import unicodedata
 
 logger = logging.getLogger(__name__)
 
+def normalize_label(text):
+    """Lowercase, accent-free, single-spaced form of a label ("Hôpital  Régional" -> "hopital regional")."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', stripped.lower()).strip()
+
 def send_verification_email(user, code):
     """Send verification code to the user's email."""
     subject = 'Verify Your Account'
@@ -1,22 +1,21 @@
+import json
 import logging
+import os
+import tempfile
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import user_passes_test, login_required
 from django.contrib.auth import authenticate, login
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
 from django.contrib.auth.models import User
-from django.db.models import Count, Q
-from io import BytesIO
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from datetime import datetime
-from .models import UserProfile,TypeHemo,MethodHemo,Filtre,Membrane, Center, TechnicalStaff, MedicalStaff, ParamedicalStaff, AdministrativeStaff, WorkerStaff, Delegation, Patient, CNAM, MethodHemo, MedicalActivity, TransmittableDiseaseRef, ComplicationsRef, Machine, HemodialysisSession, TransmittableDisease, Complications, Transplantation, TransplantationRef
+from .models import UserProfile,TypeHemo,MethodHemo,Filtre,Membrane, Center, TechnicalStaff, MedicalStaff, ParamedicalStaff, AdministrativeStaff, WorkerStaff, Delegation, Patient, CNAM, MethodHemo, MedicalActivity, TransmittableDiseaseRef, ComplicationsRef, Machine, HemodialysisSession, TransmittableDisease, Complications, Transplantation, TransplantationRef, ReportExport
 from .forms import DeceasePatientForm, VerificationForm, TransplantationRefForm, TechnicalStaffForm, MedicalStaffForm, ParamedicalStaffForm, AdministrativeStaffForm, WorkerStaffForm, MachineForm, PatientForm, HemodialysisSessionForm, TransmittableDiseaseForm, TransmittableDiseaseRefForm, ComplicationsForm, ComplicationsRefForm, TransplantationForm
 from .utils import send_verification_email
 from django.template.loader import render_to_string
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
 from django.core.exceptions import ObjectDoesNotExist
 
 from django.db import transaction
@@ -27,12 +26,21 @@ from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import IntegrityError
 import re
-from .permissions import RoleBasedPermission
-from .ml.predictor import predict_hemodialysis
+from .permissions import RoleBasedPermission, USER_ROLE_ORDER, resolve_principal, add_principal_claims
+from .ml.predictor import predict_hemodialysis, predict_hemodialysis_batch
+from .ml.scoring import score_sessions, score_sessions_in_chunks, stored_score
+from .ml.worker import enqueue_session_scoring
+from .reports import ReportOptions, build_center_report, report_filename, request_export
+from .exports import CSV_TABLES, csv_filename, stream_csv
+from .etags import center_conditional_get, patient_conditional_get
+from .reference import get_reference, reference_response
+from .cache import get_reference_versions
+from .pagination import is_paginated, keyset_page, parse_limit, select_fields
 import traceback
 logger = logging.getLogger(__name__)
 
@@ -57,6 +65,129 @@ class HemodialysisPredictionView(APIView):
             print(f"Error in HemodialysisPredictionView.post:\n{tb}")
             return Response({"error": "Internal Server Error"}, status=500)
 
+
+class HemodialysisBatchPredictionView(APIView):
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN','MEDICAL_PARA_STAFF']
+
+    def post(self, request):
+        records = request.data.get('records') if isinstance(request.data, dict) else request.data
+        if not isinstance(records, list) or not records:
+            return Response({"error": "records must be a non-empty list."}, status=400)
+
+        try:
+            results = predict_hemodialysis_batch(records)
+        except ValueError as ve:
+            return Response({"error": str(ve)}, status=400)
+        except Exception:
+            logger.exception("Error in HemodialysisBatchPredictionView.post")
+            return Response({"error": "Internal Server Error"}, status=500)
+
+        errors = sum(1 for result in results if 'error' in result)
+        logger.info("Batch prediction by %s: %s records, %s errors", request.user.username, len(results), errors)
+        return Response({"results": results, "count": len(results), "errors": errors})
+
+
+def _score_response(score):
+    if 'error' in score:
+        return Response({"error": score['error'], "session_id": score['session_id']}, status=400)
+    return Response(score)
+
+
+class SessionPredictionAPIView(APIView):
+    """Score a stored session from its own vitals and its patient's profile.
+
+    GET returns the stored score of the current model. A session that was never scored is scored and
+    stored once; stale scores and ?refresh=1 are computed without writing. POST rescores and stores.
+    """
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN','MEDICAL_PARA_STAFF']
+    not_found = "Session not found."
+
+    def find_session(self, tenant, session_id):
+        sessions = HemodialysisSession.objects.filter(pk=session_id, medical_activity__patient__center=tenant)
+        return sessions.only('id', 'risk_prediction', 'risk_probability', 'risk_model_version', 'risk_scored_at').first()
+
+    def get(self, request, **kwargs):
+        return self.score(request, kwargs, rescore=request.query_params.get('refresh') == '1', write=False)
+
+    def post(self, request, **kwargs):
+        return self.score(request, kwargs, rescore=True, write=True)
+
+    def score(self, request, kwargs, rescore, write):
+        tenant = getattr(request, 'tenant', None)
+        if not tenant:
+            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
+        session = self.find_session(tenant, **kwargs)
+        if session is None:
+            return Response({"error": self.not_found}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            score = None if rescore else stored_score(session)
+            if score is None:
+                persist = write or session.risk_scored_at is None
+                score = score_sessions(HemodialysisSession.objects.filter(pk=session.pk), persist=persist)[0]
+        except ValueError as ve:
+            return Response({"error": str(ve)}, status=400)
+        return _score_response(score)
+
+
+class PatientLatestPredictionAPIView(SessionPredictionAPIView):
+    """Score the most recent session of a patient."""
+    not_found = "No hemodialysis session found for this patient."
+
+    def find_session(self, tenant, patient_id):
+        return (
+            HemodialysisSession.objects
+            .filter(medical_activity__patient_id=patient_id, medical_activity__patient__center=tenant)
+            .only('id', 'risk_prediction', 'risk_probability', 'risk_model_version', 'risk_scored_at')
+            .order_by('-date_of_session', '-id')
+            .first()
+        )
+
+
+class CenterSessionScoringAPIView(APIView):
+    """Score the sessions of the current center in a date range and persist the results.
+
+    Both dates are required and the range may span at most SESSION_SCORING_MAX_DAYS; sessions are scored
+    MAX_BATCH_SIZE at a time. Whole-history rescoring belongs to `manage.py score_sessions`.
+    """
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN','MEDICAL_PARA_STAFF']
+
+    def post(self, request):
+        tenant = getattr(request, 'tenant', None)
+        if not tenant:
+            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
+
+        date_from = request.data.get('date_from')
+        date_to = request.data.get('date_to')
+        if not date_from or not date_to:
+            return Response({"error": "date_from and date_to are required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            date_from = datetime.strptime(date_from, '%Y-%m-%d').date()
+            date_to = datetime.strptime(date_to, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return Response({"error": "Dates must use the YYYY-MM-DD format."}, status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'SESSION_SCORING_MAX_DAYS', 92)
+        if date_to < date_from or (date_to - date_from).days >= max_days:
+            return Response({"error": f"The date range must be ordered and span at most {max_days} days."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        sessions = HemodialysisSession.objects.filter(
+            medical_activity__patient__center=tenant, date_of_session__range=(date_from, date_to),
+        )
+        scores = []
+        try:
+            for results in score_sessions_in_chunks(sessions):
+                scores += results
+        except ValueError as ve:
+            return Response({"error": str(ve)}, status=400)
+
+        errors = sum(1 for score in scores if 'error' in score)
+        logger.info("Center scoring by %s for %s: %s sessions, %s errors",
+                    request.user.username, tenant.label, len(scores), errors)
+        return Response({"results": scores, "count": len(scores), "errors": errors})
+
 def CenterLoginView(request):
     tenant = getattr(request, 'tenant', None)
     if not tenant:
@@ -183,20 +314,8 @@ def get_user_role(user):
         return None
     if user.is_superuser:
         return 'SUPERADMIN'
-    try:
-        if hasattr(user, 'technical_profile'):
-            return user.technical_profile.role
-        elif hasattr(user, 'medical_profile'):
-            return user.medical_profile.role
-        elif hasattr(user, 'paramedical_profile'):
-            return user.paramedical_profile.role
-        elif hasattr(user, 'administrative_profile'):
-            return user.administrative_profile.role
-        elif hasattr(user, 'worker_profile'):
-            return user.worker_profile.role
-    except AttributeError:
-        return None
-    return None
+    staff = resolve_principal(user).staff_row(USER_ROLE_ORDER)
+    return staff.role if staff else None
 def is_local_admin(user):
     if not user.is_authenticated:
         return False
@@ -235,349 +354,17 @@ def export_pdf(request):
         logger.error("No tenant provided for export_pdf")
         return HttpResponse("No center found for this subdomain.", status=404)
 
-    patients = Patient.objects.filter(center=center)
-    sessions = HemodialysisSession.objects.filter(medical_activity__patient__center=center)
-    diseases = TransmittableDisease.objects.filter(medical_activity__patient__center=center)
-    complications = Complications.objects.filter(medical_activity__patient__center=center)
-    transplantations = Transplantation.objects.filter(medical_activity__patient__center=center)
-    deceased_patients = patients.filter(status='DECEASED')
-    medical_staff = MedicalStaff.objects.filter(center=center)
-    paramedical_staff = ParamedicalStaff.objects.filter(center=center)
-    administrative_staff = AdministrativeStaff.objects.filter(center=center)
-    technical_staff = TechnicalStaff.objects.filter(center=center)
-    worker_staff = WorkerStaff.objects.filter(center=center)
-    machines = Machine.objects.filter(center=center)
-
-    context = {
-        'center': center,
-        'patients': patients,
-        'sessions': sessions,
-        'diseases': diseases,
-        'complications': complications,
-        'transplantations': transplantations,
-        'deceased_patients': deceased_patients,
-        'total_deaths': deceased_patients.count(),
-        'medical_staff': medical_staff,
-        'paramedical_staff': paramedical_staff,
-        'administrative_staff': administrative_staff,
-        'technical_staff': technical_staff,
-        'worker_staff': worker_staff,
-        'machines': machines,
-        'total_diseases': diseases.count(),
-        'total_complications': complications.count(),
-        'report_date': datetime.now().strftime('%Y-%m-%d'),
-    }
+    try:
+        options = ReportOptions.from_params(request.GET)
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
 
     response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="center_report_{center.label}_{context["report_date"]}.pdf"'
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        name='Title',
-        fontSize=16,
-        fontName='Helvetica-Bold',
-        alignment=1,
-        spaceAfter=12,
-    )
-    subtitle_style = ParagraphStyle(
-        name='Subtitle',
-        fontSize=12,
-        fontName='Helvetica-Bold',
-        textColor=colors.blue,
-        leading=14,
-        spaceBefore=10,
-        spaceAfter=8,
-    )
-    normal_style = styles['Normal']
-    normal_style.fontSize = 10
-
-    elements.append(Paragraph(f"{center.label} - Activity Report", title_style))
-    elements.append(Paragraph(f"Date: {context['report_date']}", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Center Information", title_style))
-    center_data = [
-        ['Name', center.label],
-        ['Address', center.adresse],
-        ['Delegation', center.delegation.name if center.delegation else 'N/A'],
-        ['Telephone', center.tel or 'N/A'],
-        ['Email', center.mail or 'N/A'],
-    ]
-    center_table = Table(center_data, colWidths=[5*cm, 12*cm])
-    center_table.setStyle(TableStyle([
-        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-        ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-        ('BACKGROUND', (0,0), (0,-1), colors.lightgrey),
-        ('ALIGN', (1,0), (1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('LEFTPADDING', (0,0), (-1,-1), 6),
-        ('RIGHTPADDING', (0,0), (-1,-1), 6),
-    ]))
-    elements.append(center_table)
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Staff Members", title_style))
-
-    elements.append(Paragraph("Administrative Staff", subtitle_style))
-    admin_data = [['Name', 'CIN', 'Details']]
-    for staff in administrative_staff:
-        admin_data.append([
-            f"{staff.nom} {staff.prenom}",
-            staff.cin,
-            f"Job Title: {staff.job_title}",
-        ])
-    for staff in technical_staff:
-        admin_data.append([
-            f"{staff.nom} {staff.prenom}",
-            staff.cin,
-            f"Qualification: {staff.qualification}",
-        ])
-    if len(admin_data) > 1:
-        admin_table = Table(admin_data, colWidths=[5*cm, 4*cm, 8*cm])
-        admin_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(admin_table)
-    else:
-        elements.append(Paragraph("No Administrative Staff recorded.", normal_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    elements.append(Paragraph("Para & Medical Staff", subtitle_style))
-    para_medical_data = [['Name', 'CIN', 'Details']]
-    for staff in medical_staff:
-        para_medical_data.append([
-            f"{staff.nom} {staff.prenom}",
-            staff.cin,
-            f"CNOM: {staff.cnom}",
-        ])
-    for staff in paramedical_staff:
-        para_medical_data.append([
-            f"{staff.nom} {staff.prenom}",
-            staff.cin,
-            f"Qualification: {staff.qualification}",
-        ])
-    if len(para_medical_data) > 1:
-        para_medical_table = Table(para_medical_data, colWidths=[5*cm, 4*cm, 8*cm])
-        para_medical_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(para_medical_table)
-    else:
-        elements.append(Paragraph("No Para & Medical Staff recorded.", normal_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    elements.append(Paragraph("Workers Staff", subtitle_style))
-    worker_data = [['Name', 'CIN', 'Details']]
-    for staff in worker_staff:
-        worker_data.append([
-            f"{staff.nom} {staff.prenom}",
-            staff.cin,
-            f"Job Title: {staff.job_title}",
-        ])
-    if len(worker_data) > 1:
-        worker_table = Table(worker_data, colWidths=[5*cm, 4*cm, 8*cm])
-        worker_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(worker_table)
-    else:
-        elements.append(Paragraph("No Workers Staff recorded.", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Equipment", title_style))
-    machine_data = [['Brand', 'Functional', 'Reserve', 'Refurbished', 'Hours', 'Membrane', 'Filtre']]
-    for machine in machines:
-        machine_data.append([
-            machine.brand,
-            'Yes' if machine.functional else 'No',
-            'Yes' if machine.reserve else 'No',
-            'Yes' if machine.refurbished else 'No',
-            str(machine.nbre_hrs),
-            machine.membrane.type,
-            f"{machine.filtre.type} ({machine.filtre.sterilisation})" if machine.filtre.sterilisation else machine.filtre.type,
-        ])
-    if len(machine_data) > 1:
-        machine_table = Table(machine_data, colWidths=[3*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2*cm, 2.5*cm, 3*cm])
-        machine_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(machine_table)
-    else:
-        elements.append(Paragraph("No machines recorded.", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Activity", title_style))
-    elements.append(Paragraph("Hemodialysis Sessions", subtitle_style))
-    session_data = [['Type', 'Method', 'Date', 'Responsible Doctor']]
-    for session in sessions:
-        session_data.append([
-            session.type.name,
-            session.method.name,
-            session.date_of_session.strftime('%Y-%m-%d'),
-            f"{session.responsible_doc.nom} {session.responsible_doc.prenom}",
-        ])
-    if len(session_data) > 1:
-        session_table = Table(session_data, colWidths=[4*cm, 4*cm, 4*cm, 5*cm])
-        session_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(session_table)
-    else:
-        elements.append(Paragraph("No hemodialysis sessions recorded.", normal_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    elements.append(Paragraph("Transplantations", subtitle_style))
-    transplantation_data = [['Type', 'Date of Operation', 'Notes']]
-    for transplantation in transplantations:
-        transplantation_data.append([
-            transplantation.transplantation.label_transplantation,
-            transplantation.date_operation.strftime('%Y-%m-%d'),
-            transplantation.notes or 'No notes',
-        ])
-    if len(transplantation_data) > 1:
-        transplantation_table = Table(transplantation_data, colWidths=[6*cm, 5*cm, 6*cm])
-        transplantation_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(transplantation_table)
-    else:
-        elements.append(Paragraph("No transplantations recorded.", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Morbidity", title_style))
-    elements.append(Paragraph("Transmittable Diseases", subtitle_style))
-    disease_data = [['Disease', 'Transmission Type', 'Date of Contraction']]
-    for disease in diseases:
-        disease_data.append([
-            disease.disease.label_disease,
-            disease.disease.type_of_transmission,
-            disease.date_of_contraction.strftime('%Y-%m-%d'),
-        ])
-    if len(disease_data) > 1:
-        disease_table = Table(disease_data, colWidths=[6*cm, 6*cm, 5*cm])
-        disease_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(disease_table)
-    else:
-        elements.append(Paragraph("No transmittable diseases recorded.", normal_style))
-    elements.append(Paragraph(f"Total Incidents: {context['total_diseases']}", normal_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    elements.append(Paragraph("Complications", subtitle_style))
-    complication_data = [['Complication', 'Notes', 'Date of Contraction']]
-    for complication in complications:
-        complication_data.append([
-            complication.complication.label_complication,
-            complication.notes or 'No notes',
-            complication.date_of_contraction.strftime('%Y-%m-%d'),
-        ])
-    if len(complication_data) > 1:
-        complication_table = Table(complication_data, colWidths=[6*cm, 6*cm, 5*cm])
-        complication_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(complication_table)
-    else:
-        elements.append(Paragraph("No complications recorded.", normal_style))
-    elements.append(Paragraph(f"Total Incidents: {context['total_complications']}", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    elements.append(Paragraph("Mortality", title_style))
-    elements.append(Paragraph("Deceased Patients", subtitle_style))
-    deceased_data = [['Name', 'CIN', 'Decease Note']]
-    for patient in deceased_patients:
-        deceased_data.append([
-            f"{patient.nom} {patient.prenom}",
-            patient.cin,
-            patient.decease_note or 'No note provided',
-        ])
-    if len(deceased_data) > 1:
-        deceased_table = Table(deceased_data, colWidths=[6*cm, 4*cm, 7*cm])
-        deceased_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ]))
-        elements.append(deceased_table)
-    else:
-        elements.append(Paragraph("No deaths recorded.", normal_style))
-    elements.append(Spacer(1, 0.3*cm))
-
-    elements.append(Paragraph("Mortality Totals", subtitle_style))
-    elements.append(Paragraph(f"Total Deaths: {context['total_deaths']}", normal_style))
-    elements.append(Spacer(1, 0.5*cm))
-
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
+    response['Content-Disposition'] = f'attachment; filename="{report_filename(center)}"'
+    build_center_report(center, response, options=options, header=True)
     return response
 
+
 @login_required
 def center_detail(request):
     center = request.tenant
@@ -604,6 +391,8 @@ class CenterLoginAPIView(APIView):
         refresh = RefreshToken.for_user(user)
         refresh['is_superuser'] = user.is_superuser
         refresh['username'] = user.username
+        if not user.is_superuser:
+            add_principal_claims(refresh, user)
         return {
             "refresh": str(refresh),
             "access": str(refresh.access_token),
@@ -685,6 +474,26 @@ class CenterLoginAPIView(APIView):
             logger.warning("User %s not authorized for center %s", username, tenant.label)
             return Response({"error": "You are not authorized for this center."}, status=status.HTTP_403_FORBIDDEN)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class CenterTokenRefreshAPIView(APIView):
+    """Issue a new access token whose role claims are re-read from the current profile and staff records."""
+
+    def post(self, request):
+        raw_token = request.data.get('refresh')
+        if not raw_token:
+            return Response({"error": "Refresh token is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            refresh = RefreshToken(raw_token)
+            user = User.objects.get(pk=refresh['user_id'], is_active=True)
+        except (TokenError, KeyError, User.DoesNotExist):
+            logger.warning("Rejected token refresh request")
+            return Response({"error": "Invalid or expired refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not user.is_superuser:
+            add_principal_claims(refresh, user)
+        logger.info("Access token refreshed for user %s", user.username)
+        return Response({"access": str(refresh.access_token)}, status=status.HTTP_200_OK)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class AddAdministrativeStaffAPIView(APIView):
     permission_classes = [RoleBasedPermission]
@@ -1532,14 +1341,44 @@ class PatientsView(APIView):
     permission_classes = [RoleBasedPermission]
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
+    FIELDS = (
+        'id', 'nom', 'prenom', 'cin', 'weight', 'age', 'cnam__number', 'status',
+        'entry_date', 'previously_dialysed', 'date_first_dia', 'blood_type', 'gender','hypertension', 'diabetes', 'decease_note'
+    )
+
+    def filter_patients(self, patients, params):
+        for field in ('status', 'blood_type', 'gender'):
+            if params.get(field):
+                patients = patients.filter(**{field: params[field]})
+        for field in ('diabetes', 'hypertension'):
+            if params.get(field):
+                patients = patients.filter(**{field: params[field].lower() in ('1', 'true', 'yes')})
+        try:
+            if params.get('entry_date_from'):
+                patients = patients.filter(entry_date__gte=datetime.strptime(params['entry_date_from'], '%Y-%m-%d').date())
+            if params.get('entry_date_to'):
+                patients = patients.filter(entry_date__lte=datetime.strptime(params['entry_date_to'], '%Y-%m-%d').date())
+        except ValueError:
+            raise ValueError("Dates must use the YYYY-MM-DD format.")
+        search = params.get('search', '').strip()
+        if search:
+            patients = patients.filter(Q(cin__startswith=search) | Q(nom__icontains=search) | Q(prenom__icontains=search))
+        return patients
+
+    @center_conditional_get
     def get(self, request):
         try:
             center = Center.objects.get(sub_domain=request.tenant.sub_domain)
-            patients = Patient.objects.filter(center=center).select_related('cnam').values(
-                'id', 'nom', 'prenom', 'cin', 'weight', 'age', 'cnam__number', 'status',
-                'entry_date', 'previously_dialysed', 'date_first_dia', 'blood_type', 'gender','hypertension', 'diabetes', 'decease_note'
-            )
-            return Response(list(patients))
+            params = request.query_params
+            try:
+                patients = self.filter_patients(Patient.objects.filter(center=center), params)
+                patients = patients.values(*select_fields(params, self.FIELDS))
+                if not is_paginated(params):
+                    return Response(list(patients))
+                rows, next_cursor = keyset_page(patients, params, ['id'])
+            except ValueError as e:
+                return Response({'error': str(e)}, status=400)
+            return Response({'results': rows, 'next_cursor': next_cursor})
         except ObjectDoesNotExist:
             return Response({
                 'error': 'Center not found for this tenant.'
@@ -1633,10 +1472,61 @@ class UserProfileView(APIView):
             }, status=404)
 
 
+SESSION_DETAIL_FIELDS = (
+    'id',
+    'type__name',
+    'method__name',
+    'date_of_session',
+    'responsible_doc__nom',
+    'responsible_doc__prenom',
+    'pre_dialysis_bp',
+    'during_dialysis_bp',
+    'post_dialysis_bp',
+    'heart_rate',
+    'creatinine',
+    'urea',
+    'potassium',
+    'hemoglobin',
+    'hematocrit',
+    'albumin',
+    'kt_v',
+    'urine_output',
+    'dry_weight',
+    'fluid_removal_rate',
+    'dialysis_duration',
+    'vascular_access_type',
+    'dialyzer_type',
+    'severity_of_case'
+)
+
+# Per-patient collections: response key, model, values() fields and newest-first keyset ordering
+PATIENT_COLLECTIONS = {
+    'sessions': ('hemodialysis_sessions', HemodialysisSession, SESSION_DETAIL_FIELDS, ['-date_of_session', '-id']),
+    'diseases': ('transmittable_diseases', TransmittableDisease,
+                 ('id', 'disease__label_disease', 'date_of_contraction'), ['-date_of_contraction', '-id']),
+    'complications': ('complications', Complications,
+                      ('id', 'complication__label_complication', 'notes', 'date_of_contraction'), ['-date_of_contraction', '-id']),
+    'transplantations': ('transplantations', Transplantation,
+                         ('id', 'transplantation__label_transplantation', 'date_operation', 'notes'), ['-date_operation', '-id']),
+}
+
+
+def _collection_count(model):
+    counts = model.objects.filter(medical_activity__patient=OuterRef('pk')).order_by().values('medical_activity')
+    return Coalesce(Subquery(counts.annotate(total=Count('id')).values('total'), output_field=IntegerField()), 0)
+
+
 class PatientDetailAPIView(APIView):
+    """Patient record with collection counts.
+
+    ?include= picks the embedded collections (default: all). Sessions are limited to the latest
+    sessions_limit (default PATIENT_DETAIL_SESSIONS) unless ?expand=sessions asks for the full history;
+    api/patients/<id>/<collection>/ pages through any collection.
+    """
     permission_classes = [RoleBasedPermission]
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
+    @patient_conditional_get
     def get(self, request, patient_id):
         logger.debug("PATIENT_DETAIL: Received GET request to PatientDetailAPIView. User: %s, Patient ID: %s",
                      request.user.username, patient_id)
@@ -1646,45 +1536,24 @@ class PatientDetailAPIView(APIView):
             logger.error("PATIENT_DETAIL: No tenant found for center")
             return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
 
+        params = request.query_params
+        include = set(PATIENT_COLLECTIONS)
+        if 'include' in params:
+            include = {name.strip() for name in params['include'].split(',') if name.strip()}
+            unknown = include - set(PATIENT_COLLECTIONS)
+            if unknown:
+                return Response({"error": f"Unknown collections: {', '.join(sorted(unknown))}."}, status=status.HTTP_400_BAD_REQUEST)
+        expand = {name.strip() for name in params.get('expand', '').split(',') if name.strip()}
         try:
-            patient = Patient.objects.get(id=patient_id, center=tenant)
-            hemodialysis_sessions = HemodialysisSession.objects.filter(medical_activity__patient=patient).values(
-                'id',
-                'type__name',
-                'method__name',
-                'date_of_session',
-                'responsible_doc__nom',
-                'responsible_doc__prenom',
-                'pre_dialysis_bp',
-                'during_dialysis_bp',
-                'post_dialysis_bp',
-                'heart_rate',
-                'creatinine',
-                'urea',
-                'potassium',
-                'hemoglobin',
-                'hematocrit',
-                'albumin',
-                'kt_v',
-                'urine_output',
-                'dry_weight',
-                'fluid_removal_rate',
-                'dialysis_duration',
-                'vascular_access_type',
-                'dialyzer_type',
-                'severity_of_case'
-            )
-            diseases = TransmittableDisease.objects.filter(medical_activity__patient=patient).values(
-                'id', 'disease__label_disease', 'date_of_contraction'
-            )
-            complications = Complications.objects.filter(medical_activity__patient=patient).values(
-                'id', 'complication__label_complication', 'notes', 'date_of_contraction'
-            )
-            transplantations = Transplantation.objects.filter(medical_activity__patient=patient).values(
-                'id', 'transplantation__label_transplantation', 'date_operation', 'notes'
-            )
-            logger.info("PATIENT_DETAIL: Patient ID %s fetched by %s for center %s", patient_id, request.user.username, tenant.label)
-            return Response({
+            sessions_limit = parse_limit({'limit': params.get('sessions_limit', getattr(settings, 'PATIENT_DETAIL_SESSIONS', 20))})
+        except ValueError:
+            return Response({"error": "sessions_limit must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            patient = Patient.objects.select_related('cnam').annotate(
+                **{f'{name}_count': _collection_count(model) for name, (_, model, _, _) in PATIENT_COLLECTIONS.items()}
+            ).get(id=patient_id, center=tenant)
+            payload = {
                 'id': patient.id,
                 'nom': patient.nom,
                 'prenom': patient.prenom,
@@ -1701,15 +1570,47 @@ class PatientDetailAPIView(APIView):
                 'gender': patient.gender,
                 'diabetes':patient.diabetes,
                 'hypertension':patient.hypertension,
-                'hemodialysis_sessions': list(hemodialysis_sessions),
-                'transmittable_diseases': list(diseases),
-                'complications': list(complications),
-                'transplantations': list(transplantations),
-            }, status=status.HTTP_200_OK)
+                'counts': {name: getattr(patient, f'{name}_count') for name in PATIENT_COLLECTIONS},
+            }
+            for name in PATIENT_COLLECTIONS:
+                if name not in include:
+                    continue
+                key, model, fields, ordering = PATIENT_COLLECTIONS[name]
+                rows = model.objects.filter(medical_activity__patient=patient).values(*fields).order_by(*ordering)
+                if name == 'sessions' and 'sessions' not in expand:
+                    rows = rows[:sessions_limit]
+                payload[key] = list(rows)
+            logger.info("PATIENT_DETAIL: Patient ID %s fetched by %s for center %s", patient_id, request.user.username, tenant.label)
+            return Response(payload, status=status.HTTP_200_OK)
         except Patient.DoesNotExist:
             logger.error("PATIENT_DETAIL: Patient ID %s not found in center %s", patient_id, tenant.label)
             return Response({"error": "Patient not found or does not belong to this center."}, status=status.HTTP_404_NOT_FOUND)
 
+
+class PatientCollectionAPIView(APIView):
+    """One page of a patient's sessions, diseases, complications or transplantations, newest first."""
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
+
+    @patient_conditional_get
+    def get(self, request, patient_id, collection):
+        tenant = getattr(request, 'tenant', None)
+        if not tenant:
+            logger.error("PATIENT_COLLECTION: No tenant found for center")
+            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
+        if collection not in PATIENT_COLLECTIONS:
+            return Response({"error": "Unknown collection."}, status=status.HTTP_404_NOT_FOUND)
+        if not Patient.objects.filter(id=patient_id, center=tenant).exists():
+            return Response({"error": "Patient not found or does not belong to this center."}, status=status.HTTP_404_NOT_FOUND)
+
+        _, model, fields, ordering = PATIENT_COLLECTIONS[collection]
+        rows = model.objects.filter(medical_activity__patient_id=patient_id).values(*fields)
+        try:
+            results, next_cursor = keyset_page(rows, request.query_params, ordering)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class DeclareDeceasedAPIView(APIView):
     permission_classes = [RoleBasedPermission]
@@ -1803,6 +1704,7 @@ class AddHemodialysisSessionAPIView(APIView):
                         )
                     session.medical_activity = medical_activity
                     session.save()
+                    transaction.on_commit(lambda: enqueue_session_scoring(session.id))
                     logger.info("Hemodialysis session (ID: %s) added for patient %s %s by %s in center %s",
                                session.id, patient.nom, patient.prenom, request.user.username, tenant.label)
                     return Response({
@@ -1825,6 +1727,7 @@ class AddHemodialysisSessionAPIView(APIView):
             logger.warning("Hemodialysis session form invalid for patient ID %s: %s", patient_id, form.errors)
             return Response({"error": "Form validation failed.", "errors": form.errors.as_data()}, status=400)
 
+    @patient_conditional_get
     def get(self, request, patient_id):
         logger.debug("Received GET request to AddHemodialysisSessionAPIView for patient ID: %s. User: %s",
                     patient_id, request.user.username)
@@ -1833,23 +1736,40 @@ class AddHemodialysisSessionAPIView(APIView):
             logger.error("No tenant found for hemodialysis session list request")
             return Response({"error": "Invalid or missing center subdomain."}, status=400)
         try:
-            patient = Patient.objects.get(id=patient_id, center=tenant)
-            sessions = HemodialysisSession.objects.filter(medical_activity__patient=patient)
+            patient = Patient.objects.select_related('medical_activity').get(id=patient_id, center=tenant)
+            activity = getattr(patient, 'medical_activity', None)
+            # One joined projection ordered along the (medical_activity, date_of_session) index
+            sessions = HemodialysisSession.objects.filter(medical_activity=activity).values(
+                'id', 'type__name', 'method__name', 'date_of_session', 'responsible_doc__nom', 'responsible_doc__prenom',
+                'pre_dialysis_bp', 'during_dialysis_bp', 'post_dialysis_bp', 'heart_rate',
+                'risk_prediction', 'risk_probability', 'risk_model_version',
+            ).order_by('date_of_session', 'id')
+            next_cursor = None
+            if is_paginated(request.query_params):
+                try:
+                    sessions, next_cursor = keyset_page(sessions, request.query_params, ['date_of_session', 'id'])
+                except ValueError as e:
+                    return Response({"error": str(e)}, status=400)
             data = [
                 {
-                    "id": s.id,
-                    "type": s.type.name if s.type else None,
-                    "method": s.method.name if s.method else None,
-                    "date_of_session": s.date_of_session,
-                    "responsible_doc": f"{s.responsible_doc.nom} {s.responsible_doc.prenom}" if s.responsible_doc else None,
-                    "pre_dialysis_bp": s.pre_dialysis_bp,
-                    "during_dialysis_bp": s.during_dialysis_bp,
-                    "post_dialysis_bp": s.post_dialysis_bp,
-                    "heart_rate": s.heart_rate
+                    "id": s['id'],
+                    "type": s['type__name'],
+                    "method": s['method__name'],
+                    "date_of_session": s['date_of_session'],
+                    "responsible_doc": f"{s['responsible_doc__nom']} {s['responsible_doc__prenom']}" if s['responsible_doc__nom'] is not None else None,
+                    "pre_dialysis_bp": s['pre_dialysis_bp'],
+                    "during_dialysis_bp": s['during_dialysis_bp'],
+                    "post_dialysis_bp": s['post_dialysis_bp'],
+                    "heart_rate": s['heart_rate'],
+                    "risk_prediction": s['risk_prediction'],
+                    "risk_probability": s['risk_probability'],
+                    "risk_model_version": s['risk_model_version']
                 } for s in sessions
-            ]
+            ] if activity is not None else []
             logger.info("Hemodialysis session list retrieved for patient %s %s (ID: %s) by %s in center %s",
                        patient.nom, patient.prenom, patient.id, request.user.username, tenant.label)
+            if is_paginated(request.query_params):
+                return Response({"results": data, "next_cursor": next_cursor}, status=200)
             return Response(data, status=200)
         except Patient.DoesNotExist:
             logger.error("Patient ID %s not found in center %s", patient_id, 'unknown')
@@ -1915,6 +1835,7 @@ class AddTransmittableDiseaseAPIView(APIView):
             logger.warning("Transmittable disease form invalid: %s", form.errors)
             return Response({"error": "Form validation failed.", "errors": form.errors.as_data()}, status=400)
 
+    @patient_conditional_get
     def get(self, request, patient_id):
         logger.debug("Received GET request to AddTransmittableDiseaseAPIView for patient ID: %s. User: %s",
                     patient_id, request.user.username)
@@ -1995,6 +1916,7 @@ class AddComplicationsAPIView(APIView):
             logger.warning("Complications form invalid: %s", form.errors)
             return Response({"error": "Form validation failed.", "errors": form.errors.as_data()}, status=400)
 
+    @patient_conditional_get
     def get(self, request, patient_id):
         logger.debug("Received GET request to AddComplicationsAPIView for patient ID: %s. User: %s",
                     patient_id, request.user.username)
@@ -2074,6 +1996,7 @@ class AddTransplantationAPIView(APIView):
             logger.warning("Transplantation form invalid: %s", form.errors)
             return Response({"error": "Form validation failed.", "errors": form.errors.as_data()}, status=400)
 
+    @patient_conditional_get
     def get(self, request, patient_id):
         logger.debug("Received GET request to AddTransplantationAPIView for patient ID: %s. User: %s",
                     patient_id, request.user.username)
@@ -2124,8 +2047,7 @@ class TypeHemoAPIView(APIView):
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
     def get(self, request):
-        type_hemos = TypeHemo.objects.all().values('id', 'name')
-        return Response(list(type_hemos))
+        return reference_response(request, 'type_hemo')
 
 class MethodHemoAPIView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -2134,12 +2056,12 @@ class MethodHemoAPIView(APIView):
 
     def get(self, request):
         type_hemo_id = request.query_params.get('type_hemo_id')
-        queryset = MethodHemo.objects.all()
-        if type_hemo_id:
-            try:
-                queryset = queryset.filter(type_hemo_id=int(type_hemo_id))
-            except ValueError:
-                return Response({"error": "Invalid type_hemo_id."}, status=400)
+        if not type_hemo_id:
+            return reference_response(request, 'method_hemo')
+        try:
+            queryset = MethodHemo.objects.filter(type_hemo_id=int(type_hemo_id))
+        except ValueError:
+            return Response({"error": "Invalid type_hemo_id."}, status=400)
         method_hemos = queryset.values('id', 'name', 'type_hemo_id')
         return Response(list(method_hemos))
     
@@ -2150,8 +2072,7 @@ class TransmittableDiseaseRefAPIView(APIView):
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
     def get(self, request):
-        diseases = TransmittableDiseaseRef.objects.all().values('id', 'label_disease', 'type_of_transmission')
-        return Response(list(diseases))
+        return reference_response(request, 'transmittable_disease_ref')
 
 class ComplicationsRefAPIView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -2159,8 +2080,7 @@ class ComplicationsRefAPIView(APIView):
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
     def get(self, request):
-        complications = ComplicationsRef.objects.all().values('id', 'label_complication')
-        return Response(list(complications))
+        return reference_response(request, 'complications_ref')
 
 class TransplantationRefAPIView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -2168,8 +2088,7 @@ class TransplantationRefAPIView(APIView):
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
 
     def get(self, request):
-        transplantations = TransplantationRef.objects.all().values('id', 'label_transplantation')
-        return Response(list(transplantations))
+        return reference_response(request, 'transplantation_ref')
     
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -2179,177 +2098,117 @@ class CNAMListAPIView(APIView):
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF']
     def get(self, request):
         logger.debug("Received GET request to CNAMListAPIView. User: %s", request.user.username)
-        try:
-            cnams = CNAM.objects.all()
-            data = [{'id': cnam.id, 'number': cnam.number} for cnam in cnams]
+        params = request.query_params
+        try:
+            limit = parse_limit(params, getattr(settings, 'CNAM_SEARCH_LIMIT', 20), 100)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            cnams = CNAM.objects.values('id', 'number').order_by('number')
+            search = params.get('search', '').strip()
+            if search:
+                # LIKE 'prefix%' is served by the varchar_pattern_ops index PostgreSQL keeps for the unique number
+                cnams = cnams.filter(number__startswith=search)
+            data = list(cnams[:limit])
             return Response(data, status=status.HTTP_200_OK)
         except Exception as e:
             logger.error("Error fetching CNAM records: %s", str(e))
             return Response({"error": f"Failed to fetch CNAM records: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
 
 @method_decorator(csrf_exempt, name='dispatch')
-class AdministrativeStaffListAPIView(APIView):
-    permission_classes = [RoleBasedPermission]
-    allowed_roles = ['LOCAL_ADMIN']
-    def get(self, request):
-        logger.debug("Received GET request to AdministrativeStaffListAPIView. User: %s", request.user.username)
-        tenant = getattr(request, 'tenant', None)
-        if not tenant:
-            logger.error("No tenant found for list administrative staff request")
-            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            staff = AdministrativeStaff.objects.filter(center=tenant)
-            staff_data = [
-                {
-                    'user_id': s.user.id,
-                    'class_id': s.id,
-                    'nom': s.nom,
-                    'prenom': s.prenom,
-                    'cin': s.cin,
-                    'role': s.role,
-                    'job_title': s.job_title,
-                    'email': s.user.email,
-                    'admin_accord': UserProfile.objects.filter(user=s.user).first().admin_accord
-                        if UserProfile.objects.filter(user=s.user).exists() else False
-                } for s in staff
-            ]
-            logger.info("Fetched %d administrative staff for center %s", len(staff_data), tenant.label)
-            return Response(staff_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error("Error fetching administrative staff: %s", str(e))
-            return Response({"error": f"Failed to fetch administrative staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+class StaffListAPIView(APIView):
+    """Shared staff listing: staff, user and verification profile come from one joined values() query.
 
-@method_decorator(csrf_exempt, name='dispatch')
-class MedicalStaffListAPIView(APIView):
+    Subclasses set `model`, the model-specific `detail_field` and a `label` for logs. The response is a
+    plain array unless limit= or cursor= asks for keyset pages.
+    """
     permission_classes = [RoleBasedPermission]
-    allowed_roles = ['LOCAL_ADMIN','MEDICAL_PARA_STAFF']
+    allowed_roles = ['LOCAL_ADMIN']
+    model = None
+    detail_field = None
+    label = None
+
+    @classmethod
+    def staff_queryset(cls, center):
+        return cls.model.objects.filter(center=center).values(
+            'id', 'user_id', 'nom', 'prenom', 'cin', 'role', cls.detail_field,
+            'user__email', 'user__verification_profile__admin_accord',
+        ).order_by('id')
+
+    @classmethod
+    def serialize(cls, rows):
+        return [
+            {
+                'user_id': s['user_id'],
+                'class_id': s['id'],
+                'nom': s['nom'],
+                'prenom': s['prenom'],
+                'cin': s['cin'],
+                'role': s['role'],
+                cls.detail_field: s[cls.detail_field],
+                'email': s['user__email'],
+                'admin_accord': bool(s['user__verification_profile__admin_accord']),
+            } for s in rows
+        ]
 
     def get(self, request):
-        logger.debug("Received GET request to MedicalStaffListAPIView. User: %s", request.user.username)
+        logger.debug("Received GET request to %s. User: %s", type(self).__name__, request.user.username)
         tenant = getattr(request, 'tenant', None)
         if not tenant:
-            logger.error("No tenant found for list medical staff request")
+            logger.error("No tenant found for list %s staff request", self.label)
             return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            staff = MedicalStaff.objects.filter(center=tenant)
-            staff_data = [
-                {
-                    'user_id': s.user.id,
-                    'class_id': s.id,
-                    'nom': s.nom,
-                    'prenom': s.prenom,
-                    'cin': s.cin,
-                    'role': s.role,
-                    'cnom': s.cnom,
-                    'email': s.user.email,
-                    'admin_accord': UserProfile.objects.filter(user=s.user).first().admin_accord
-                        if UserProfile.objects.filter(user=s.user).exists() else False
-                } for s in staff
-            ]
-            logger.info("Fetched %d medical staff for center %s", len(staff_data), tenant.label)
+            staff = self.staff_queryset(tenant)
+            next_cursor = None
+            if is_paginated(request.query_params):
+                try:
+                    staff, next_cursor = keyset_page(staff, request.query_params, ['id'])
+                except ValueError as e:
+                    return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            staff_data = self.serialize(staff)
+            logger.info("Fetched %d %s staff for center %s", len(staff_data), self.label, tenant.label)
+            if is_paginated(request.query_params):
+                return Response({'results': staff_data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
             return Response(staff_data, status=status.HTTP_200_OK)
         except Exception as e:
-            logger.error("Error fetching medical staff: %s", str(e))
-            return Response({"error": f"Failed to fetch medical staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            logger.error("Error fetching %s staff: %s", self.label, str(e))
+            return Response({"error": f"Failed to fetch {self.label} staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ParamedicalStaffListAPIView(APIView):
-    permission_classes = [RoleBasedPermission]
+class AdministrativeStaffListAPIView(StaffListAPIView):
     allowed_roles = ['LOCAL_ADMIN']
+    model = AdministrativeStaff
+    detail_field = 'job_title'
+    label = 'administrative'
 
-    def get(self, request):
-        logger.debug("Received GET request to ParamedicalStaffListAPIView. User: %s", request.user.username)
-        tenant = getattr(request, 'tenant', None)
-        if not tenant:
-            logger.error("No tenant found for list paramedical staff request")
-            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            staff = ParamedicalStaff.objects.filter(center=tenant)
-            staff_data = [
-                {
-                    'user_id': s.user.id,
-                    'class_id': s.id,
-                    'nom': s.nom,
-                    'prenom': s.prenom,
-                    'cin': s.cin,
-                    'role': s.role,
-                    'qualification': s.qualification,
-                    'email': s.user.email,
-                    'admin_accord': UserProfile.objects.filter(user=s.user).first().admin_accord
-                        if UserProfile.objects.filter(user=s.user).exists() else False
-                } for s in staff
-            ]
-            logger.info("Fetched %d paramedical staff for center %s", len(staff_data), tenant.label)
-            return Response(staff_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error("Error fetching paramedical staff: %s", str(e))
-            return Response({"error": f"Failed to fetch paramedical staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@method_decorator(csrf_exempt, name='dispatch')
+class MedicalStaffListAPIView(StaffListAPIView):
+    allowed_roles = ['LOCAL_ADMIN','MEDICAL_PARA_STAFF']
+    model = MedicalStaff
+    detail_field = 'cnom'
+    label = 'medical'
 
 @method_decorator(csrf_exempt, name='dispatch')
-class TechnicalStaffListAPIView(APIView):
-    permission_classes = [RoleBasedPermission]
+class ParamedicalStaffListAPIView(StaffListAPIView):
     allowed_roles = ['LOCAL_ADMIN']
+    model = ParamedicalStaff
+    detail_field = 'qualification'
+    label = 'paramedical'
 
-    def get(self, request):
-        logger.debug("Received GET request to TechnicalStaffListAPIView. User: %s", request.user.username)
-        tenant = getattr(request, 'tenant', None)
-        if not tenant:
-            logger.error("No tenant found for list technical staff request")
-            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            staff = TechnicalStaff.objects.filter(center=tenant)
-            staff_data = [
-                {
-                    'user_id': s.user.id,
-                    'class_id': s.id,
-                    'nom': s.nom,
-                    'prenom': s.prenom,
-                    'cin': s.cin,
-                    'role': s.role,
-                    'qualification': s.qualification,
-                    'email': s.user.email,
-                    'admin_accord': UserProfile.objects.filter(user=s.user).first().admin_accord
-                        if UserProfile.objects.filter(user=s.user).exists() else False
-                } for s in staff
-            ]
-            logger.info("Fetched %d technical staff for center %s", len(staff_data), tenant.label)
-            return Response(staff_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error("Error fetching technical staff: %s", str(e))
-            return Response({"error": f"Failed to fetch technical staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@method_decorator(csrf_exempt, name='dispatch')
+class TechnicalStaffListAPIView(StaffListAPIView):
+    allowed_roles = ['LOCAL_ADMIN']
+    model = TechnicalStaff
+    detail_field = 'qualification'
+    label = 'technical'
 
 @method_decorator(csrf_exempt, name='dispatch')
-class WorkerStaffListAPIView(APIView):
-    permission_classes = [RoleBasedPermission]
+class WorkerStaffListAPIView(StaffListAPIView):
     allowed_roles = ['LOCAL_ADMIN']
+    model = WorkerStaff
+    detail_field = 'job_title'
+    label = 'worker'
 
-    def get(self, request):
-        logger.debug("Received GET request to WorkerStaffListAPIView. User: %s", request.user.username)
-        tenant = getattr(request, 'tenant', None)
-        if not tenant:
-            logger.error("No tenant found for list worker staff request")
-            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            staff = WorkerStaff.objects.filter(center=tenant)
-            staff_data = [
-                {
-                    'user_id': s.user.id,
-                    'class_id': s.id,
-                    'nom': s.nom,
-                    'prenom': s.prenom,
-                    'cin': s.cin,
-                    'role': s.role,
-                    'job_title': s.job_title,
-                    'email': s.user.email,
-                    'admin_accord': UserProfile.objects.filter(user=s.user).first().admin_accord
-                        if UserProfile.objects.filter(user=s.user).exists() else False
-                } for s in staff
-            ]
-            logger.info("Fetched %d worker staff for center %s", len(staff_data), tenant.label)
-            return Response(staff_data, status=status.HTTP_200_OK)
-        except Exception as e:
-            logger.error("Error fetching worker staff: %s", str(e))
-            return Response({"error": f"Failed to fetch worker staff: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 @method_decorator(csrf_exempt, name='dispatch')
 class UpdateMedicalStaffAPIView(APIView):
     permission_classes = [RoleBasedPermission]
@@ -2764,6 +2623,19 @@ class MachineListAPIView(APIView):
     permission_classes = [RoleBasedPermission]
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF', 'WORKER', 'TECHNICAL', 'VIEWER']
 
+    def filter_machines(self, machines, params):
+        for field in ('functional', 'reserve', 'refurbished'):
+            if params.get(field):
+                machines = machines.filter(**{field: params[field].lower() in ('1', 'true', 'yes')})
+        try:
+            if params.get('min_hrs'):
+                machines = machines.filter(nbre_hrs__gte=int(params['min_hrs']))
+            if params.get('max_hrs'):
+                machines = machines.filter(nbre_hrs__lte=int(params['max_hrs']))
+        except ValueError:
+            raise ValueError("min_hrs and max_hrs must be integers.")
+        return machines
+
     def get(self, request):
         logger.debug("MACHINE: Received GET request to MachineListAPIView. User: %s", request.user.username)
         tenant = getattr(request, 'tenant', None)
@@ -2771,29 +2643,42 @@ class MachineListAPIView(APIView):
             logger.error("MACHINE: No tenant found")
             return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
 
+        params = request.query_params
+        try:
+            machines = self.filter_machines(Machine.objects.filter(center=tenant), params).values(
+                'id', 'brand', 'functional', 'reserve', 'refurbished', 'nbre_hrs', 'center_id',
+                'membrane_id', 'membrane__type', 'filtre_id', 'filtre__type', 'filtre__sterilisation',
+            ).order_by('id')
+            next_cursor = None
+            if is_paginated(params):
+                machines, next_cursor = keyset_page(machines, params, ['id'])
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            machines = Machine.objects.filter(center=tenant)
             data = [
                 {
-                    "id": machine.id,
-                    "brand": machine.brand,
-                    "functional": machine.functional,
-                    "reserve": machine.reserve,
-                    "refurbished": machine.refurbished,
-                    "nbre_hrs": machine.nbre_hrs,
+                    "id": machine['id'],
+                    "brand": machine['brand'],
+                    "functional": machine['functional'],
+                    "reserve": machine['reserve'],
+                    "refurbished": machine['refurbished'],
+                    "nbre_hrs": machine['nbre_hrs'],
                     "membrane": {
-                        "id": machine.membrane.id,
-                        "type": machine.membrane.type
-                    } if machine.membrane else None,
+                        "id": machine['membrane_id'],
+                        "type": machine['membrane__type']
+                    } if machine['membrane_id'] else None,
                     "filtre": {
-                        "id": machine.filtre.id,
-                        "type": machine.filtre.type,
-                        "sterilisation": machine.filtre.sterilisation
-                    } if machine.filtre else None,
-                    "center": machine.center_id
+                        "id": machine['filtre_id'],
+                        "type": machine['filtre__type'],
+                        "sterilisation": machine['filtre__sterilisation']
+                    } if machine['filtre_id'] else None,
+                    "center": machine['center_id']
                 } for machine in machines
             ]
             logger.info("MACHINE: Machine list retrieved by %s in center %s", request.user.username, tenant.label)
+            if is_paginated(params):
+                return Response({"results": data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
             return Response(data, status=status.HTTP_200_OK)
         except Machine.DoesNotExist:
             logger.error("MACHINE: Machines not found for center %s", tenant.label)
@@ -2815,15 +2700,9 @@ class MembraneListAPIView(APIView):
             return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            membranes = Membrane.objects.all()  # Adjust if membranes should be tenant-specific
-            data = [
-                {
-                    "id": membrane.id,
-                    "type": membrane.type
-                } for membrane in membranes
-            ]
+            response = reference_response(request, 'membranes')
             logger.info("MEMBRANE: Membrane list retrieved by %s in center %s", request.user.username, tenant.label)
-            return Response(data, status=status.HTTP_200_OK)
+            return response
         except ObjectDoesNotExist as e:
             logger.error("MEMBRANE: Error fetching membranes: %s", str(e))
             return Response({"error": "Membranes not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -2844,16 +2723,9 @@ class FiltreListAPIView(APIView):
             return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            filtres = Filtre.objects.all()  # Adjust if filtres should be tenant-specific
-            data = [
-                {
-                    "id": filtre.id,
-                    "type": filtre.type,
-                    "sterilisation": filtre.sterilisation
-                } for filtre in filtres
-            ]
+            response = reference_response(request, 'filtres')
             logger.info("FILTRE: Filtre list retrieved by %s in center %s", request.user.username, tenant.label)
-            return Response(data, status=status.HTTP_200_OK)
+            return response
         except ObjectDoesNotExist as e:
             logger.error("FILTRE: Error fetching filtres: %s", str(e))
             return Response({"error": "Filtres not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -3036,24 +2908,24 @@ class UpdateUserProfileAPIView(APIView):
         logger.debug("Tenant validated: label=%s", tenant.label)
 
         # Check if user is LOCAL_ADMIN
-        try:
-            staff = AdministrativeStaff.objects.get(user=request.user, center=tenant)
-            logger.debug("Found AdministrativeStaff: user=%s, role=%s, center=%s",
-                         request.user.username, staff.role, tenant.label)
-            if staff.role != 'LOCAL_ADMIN':
-                logger.warning("User %s attempted to update profile without LOCAL_ADMIN role: role=%s",
-                               request.user.username, staff.role)
-                return Response(
-                    {"error": "Only LOCAL_ADMIN users can update profiles."},
-                    status=status.HTTP_403_FORBIDDEN
-                )
-        except AdministrativeStaff.DoesNotExist:
+        principal = resolve_principal(request.user)
+        admin = principal.staff_row(['Administrative'])
+        if admin is None or admin.center_id != tenant.id:
             logger.warning("User %s is not an AdministrativeStaff in center %s",
                            request.user.username, tenant.label)
             return Response(
                 {"error": "You are not authorized for this center."},
                 status=status.HTTP_403_FORBIDDEN
             )
+        logger.debug("Found AdministrativeStaff: user=%s, role=%s, center=%s",
+                     request.user.username, admin.role, tenant.label)
+        if admin.role != 'LOCAL_ADMIN':
+            logger.warning("User %s attempted to update profile without LOCAL_ADMIN role: role=%s",
+                           request.user.username, admin.role)
+            return Response(
+                {"error": "Only LOCAL_ADMIN users can update profiles."},
+                status=status.HTTP_403_FORBIDDEN
+            )
 
         # Validate user_id
         user_id = request.data.get('user_id')
@@ -3087,21 +2959,16 @@ class UpdateUserProfileAPIView(APIView):
             )
 
         # Verify target user is associated with the tenant
-        staff_types = [AdministrativeStaff, ParamedicalStaff, TechnicalStaff, MedicalStaff, WorkerStaff]
-        is_tenant_staff = False
-        for staff_type in staff_types:
-            if staff_type.objects.filter(user=target_user, center=tenant).exists():
-                is_tenant_staff = True
-                logger.debug("Target user %s is %s in center %s",
-                             target_user.username, staff_type.__name__, tenant.label)
-                break
-        if not is_tenant_staff:
+        target_principal = resolve_principal(target_user)
+        if not target_principal.belongs_to(tenant.id):
             logger.warning("User %s is not associated with center %s",
                            target_user.username, tenant.label)
             return Response(
                 {"error": "User is not associated with this center."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        logger.debug("Target user %s is %s staff in center %s",
+                     target_user.username, target_principal.staff_type, tenant.label)
 
         # Validate admin_accord
         admin_accord = request.data.get('admin_accord', True)
@@ -3117,6 +2984,7 @@ class UpdateUserProfileAPIView(APIView):
         logger.debug("Before update: user_id=%s, admin_accord=%s", user_id, user_profile.admin_accord)
         user_profile.admin_accord = admin_accord
         user_profile.save()
+        user_profile.revoke_tokens()
         user_profile.refresh_from_db()  # Ensure we get the latest state
         logger.debug("After update: user_id=%s, admin_accord=%s, has_role_privileges=%s",
                      user_id, user_profile.admin_accord, user_profile.has_role_privileges())
@@ -3142,374 +3010,107 @@ class ExportPDFAPIView(APIView):
             logger.error("No tenant provided for ExportPDFAPIView")
             return Response({"error": "No center found for this subdomain."}, status=404)
 
-        patients = Patient.objects.filter(center=center)
-        sessions = HemodialysisSession.objects.filter(medical_activity__patient__center=center)
-        diseases = TransmittableDisease.objects.filter(medical_activity__patient__center=center)
-        complications = Complications.objects.filter(medical_activity__patient__center=center)
-        transplantations = Transplantation.objects.filter(medical_activity__patient__center=center)
-        deceased_patients = patients.filter(status='DECEASED')
-        medical_staff = MedicalStaff.objects.filter(center=center)
-        paramedical_staff = ParamedicalStaff.objects.filter(center=center)
-        administrative_staff = AdministrativeStaff.objects.filter(center=center)
-        technical_staff = TechnicalStaff.objects.filter(center=center)
-        worker_staff = WorkerStaff.objects.filter(center=center)
-        machines = Machine.objects.filter(center=center)
-
-        context = {
-            'center': center,
-            'patients': patients,
-            'sessions': sessions,
-            'diseases': diseases,
-            'complications': complications,
-            'transplantations': transplantations,
-            'deceased_patients': deceased_patients,
-            'total_deaths': deceased_patients.count(),
-            'medical_staff': medical_staff,
-            'paramedical_staff': paramedical_staff,
-            'administrative_staff': administrative_staff,
-            'technical_staff': technical_staff,
-            'worker_staff': worker_staff,
-            'machines': machines,
-            'total_diseases': diseases.count(),
-            'total_complications': complications.count(),
-            'report_date': datetime.now().strftime('%Y-%m-%d'),
-        }
+        try:
+            options = ReportOptions.from_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
 
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-        elements = []
-
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            name='Title',
-            fontSize=16,
-            fontName='Helvetica-Bold',
-            alignment=1,
-            spaceAfter=12,
-        )
-        subtitle_style = ParagraphStyle(
-            name='Subtitle',
-            fontSize=12,
-            fontName='Helvetica-Bold',
-            textColor=colors.black,
-            leading=14,
-            spaceBefore=10,
-            spaceAfter=8,
-        )
-        normal_style = styles['Normal']
-        normal_style.fontSize = 10
-
-        # Center Information
-        elements.append(Paragraph("Center Information", title_style))
-        center_data = [
-            ['Name', center.label],
-            ['Address', center.adresse or 'N/A'],
-            ['Delegation', center.delegation.name if center.delegation else 'N/A'],
-            ['Telephone', center.tel or 'N/A'],
-            ['Email', center.mail or 'N/A'],
-        ]
-        center_table = Table(center_data, colWidths=[5*cm, 12*cm])
-        center_table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 1, colors.black),
-            ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-            ('BACKGROUND', (0,0), (0,-1), colors.lightgrey),
-            ('ALIGN', (1,0), (1,-1), 'LEFT'),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-            ('LEFTPADDING', (0,0), (-1,-1), 6),
-            ('RIGHTPADDING', (0,0), (-1,-1), 6),
-            ('BACKGROUND', (0,0), (-1,-1), colors.white),
-            ('BACKGROUND', (0,0), (0,-1), colors.lightgrey),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('BACKGROUND', (0,2), (-1,2), colors.lightgrey),
-            ('BACKGROUND', (0,4), (-1,4), colors.lightgrey),
-        ]))
-        elements.append(center_table)
-        elements.append(Spacer(1, 0.5*cm))
-
-        # Staff Members
-        elements.append(Paragraph("Staff Members", title_style))
-
-        # Administrative and Technical Staff
-        elements.append(Paragraph("Administrative Staff", subtitle_style))
-        admin_data = [['Name', 'CIN', 'Details']]
-        for staff in administrative_staff:
-            admin_data.append([
-                f"{staff.nom} {staff.prenom}",
-                staff.cin,
-                f"Job Title: {staff.job_title}",
-            ])
-        for staff in technical_staff:
-            admin_data.append([
-                f"{staff.nom} {staff.prenom}",
-                staff.cin,
-                f"Qualification: {staff.qualification}",
-            ])
-        if len(admin_data) > 1:
-            admin_table = Table(admin_data, colWidths=[6*cm, 4*cm, 7*cm])
-            admin_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(admin_table)
-        else:
-            elements.append(Paragraph("No Administrative Staff recorded.", normal_style))
-        elements.append(Spacer(1, 0.3*cm))
-
-        # Para & Medical Staff
-        elements.append(Paragraph("Para & Medical Staff", subtitle_style))
-        para_medical_data = [['Name', 'CIN', 'Details']]
-        for staff in medical_staff:
-            para_medical_data.append([
-                f"{staff.nom} {staff.prenom}",
-                staff.cin,
-                f"CNOM: {staff.cnom}",
-            ])
-        for staff in paramedical_staff:
-            para_medical_data.append([
-                f"{staff.nom} {staff.prenom}",
-                staff.cin,
-                f"Qualification: {staff.qualification}",
-            ])
-        if len(para_medical_data) > 1:
-            para_medical_table = Table(para_medical_data, colWidths=[6*cm, 4*cm, 7*cm])
-            para_medical_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(para_medical_table)
-        else:
-            elements.append(Paragraph("No Para & Medical Staff recorded.", normal_style))
-        elements.append(Spacer(1, 0.3*cm))
-
-        # Workers Staff
-        elements.append(Paragraph("Workers Staff", subtitle_style))
-        worker_data = [['Name', 'CIN', 'Details']]
-        for staff in worker_staff:
-            worker_data.append([
-                f"{staff.nom} {staff.prenom}",
-                staff.cin,
-                f"Job Title: {staff.job_title}",
-            ])
-        if len(worker_data) > 1:
-            worker_table = Table(worker_data, colWidths=[6*cm, 4*cm, 7*cm])
-            worker_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(worker_table)
-        else:
-            elements.append(Paragraph("No Workers Staff recorded.", normal_style))
-        elements.append(Spacer(1, 0.5*cm))
-
-        # Equipment
-        elements.append(Paragraph("Equipment", title_style))
-        machine_data = [['Brand', 'Functional', 'Reserve', 'Refurbished', 'Hours', 'Membrane', 'Filtre']]
-        for machine in machines:
-            machine_data.append([
-                machine.brand,
-                'Yes' if machine.functional else 'No',
-                'Yes' if machine.reserve else 'No',
-                'Yes' if machine.refurbished else 'No',
-                str(machine.nbre_hrs),
-                machine.membrane.type,
-                f"{machine.filtre.type} ({machine.filtre.sterilisation})" if machine.filtre.sterilisation else machine.filtre.type,
-            ])
-        if len(machine_data) > 1:
-            machine_table = Table(machine_data, colWidths=[3*cm, 2.5*cm, 2.5*cm, 2.5*cm, 2*cm, 2.5*cm, 3*cm])
-            machine_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(machine_table)
-        else:
-            elements.append(Paragraph("No machines recorded.", normal_style))
-        elements.append(Spacer(1, 0.5*cm))
-
-        # Activity
-        elements.append(Paragraph("Activity", title_style))
-
-        # Hemodialysis Sessions
-        elements.append(Paragraph("Hemodialysis Sessions", subtitle_style))
-        session_data = [['Type', 'Method', 'Date', 'Doctor', 'Pre-BP', 'Post-BP', 'Duration', 'Access', 'Severity']]
-        for session in sessions:
-            session_data.append([
-                session.type.name,
-                session.method.name,
-                session.date_of_session.strftime('%Y-%m-%d'),
-                f"{session.responsible_doc.nom} {session.responsible_doc.prenom}",
-                f"{session.pre_dialysis_bp:.1f}" if session.pre_dialysis_bp is not None else 'N/A',
-                f"{session.post_dialysis_bp:.1f}" if session.post_dialysis_bp is not None else 'N/A',
-                f"{session.dialysis_duration:.1f}" if session.dialysis_duration is not None else 'N/A',
-                session.vascular_access_type or 'N/A',
-                session.severity_of_case or 'N/A',
-            ])
-        if len(session_data) > 1:
-            session_table = Table(session_data, colWidths=[2.5*cm, 2.5*cm, 2.5*cm, 3.5*cm, 1.8*cm, 1.8*cm, 1.8*cm, 2*cm, 2*cm])
-            session_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(session_table)
-        else:
-            elements.append(Paragraph("No hemodialysis sessions recorded.", normal_style))
-        elements.append(Spacer(1, 0.3*cm))
-
-        # Transplantations
-        elements.append(Paragraph("Transplantations", subtitle_style))
-        transplantation_data = [['Type', 'Date of Operation', 'Notes']]
-        for transplantation in transplantations:
-            transplantation_data.append([
-                transplantation.transplantation.label_transplantation,
-                transplantation.date_operation.strftime('%Y-%m-%d'),
-                transplantation.notes or 'No notes',
-            ])
-        if len(transplantation_data) > 1:
-            transplantation_table = Table(transplantation_data, colWidths=[6*cm, 5*cm, 6*cm])
-            transplantation_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(transplantation_table)
-        else:
-            elements.append(Paragraph("No transplantations recorded.", normal_style))
-        elements.append(Spacer(1, 0.5*cm))
-
-        # Morbidity
-        elements.append(Paragraph("Morbidity", title_style))
-
-        # Transmittable Diseases
-        elements.append(Paragraph("Transmittable Diseases", subtitle_style))
-        disease_data = [['Disease', 'Transmission Type', 'Date of Contraction']]
-        for disease in diseases:
-            disease_data.append([
-                disease.disease.label_disease,
-                disease.disease.type_of_transmission,
-                disease.date_of_contraction.strftime('%Y-%m-%d'),
-            ])
-        if len(disease_data) > 1:
-            disease_table = Table(disease_data, colWidths=[6*cm, 6*cm, 5*cm])
-            disease_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(disease_table)
-            elements.append(Paragraph(f"Total Incidents: {context['total_diseases']}", normal_style))
-        else:
-            elements.append(Paragraph("No transmittable diseases recorded.", normal_style))
-        elements.append(Spacer(1, 0.3*cm))
-
-        # Complications
-        elements.append(Paragraph("Complications", subtitle_style))
-        complication_data = [['Complication', 'Notes', 'Date of Contraction']]
-        for complication in complications:
-            complication_data.append([
-                complication.complication.label_complication,
-                complication.notes or 'No notes',
-                complication.date_of_contraction.strftime('%Y-%m-%d'),
-            ])
-        if len(complication_data) > 1:
-            complication_table = Table(complication_data, colWidths=[6*cm, 6*cm, 5*cm])
-            complication_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(complication_table)
-            elements.append(Paragraph(f"Total Incidents: {context['total_complications']}", normal_style))
-        else:
-            elements.append(Paragraph("No complications recorded.", normal_style))
-        elements.append(Spacer(1, 0.5*cm))
-
-        # Mortality
-        elements.append(Paragraph("Mortality", title_style))
-
-        # Deceased Patients
-        elements.append(Paragraph("Deceased Patients", subtitle_style))
-        deceased_data = [['Name', 'CIN', 'Decease Note']]
-        for patient in deceased_patients:
-            deceased_data.append([
-                f"{patient.nom} {patient.prenom}",
-                patient.cin,
-                patient.decease_note or 'No note provided',
-            ])
-        if len(deceased_data) > 1:
-            deceased_table = Table(deceased_data, colWidths=[6*cm, 4*cm, 7*cm])
-            deceased_table.setStyle(TableStyle([
-                ('GRID', (0,0), (-1,-1), 1, colors.black),
-                ('FONT', (0,0), (-1,-1), 'Helvetica', 10),
-                ('BACKGROUND', (0,0), (-1,0), colors.lightblue),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('LEFTPADDING', (0,0), (-1,-1), 6),
-                ('RIGHTPADDING', (0,0), (-1,-1), 6),
-                ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-            ]))
-            elements.append(deceased_table)
-        else:
-            elements.append(Paragraph("No deaths recorded.", normal_style))
-        elements.append(Spacer(1, 0.3*cm))
+        if request.query_params.get('stream') == '1':
+            # Render into an anonymous temp file and stream it back in blocks
+            output = tempfile.TemporaryFile()
+            try:
+                build_center_report(center, output, stream=True, options=options)
+            except Exception:
+                output.close()
+                raise
+            output.seek(0)
+            return FileResponse(output, as_attachment=True, filename=report_filename(center),
+                                content_type='application/pdf')
 
-        # Mortality Totals
-        elements.append(Paragraph("Mortality Totals", subtitle_style))
-        elements.append(Paragraph(f"Total Deaths: {context['total_deaths']}", normal_style))
-        elements.append(Spacer(1, 0.5*cm))
+        response = HttpResponse(content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{report_filename(center)}"'
+        build_center_report(center, response, options=options)
+        return response
 
-        doc.build(elements)
-        pdf = buffer.getvalue()
-        buffer.close()
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="center_report_{center.label}_{context["report_date"]}.pdf"'
-        response.write(pdf)
+def _export_payload(export):
+    return {
+        "id": export.id,
+        "status": export.status,
+        "progress": export.progress,
+        "data_version": export.data_version,
+        "params": export.params,
+        "created_at": export.created_at,
+        "finished_at": export.finished_at,
+        "error": export.error,
+    }
+
+
+class ExportPDFJobAPIView(APIView):
+    """Start (or reuse) a background PDF export of the current center."""
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'SUBMITTER']
+
+    def post(self, request):
+        center = request.tenant
+        if not center:
+            logger.error("No tenant provided for ExportPDFJobAPIView")
+            return Response({"error": "No center found for this subdomain."}, status=404)
+
+        try:
+            options = ReportOptions.from_params(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        export, created = request_export(center, request.user, options)
+        return Response(_export_payload(export), status=202 if created else 200)
+
+
+class ExportPDFJobStatusAPIView(APIView):
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'SUBMITTER']
+
+    def get(self, request, export_id):
+        export = ReportExport.objects.filter(pk=export_id, center=request.tenant).first()
+        if export is None:
+            return Response({"error": "Export not found."}, status=404)
+        return Response(_export_payload(export))
+
+
+class ExportPDFJobDownloadAPIView(APIView):
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'SUBMITTER']
+
+    def get(self, request, export_id):
+        export = ReportExport.objects.select_related('center').filter(pk=export_id, center=request.tenant).first()
+        if export is None:
+            return Response({"error": "Export not found."}, status=404)
+        if export.status != ReportExport.DONE or not export.file_path or not os.path.exists(export.file_path):
+            return Response({"error": "Export is not ready.", **_export_payload(export)}, status=409)
+        return FileResponse(open(export.file_path, 'rb'), as_attachment=True,
+                            filename=report_filename(export.center), content_type='application/pdf')
+
+class ExportCSVAPIView(APIView):
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'SUBMITTER']
+
+    def get(self, request, table):
+        center = request.tenant
+        if not center:
+            logger.error("No tenant provided for ExportCSVAPIView")
+            return Response({"error": "No center found for this subdomain."}, status=404)
+        if table not in CSV_TABLES:
+            return Response({"error": f"Unknown table. Choose one of: {', '.join(CSV_TABLES)}."}, status=404)
+
+        try:
+            options = ReportOptions.from_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        response = StreamingHttpResponse(stream_csv(center, table, options), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{csv_filename(center, table)}"'
         return response
-    
+
 class CenterDetailView(APIView):
     permission_classes = [IsAuthenticated, RoleBasedPermission]
     allowed_roles = ['LOCAL_ADMIN', 'MEDICAL_PARA_STAFF','WORKER', 'TECHNICAl', 'VIEWER']  # All roles
@@ -3786,4 +3387,121 @@ class UserDetailsAPIView(APIView):
             user_data["role"] = "NO_ROLE"
 
         logger.info("User details retrieved for %s in center %s", request.user.username, tenant.label)
-        return Response(user_data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(user_data, status=status.HTTP_200_OK)
+
+# What the front-end loads at startup: (response key, view whose allowed_roles gate it, reference table or None)
+BOOTSTRAP_SECTIONS = [
+    ('type_hemo', TypeHemoAPIView, 'type_hemo'),
+    ('method_hemo', MethodHemoAPIView, 'method_hemo'),
+    ('transmittable_disease_ref', TransmittableDiseaseRefAPIView, 'transmittable_disease_ref'),
+    ('complications_ref', ComplicationsRefAPIView, 'complications_ref'),
+    ('transplantation_ref', TransplantationRefAPIView, 'transplantation_ref'),
+    ('membranes', MembraneListAPIView, 'membranes'),
+    ('filtres', FiltreListAPIView, 'filtres'),
+    ('administrative_staff', AdministrativeStaffListAPIView, None),
+    ('medical_staff', MedicalStaffListAPIView, None),
+    ('paramedical_staff', ParamedicalStaffListAPIView, None),
+    ('technical_staff', TechnicalStaffListAPIView, None),
+    ('worker_staff', WorkerStaffListAPIView, None),
+]
+STAFF_MODELS = {
+    'Administrative': AdministrativeStaff,
+    'Medical': MedicalStaff,
+    'Paramedical': ParamedicalStaff,
+    'Technical': TechnicalStaff,
+    'Worker': WorkerStaff,
+}
+BOOTSTRAP_CACHE_KEY = 'bootstrap:%s:%s:%s:%s'
+
+
+class BootstrapAPIView(APIView):
+    """Everything the front-end needs at startup for the caller's role, in one response.
+
+    The center-wide part (center details, reference tables, staff lists) is cached per center, role,
+    center data_version and reference table versions; only the caller's own staff row is read per request.
+    """
+    permission_classes = [RoleBasedPermission]
+    allowed_roles = ['LOCAL_ADMIN', 'SUBMITTER', 'MEDICAL_PARA_STAFF', 'TECHNICAL', 'VIEWER', 'WORKER']
+
+    def sections_for(self, role):
+        return [(key, table) for key, view, table in BOOTSTRAP_SECTIONS
+                if role == 'LOCAL_ADMIN' or role in view.allowed_roles]
+
+    def center_payload(self, center, role):
+        sections = self.sections_for(role)
+        data_version = Center.objects.filter(pk=center.pk).values_list('data_version', flat=True).get()
+        versions = '.'.join(str(version) for version in get_reference_versions([table for _, table in sections if table]))
+        cache_key = BOOTSTRAP_CACHE_KEY % (center.pk, role, data_version, versions)
+        payload = cache.get(cache_key)
+        if payload is not None:
+            return payload
+
+        row = Center.objects.filter(pk=center.pk).values(
+            'id', 'sub_domain', 'label', 'tel', 'mail', 'adresse', 'type_center', 'code_type_hemo', 'name_type_hemo',
+            'center_code', 'governorate_id', 'governorate__name', 'governorate__code',
+            'delegation_id', 'delegation__name', 'delegation__code', 'delegation__governorate_id',
+        ).get()
+        payload = {
+            'center': {
+                'id': row['id'],
+                'sub_domain': row['sub_domain'],
+                'label': row['label'],
+                'tel': row['tel'],
+                'mail': row['mail'],
+                'adresse': row['adresse'],
+                'governorate': {
+                    'id': row['governorate_id'],
+                    'name': row['governorate__name'],
+                    'code': row['governorate__code'],
+                } if row['governorate_id'] else None,
+                'delegation': {
+                    'id': row['delegation_id'],
+                    'name': row['delegation__name'],
+                    'code': row['delegation__code'],
+                    'governorate_id': row['delegation__governorate_id'],
+                } if row['delegation_id'] else None,
+                'type_center': row['type_center'],
+                'code_type_hemo': row['code_type_hemo'],
+                'name_type_hemo': row['name_type_hemo'],
+                'center_code': row['center_code'],
+            },
+        }
+        views = {key: view for key, view, _ in BOOTSTRAP_SECTIONS}
+        for key, table in sections:
+            if table:
+                payload[key] = json.loads(get_reference(table)[0])
+            else:
+                payload[key] = views[key].serialize(views[key].staff_queryset(center))
+        cache.set(cache_key, payload, getattr(settings, 'BOOTSTRAP_CACHE_TTL', 60))
+        return payload
+
+    def get(self, request):
+        tenant = getattr(request, 'tenant', None)
+        if not tenant:
+            logger.error("BOOTSTRAP: No tenant for user %s", request.user.username)
+            return Response({"error": "Invalid or missing center subdomain."}, status=status.HTTP_400_BAD_REQUEST)
+        # RoleBasedPermission lets superusers through before resolving a principal; they may have no staff row
+        principal = getattr(request, 'principal', None) or resolve_principal(request.user)
+        role = 'SUPERADMIN' if request.user.is_superuser else principal.role
+
+        staff = None
+        if principal.staff_type:
+            # Principals built from JWT claims carry no staff id; the staff tables are one-to-one with users
+            staff = STAFF_MODELS[principal.staff_type].objects.filter(user_id=principal.user_id).values('nom', 'prenom', 'cin').first()
+        payload = {
+            'user': {
+                'username': request.user.username,
+                'email': request.user.email,
+                'role': role,
+                'staff_type': principal.staff_type,
+                'staff_details': staff,
+                'profile': {
+                    'is_verified': principal.is_verified,
+                    'has_role_privileges': principal.has_role_privileges(),
+                    'admin_accord': principal.admin_accord,
+                },
+            },
+            **self.center_payload(tenant, 'LOCAL_ADMIN' if request.user.is_superuser else role),
+        }
+        logger.info("BOOTSTRAP: Payload served to %s (role=%s) in center %s", request.user.username, role, tenant.label)
+        return Response(payload, status=status.HTTP_200_OK)
@@ -11,6 +11,18 @@ export const getPatients = async (apiBaseUrl, token) => {
   }
 };
 
+export const searchCnams = async (apiBaseUrl, token, search) => {
+  try {
+    const response = await api.get(`${apiBaseUrl}cnams/`, {
+      params: { search },
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return { success: false, error: error.response?.data?.error || 'Failed to search CNAM numbers.' };
+  }
+};
+
 export const getPatientDetails = async (apiBaseUrl, token, patientId) => {
   try {
     const response = await api.get(`${apiBaseUrl}patients/${patientId}/`, {
@@ -22,6 +34,18 @@ export const getPatientDetails = async (apiBaseUrl, token, patientId) => {
   }
 };
 
+export const getPatientCollection = async (apiBaseUrl, token, patientId, collection, params) => {
+  try {
+    const response = await api.get(`${apiBaseUrl}patients/${patientId}/${collection}/`, {
+      params,
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    return { success: true, data: response.data };
+  } catch (error) {
+    return { success: false, error: error.response?.data?.error || 'Failed to fetch patient history.' };
+  }
+};
+
 export const declarePatientDeceased = async (apiBaseUrl, token, patientId, deceaseNote) => {
   try {
     const response = await api.post(`${apiBaseUrl}declare-deceased/${patientId}/`, {
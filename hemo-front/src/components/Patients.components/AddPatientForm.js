@@ -1,8 +1,8 @@
-import React, { useState } from 'react';
-import { addPatient } from '../../api/patients';
+import React, { useState, useEffect } from 'react';
+import { addPatient, searchCnams } from '../../api/patients';
 import './PatientMedicalActivity.css';
 
-const AddPatientForm = ({ apiBaseUrl, token, cnams, onSubmit, onClose }) => {
+const AddPatientForm = ({ apiBaseUrl, token, onSubmit, onClose }) => {
   const [formData, setFormData] = useState({
     nom: '',
     prenom: '',
@@ -21,6 +21,27 @@ const AddPatientForm = ({ apiBaseUrl, token, cnams, onSubmit, onClose }) => {
   });
   const [useNewCnam, setUseNewCnam] = useState(false);
   const [formErrors, setFormErrors] = useState({});
+  const [cnamMatches, setCnamMatches] = useState([]);
+
+  // Suggest existing CNAM numbers starting with what has been typed so far
+  useEffect(() => {
+    const search = formData.cnam.trim();
+    if (useNewCnam || !search) {
+      setCnamMatches([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      const result = await searchCnams(apiBaseUrl, token, search);
+      if (!cancelled && result.success) {
+        setCnamMatches(result.data);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [apiBaseUrl, token, formData.cnam, useNewCnam]);
 
   const handleInputChange = (field, value) => {
     ;
@@ -40,7 +61,7 @@ const AddPatientForm = ({ apiBaseUrl, token, cnams, onSubmit, onClose }) => {
     if (!formData.nom.trim()) errors.nom = 'required.';
     if (!formData.prenom.trim()) errors.prenom = 'required.';
     if (!formData.cin.trim()) errors.cin = 'required.';
-    if (!useNewCnam && !formData.cnam) errors.cnam = 'required.';
+    if (!useNewCnam && !formData.cnam.trim()) errors.cnam = 'required.';
     if (useNewCnam && !formData.new_cnam_number.trim()) errors.new_cnam_number = 'required.';
     if (!formData.entry_date) errors.entry_date = 'required.';
     if (formData.previously_dialysed && !formData.date_first_dia) errors.date_first_dia = 'required.';
@@ -81,12 +102,7 @@ const AddPatientForm = ({ apiBaseUrl, token, cnams, onSubmit, onClose }) => {
     if (useNewCnam) {
       data.new_cnam_number = formData.new_cnam_number.trim();
     } else {
-      const cnamId = parseInt(formData.cnam, 10);
-      if (!cnamId || isNaN(cnamId)) {
-        setFormErrors({ cnam: 'Please select a valid CNAM.' });
-        return;
-      }
-      data.cnam = cnamId;
+      data.cnam_number = formData.cnam.trim();
     }
 
     ;
@@ -160,18 +176,21 @@ const AddPatientForm = ({ apiBaseUrl, token, cnams, onSubmit, onClose }) => {
       ) : (
         <div className="form-group">
           <label>CNAM:</label>
-          <select
+          <input
+            type="text"
+            list="cnam-matches"
+            placeholder="Type a CNAM number"
             value={formData.cnam}
             onChange={(e) => handleInputChange('cnam', e.target.value)}
-          >
-            <option value="">Select CNAM</option>
-            {cnams.map((cnam) => (
-              <option key={cnam.id} value={cnam.id}>
-                {cnam.number}
-              </option>
+          />
+          <datalist id="cnam-matches">
+            {cnamMatches.map((cnam) => (
+              <option key={cnam.id} value={cnam.number} />
             ))}
-          </select>
-          {formErrors.cnam && <span className="error">{formErrors.cnam}</span>}
+          </datalist>
+          {(formErrors.cnam || formErrors.cnam_number) && (
+            <span className="error">{formErrors.cnam || formErrors.cnam_number}</span>
+          )}
         </div>
       )}
       <div className="form-group">
@@ -3,6 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import { TenantContext } from '../../context/TenantContext';
 import {
   getPatientDetails,
+  getPatientCollection,
   getDoctors,
   getTypeHemo,
   getTransmittableDiseaseRef,
@@ -19,6 +20,9 @@ import SideMenu from '../SideMenu';
 import Header from '../Header';
 import './PatientMedicalActivity.css';
 
+// The patient detail embeds only the latest sessions; older ones are paged from api/patients/<id>/sessions/
+const SESSIONS_PAGE_SIZE = 50;
+
 // Prediction Result Modal Component
 const PredictionResultModal = ({ isOpen, onClose, predictionData }) => {
   if (!isOpen || !predictionData) return null;
@@ -139,8 +143,18 @@ const PatientMedicalActivity = () => {
   const [modalOpen, setModalOpen] = useState(null);
   const [predictionModalOpen, setPredictionModalOpen] = useState(false);
   const [predictionResult, setPredictionResult] = useState(null);
+  const [sessions, setSessions] = useState([]);
+  const [sessionsCursor, setSessionsCursor] = useState(null);
+  const [sessionsLoading, setSessionsLoading] = useState(false);
+  const [sessionsError, setSessionsError] = useState(null);
   const navigate = useNavigate();
 
+  useEffect(() => {
+    setSessions(patient?.hemodialysis_sessions ?? []);
+    setSessionsCursor(null);
+    setSessionsError(null);
+  }, [patient]);
+
   useEffect(() => {
     const fetchData = async () => {
       const token = localStorage.getItem('tenant-token');
@@ -318,6 +332,22 @@ const PatientMedicalActivity = () => {
     }
   };
 
+  const loadMoreSessions = async () => {
+    const token = localStorage.getItem('tenant-token');
+    setSessionsLoading(true);
+    // The first page starts over from the newest session, replacing the embedded ones
+    const params = sessionsCursor ? { limit: SESSIONS_PAGE_SIZE, cursor: sessionsCursor } : { limit: SESSIONS_PAGE_SIZE };
+    const result = await getPatientCollection(apiBaseUrl, token, id, 'sessions', params);
+    if (result.success) {
+      setSessions(sessionsCursor ? [...sessions, ...result.data.results] : result.data.results);
+      setSessionsCursor(result.data.next_cursor);
+      setSessionsError(null);
+    } else {
+      setSessionsError(result.error);
+    }
+    setSessionsLoading(false);
+  };
+
   const handleDeclareDeceased = async () => {
     const deceaseNote = window.prompt('Enter decease note:');
     if (deceaseNote === null) return;
@@ -335,6 +365,7 @@ const PatientMedicalActivity = () => {
   if (error) return <div className="section-container error">{error}</div>;
 
   const isDeceased = patient.status === 'DECEASED';
+  const totalSessions = patient.counts?.sessions ?? sessions.length;
 
   return (
     <div className="app-container">
@@ -402,7 +433,7 @@ const PatientMedicalActivity = () => {
                     onClose={closeModal}
                   />
                 </Modal>
-                {patient.hemodialysis_sessions.length === 0 ? (
+                {sessions.length === 0 ? (
                   <p className="no-data">No sessions recorded.</p>
                 ) : (
                   <div className="table-wrapper">
@@ -436,7 +467,7 @@ const PatientMedicalActivity = () => {
                         </tr>
                       </thead>
                       <tbody>
-                        {patient.hemodialysis_sessions.map((session) => (
+                        {sessions.map((session) => (
                           <tr key={session.id}>
                             <td>{session.id}</td>
                             <td>{session.type__name ?? 'N/A'}</td>
@@ -472,6 +503,17 @@ const PatientMedicalActivity = () => {
                     </table>
                   </div>
                 )}
+                {sessions.length < totalSessions && (
+                  <div className="action-buttons">
+                    <p className="no-data">
+                      Showing the latest {sessions.length} of {totalSessions} sessions.
+                      {sessionsError && ` ${sessionsError}`}
+                    </p>
+                    <button className="action-button" onClick={loadMoreSessions} disabled={sessionsLoading}>
+                      {sessionsLoading ? 'Loading...' : 'Load older sessions'}
+                    </button>
+                  </div>
+                )}
               </div>
 
               <div className="activity-section">
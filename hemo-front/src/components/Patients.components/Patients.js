@@ -3,13 +3,11 @@ import { useNavigate } from 'react-router-dom';
 import { TenantContext } from '../../context/TenantContext';
 import { getPatients, declarePatientDeceased } from '../../api/patients';
 import AddPatientForm from './AddPatientForm';
-import axios from 'axios';
 import './Patients.css';
 
 const Patients = () => {
   const { apiBaseUrl } = useContext(TenantContext);
   const [patients, setPatients] = useState([]);
-  const [cnams, setCnams] = useState([]);
   const [error, setError] = useState(null);
   const [loading, setLoading] = useState(true);
   const [modalOpen, setModalOpen] = useState(false);
@@ -43,12 +41,6 @@ const Patients = () => {
       } else {
         setError(patientsResult.error);
       }
-
-      // Fetch CNAM records
-      const cnamsResponse = await axios.get(`${apiBaseUrl}cnams/`, {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setCnams(cnamsResponse.data);
     } catch (err) {
       setError(err.message || 'Failed to fetch data.');
     } finally {
@@ -135,7 +127,6 @@ const Patients = () => {
               <AddPatientForm
                 apiBaseUrl={apiBaseUrl}
                 token={localStorage.getItem('tenant-token')}
-                cnams={cnams}
                 onSubmit={handlePatientAdded}
                 onClose={handleCloseModal}
               />